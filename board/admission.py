@@ -0,0 +1,97 @@
+import time
+
+BURST = 10              # Connections a source may open at once
+PRUNE = 4096            # Sources tracked before the idle ones are forgotten
+
+
+class RateLimiter:
+    """
+    Token bucket per source address. Every source holds up to burst tokens,
+    refilled at rate tokens per second, and a new connection takes one. The
+    buckets are refilled lazily when their source connects again, so an
+    admission costs constant time however many sources there are. Buckets
+    that refilled completely are the same as no bucket at all, and are
+    forgotten once the number of sources doubles, so a storm of distinct
+    addresses does not grow the table without bound.
+
+    Parameters:
+        rate (float): Connections per second a source may sustain.
+        burst (int): Connections a source may open at once.
+        clock (callable): Function returning the current time in seconds.
+
+    Attributes:
+        buckets (dict {str: list(float, float)}): Tokens of every source
+                                                  and time they were
+                                                  counted at.
+        limit (int): Sources tracked before the next pruning.
+        refused (int): Connections refused so far.
+    """
+
+    def __init__(self, rate, burst=BURST, clock=time.monotonic):
+        """
+        Initialize the limiter with no source known.
+
+        Args:
+            rate (float): Connections per second a source may sustain.
+            burst (int): Connections a source may open at once.
+            clock (callable): Function returning the current time.
+        """
+        self.__rate = rate
+        self.__burst = burst
+        self.__clock = clock
+        self.__buckets = {}
+        self.__limit = PRUNE
+        self.__refused = 0
+
+
+    @property
+    def refused(self):
+        """
+        Getter for refused attribute.
+
+        Returns:
+            int: Connections refused so far.
+        """
+        return self.__refused
+
+
+    def allow(self, source):
+        """
+        Take a token of a source for a new connection.
+
+        Args:
+            source (str): Address of the peer.
+
+        Returns:
+            bool: True if the connection is admitted, False if the source
+                  ran out of tokens.
+        """
+        now = self.__clock()
+        bucket = self.__buckets.get(source)
+        if bucket is None:
+            if len(self.__buckets) >= self.__limit:
+                self.__prune(now)
+            self.__buckets[source] = [self.__burst - 1, now]
+            return True
+        tokens = min(self.__burst, bucket[0] + (now - bucket[1]) * self.__rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            self.__refused += 1
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+
+    def __prune(self, now):
+        """
+        Forget the sources whose bucket is full again, and track up to
+        twice as many sources as remain before pruning again.
+
+        Args:
+            now (float): Current time.
+        """
+        burst, rate = self.__burst, self.__rate
+        self.__buckets = {source: bucket for source, bucket in self.__buckets.items()
+                          if bucket[0] + (now - bucket[1]) * rate < burst}
+        self.__limit = max(PRUNE, 2 * len(self.__buckets))
@@ -0,0 +1,252 @@
+import numpy as np
+from protocol import UNBOUNDED
+from rules import line_windows, default_k, PLAYING, WON, STALEMATE, OCCUPIED, OUT_OF_BOARD
+
+EMPTY = ord(' ')
+PIECES = (ord('O'), ord('X'))
+
+# Outcome of a move in every game of a batch, besides those of rules.py
+OVER = 5                # The game had ended before: the move was ignored
+
+
+class BatchBoard:
+    """
+    Batch of independent games on boards of the same geometry, held as one
+    (games, rows, cols) array of bytes. A move per game is applied to the
+    whole batch at once, and its legality, a win and a stalemate are found
+    with array operations instead of a loop over Board objects. The rules
+    are those of Board: every line of k boxes counts the pieces of each
+    player it holds, so a move only looks at the lines through its box,
+    completing one when its count reaches k and killing it once it holds
+    both pieces.
+
+    Parameters:
+        count (int): Number of games.
+        rows (int): Number of rows of every board.
+        cols (int): Number of columns of every board.
+        k (int): Pieces in a row needed to win. Defaults to the shortest
+                 side.
+        early_draw (bool): Whether a game ends in a stalemate as soon as no
+                           line can be completed, rather than once the
+                           board is full.
+
+    Attributes:
+        count (int): Number of games.
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        state (numpy.ndarray): Boxes of every game, the byte of a piece or
+                               of a space.
+        over (numpy.ndarray): Whether every game has ended.
+        filled (numpy.ndarray): Pieces placed in every game.
+        live (numpy.ndarray): Lines every game may still complete.
+        windows (numpy.ndarray): Lines through every box, numbered
+                                 x * cols + y, padded with a line past the
+                                 last one.
+        counts (numpy.ndarray): Pieces of each player on every line of every
+                                game, with the padding line last.
+    """
+
+    def __init__(self, count, rows, cols, k=None, early_draw=True):
+        """
+        Initialize the games with all boxes empty.
+
+        Args:
+            count (int): Number of games.
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+            early_draw (bool): Whether to end a game once no line can be
+                               completed.
+
+        Raises:
+            ValueError: If the board is unbounded.
+        """
+        if UNBOUNDED in (rows, cols):
+            raise ValueError("[BOARD]: A batch of games needs a bounded board")
+        self.__count = count
+        self.__rows = rows
+        self.__cols = cols
+        self.__k = k if k is not None else default_k(rows, cols)
+        self.__early_draw = early_draw
+
+        windows, lines = line_windows(rows, cols, self.__k)
+        width = max(1, max(len(w) for w in windows))
+        self.__windows = np.full((rows * cols, width), lines, dtype=np.intp)
+        for box, w in enumerate(windows):
+            self.__windows[box, :len(w)] = w
+        self.__lines = lines
+
+        self.__state = np.full((count, rows, cols), EMPTY, dtype=np.uint8)
+        self.__over = np.zeros(count, dtype=bool)
+        self.__filled = np.zeros(count, dtype=np.int64)
+        self.__live = np.full(count, lines, dtype=np.int64)
+        self.__counts = np.zeros((count, lines + 1, 2), dtype=np.int32)
+
+
+    @property
+    def count(self):
+        """
+        Getter for count attribute.
+
+        Returns:
+            int: Number of games.
+        """
+        return self.__count
+
+
+    @property
+    def rows(self):
+        """
+        Getter for rows attribute.
+
+        Returns:
+            int: Number of rows.
+        """
+        return self.__rows
+
+
+    @property
+    def cols(self):
+        """
+        Getter for cols attribute.
+
+        Returns:
+            int: Number of columns.
+        """
+        return self.__cols
+
+
+    @property
+    def k(self):
+        """
+        Getter for k attribute.
+
+        Returns:
+            int: Pieces in a row needed to win.
+        """
+        return self.__k
+
+
+    @property
+    def state(self):
+        """
+        Getter for state attribute.
+
+        Returns:
+            numpy.ndarray: Boxes of every game, as bytes.
+        """
+        return self.__state
+
+
+    @property
+    def over(self):
+        """
+        Getter for over attribute.
+
+        Returns:
+            numpy.ndarray: Whether every game has ended.
+        """
+        return self.__over
+
+
+    @property
+    def filled(self):
+        """
+        Getter for filled attribute.
+
+        Returns:
+            numpy.ndarray: Pieces placed in every game.
+        """
+        return self.__filled
+
+
+    def get(self, game, x, y):
+        """
+        Piece in a box of a game.
+
+        Args:
+            game (int): Position of the game in the batch.
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            char: Piece symbol, or ' ' if the box is empty.
+        """
+        return chr(self.__state[game, x, y])
+
+
+    def reset(self, games=None):
+        """
+        Empty the boards of some games, so that a simulation starts new
+        games in the place of those that ended.
+
+        Args:
+            games (numpy.ndarray): Boolean mask or positions of the games,
+                                   None for all of them.
+        """
+        # A copy, as the mask may be the over attribute itself
+        games = slice(None) if games is None else np.array(games)
+        self.__state[games] = EMPTY
+        self.__over[games] = False
+        self.__filled[games] = 0
+        self.__live[games] = self.__lines
+        self.__counts[games] = 0
+
+
+    def play(self, xs, ys, pieces):
+        """
+        Place a piece in every game that has not ended, and check whether
+        each move ends its game.
+
+        Args:
+            xs (array_like): Horizontal coordinate of the move of every game.
+            ys (array_like): Vertical coordinate of the move of every game.
+            pieces (array_like | char): Piece of the move of every game, as
+                                        a byte, or one piece for all of
+                                        them.
+
+        Returns:
+            numpy.ndarray: Outcome of the move of every game: PLAYING, WON,
+                           STALEMATE, OCCUPIED, OUT_OF_BOARD or OVER.
+        """
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        if isinstance(pieces, str):
+            pieces = np.full(self.__count, ord(pieces), dtype=np.uint8)
+        pieces = np.asarray(pieces, dtype=np.uint8)
+        status = np.where(self.__over, OVER, PLAYING).astype(np.int8)
+
+        # Illegal moves leave their game untouched, as Board raises
+        out = (xs < 0) | (xs >= self.__rows) | (ys < 0) | (ys >= self.__cols)
+        status[~self.__over & out] = OUT_OF_BOARD
+        games = np.flatnonzero(status == PLAYING)
+        x, y = xs[games], ys[games]
+        taken = self.__state[games, x, y] != EMPTY
+        status[games[taken]] = OCCUPIED
+        games, x, y = games[~taken], x[~taken], y[~taken]
+
+        piece = pieces[games]
+        side = (piece == PIECES[1]).astype(np.intp)[:, None]
+        self.__state[games, x, y] = piece
+        self.__filled[games] += 1
+
+        # Every line through a box appears once per game, so the counts of
+        # the padding line are the only ones losing increments
+        lines = self.__windows[x * self.__cols + y]
+        real = lines != self.__lines
+        at = games[:, None]
+        self.__counts[at, lines, side] += 1
+        mine = self.__counts[at, lines, side]
+        won = ((mine >= self.__k) & real).any(axis=1)
+        if self.__early_draw:
+            theirs = self.__counts[at, lines, 1 - side]
+            self.__live[games] -= ((mine == 1) & (theirs > 0) & real).sum(axis=1)
+
+        full = self.__filled[games] == self.__rows * self.__cols
+        if self.__early_draw:
+            full |= self.__live[games] == 0
+        status[games[won]] = WON
+        status[games[~won & full]] = STALEMATE
+        self.__over[games[won | full]] = True
+        return status
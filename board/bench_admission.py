@@ -0,0 +1,138 @@
+import os
+import time
+import signal
+import logging
+import warnings
+import argparse
+import tempfile
+import protocol
+from stats import Stats
+from broker import Broker, PIECES
+from board import clog, flog
+from bench_transport import Client, make_transport
+
+
+STEP = 0.01             # Seconds between two waves of the storm
+
+
+def storm(transport, arrivals):
+    """
+    Fork a process that opens connections at a steady pace until it is
+    killed. Each one subscribes and leaves at once, as a crowd of players
+    giving up on a broker that is slow to pair them.
+
+    Args:
+        transport (Transport): Transport of the broker.
+        arrivals (int): Connections opened per second.
+
+    Returns:
+        int: Process id of the storm.
+    """
+    # The child only opens sockets, never taking a lock of the log thread
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        pid = os.fork()
+    if pid:
+        return pid
+    wave = max(1, int(arrivals * STEP))
+    turn = 0
+    while True:
+        start = time.monotonic()
+        for i in range(wave):
+            try:
+                sock = transport.connect()
+                sock.sendall(protocol.BINARY.subscribe(PIECES[turn % 2]))
+                sock.close()
+            except OSError:
+                pass
+            turn += 1
+        time.sleep(max(0, start + wave / arrivals - time.monotonic()))
+
+
+def run(transport, pairs, games, arrivals, rate, burst, max_connections):
+    """
+    Play games with fast client pairs while connections keep arriving from
+    another process, with a broker of this process under some admission
+    control. Players paired with an arrival of the storm lose their game as
+    soon as it leaves.
+
+    Args:
+        transport (Transport): Transport of the broker and clients.
+        pairs (int): Concurrent client pairs.
+        games (int): Games played by every client.
+        arrivals (int): Connections arriving per second.
+        rate (float): Connections per second a source may open, None for
+                      no limit.
+        burst (int): Connections a source may open at once.
+        max_connections (int): Connections held at once, None for no
+                               limit.
+
+    Returns:
+        tuple(float, list of int, dict): Seconds taken, sorted round-trip
+                                         times of the moves and counters
+                                         of the broker.
+    """
+    stats = Stats()
+    broker = Broker(3, 3, transport=transport, stats=stats, rate=rate, burst=burst,
+                    max_connections=max_connections)
+    broker.listen()
+    latencies = []
+    clients = [Client(transport, PIECES[i % 2], games, latencies) for i in range(2 * pairs)]
+    # The players are all in before the storm starts
+    while stats.counters["connections_accepted"] < len(clients):
+        broker.poll(0)
+    pid = storm(transport, arrivals)
+    start = time.perf_counter()
+    try:
+        while clients:
+            broker.poll(0)
+            for client in clients:
+                client.step()
+            clients = [client for client in clients if not client.done]
+    finally:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    elapsed = time.perf_counter() - start
+    broker.close()
+    return elapsed, sorted(latencies), stats.counters
+
+
+def main():
+    """
+    Main program. Play the same games while connections arrive in a storm,
+    with no admission control, with a rate per source and with a maximum of
+    connections, and report the round trip of the moves of the matches in
+    course, the moves they manage to play and what became of the
+    arrivals.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the broker under a connection storm")
+    parser.add_argument("--transport", choices=["tcp", "unix"], default="tcp",
+                        help="transport of the broker and clients")
+    parser.add_argument("--pairs", type=int, default=8, help="concurrent client pairs")
+    parser.add_argument("--games", type=int, default=100, help="games played by every client")
+    parser.add_argument("--arrivals", type=int, default=2000, help="connections arriving per second")
+    parser.add_argument("--rate", type=float, default=100.0, help="connections per second per source")
+    args = parser.parse_args()
+
+    clog.setLevel(logging.ERROR)
+    flog.setLevel(logging.ERROR)
+
+    # Every connection comes from the same address, so the burst lets the
+    # players in and the rate then only admits a trickle of the storm
+    runs = [("none", None, None), ("rate", args.rate, None), ("shed", None, 2 * args.pairs)]
+    print(f"{'admission':>10} {'moves/s':>9} {'p50 us':>8} {'p99 us':>8} {'p999 us':>8} "
+          f"{'admitted':>9} {'limited':>8} {'shed':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, rate, max_connections in runs:
+            transport = make_transport(args.transport, directory)
+            elapsed, latencies, counters = run(transport, args.pairs, args.games, args.arrivals,
+                                               rate, 2 * args.pairs, max_connections)
+            p50, p99, p999 = (latencies[min(len(latencies) - 1, int(q * len(latencies)))] / 1e3
+                              for q in (0.5, 0.99, 0.999))
+            print(f"{name:>10} {len(latencies) / elapsed:>9.0f} {p50:>8.1f} {p99:>8.1f} "
+                  f"{p999:>8.1f} {counters['connections_accepted']:>9} "
+                  f"{counters['connections_limited']:>8} {counters['connections_shed']:>8}")
+
+
+if __name__ == "__main__":
+    main()
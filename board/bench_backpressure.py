@@ -0,0 +1,148 @@
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import protocol
+from stats import Stats
+from broker import Broker, PIECES, BACKPRESSURE, MAX_OUTBOX
+from board import clog, flog
+from bench_transport import Client, make_transport
+
+
+class Watcher:
+    """
+    Spectator of the benchmark following every match. A stalled one never
+    reads, as a peer whose network went quiet: the broker queues its
+    events until the backpressure policy steps in.
+
+    Parameters:
+        transport (Transport): Transport of the broker.
+        stalled (bool): Whether the spectator never reads or reads as fast
+                        as it can.
+
+    Attributes:
+        sock (object): Non-blocking connection to the broker.
+        stalled (bool): Whether the spectator never reads.
+        received (int): Bytes read so far.
+    """
+
+    def __init__(self, transport, stalled):
+        """
+        Connect to the broker and spectate every match.
+
+        Args:
+            transport (Transport): Transport of the broker.
+            stalled (bool): Whether the spectator never reads.
+        """
+        self.__sock = transport.connect()
+        self.__sock.setblocking(False)
+        self.__stalled = stalled
+        self.__received = 0
+        self.__sock.sendall(protocol.BINARY.spectate(protocol.ANY_MATCH, protocol.ANY_PIECE))
+
+
+    def step(self):
+        """
+        Read the events that have arrived, unless stalled.
+        """
+        if self.__stalled:
+            return
+        try:
+            self.__received += len(self.__sock.recv(65536))
+        except (BlockingIOError, ConnectionError):
+            pass
+
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self.__sock.close()
+
+
+def run(transport, policy, max_outbox, pairs, games, watchers, stalled):
+    """
+    Play games with fast client pairs while spectators follow them, some of
+    them stalled, with a broker of this process under a backpressure
+    policy.
+
+    Args:
+        transport (Transport): Transport of the broker and clients.
+        policy (str): One of BACKPRESSURE.
+        max_outbox (int): Bytes queued for a slow consumer.
+        pairs (int): Concurrent client pairs.
+        games (int): Games played by every client.
+        watchers (int): Spectators reading as fast as they can.
+        stalled (int): Spectators never reading.
+
+    Returns:
+        tuple(float, list of int, dict, int): Seconds taken, sorted
+                                              round-trip times of the
+                                              moves, counters of the broker
+                                              and bytes left queued.
+    """
+    stats = Stats()
+    broker = Broker(3, 3, transport=transport, stats=stats, max_outbox=max_outbox,
+                    backpressure=policy)
+    broker.listen()
+    spectators = [Watcher(transport, i < stalled) for i in range(watchers + stalled)]
+    broker.poll(0)
+    latencies = []
+    start = time.perf_counter()
+    clients = [Client(transport, PIECES[i % 2], games, latencies) for i in range(2 * pairs)]
+    while clients:
+        broker.poll(0)
+        for client in clients:
+            client.step()
+        for spectator in spectators:
+            spectator.step()
+        clients = [client for client in clients if not client.done]
+    elapsed = time.perf_counter() - start
+    queued = stats.gauges["bytes_queued"]()
+    for spectator in spectators:
+        spectator.close()
+    broker.close()
+    return elapsed, sorted(latencies), stats.counters, queued
+
+
+def main():
+    """
+    Main program. Play the same games under every backpressure policy, and
+    with no bound at all, while stalled spectators stop reading. Report
+    the round trip of the moves, the messages written per system call and
+    the bytes left queued: without a bound, the stalled spectators hold on
+    to every event of every match.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the broker with slow consumers")
+    parser.add_argument("--transport", choices=["tcp", "unix", "socketpair"], default="unix",
+                        help="transport of the broker and clients")
+    parser.add_argument("--pairs", type=int, default=16, help="concurrent client pairs")
+    parser.add_argument("--games", type=int, default=200, help="games played by every client")
+    parser.add_argument("--watchers", type=int, default=16, help="spectators reading every event")
+    parser.add_argument("--stalled", type=int, default=16, help="spectators never reading")
+    parser.add_argument("--max-outbox", type=int, default=MAX_OUTBOX,
+                        help="bytes queued for a slow consumer")
+    args = parser.parse_args()
+
+    clog.setLevel(logging.ERROR)
+    flog.setLevel(logging.ERROR)
+
+    runs = [(policy, args.max_outbox) for policy in BACKPRESSURE] + [("unbounded", sys.maxsize)]
+    print(f"{'policy':>10} {'games/s':>9} {'p50 us':>8} {'p99 us':>8} {'p999 us':>8} "
+          f"{'msgs/write':>10} {'dropped':>8} {'queued KB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, max_outbox in runs:
+            policy = "drop" if name == "unbounded" else name
+            transport = make_transport(args.transport, directory)
+            elapsed, latencies, counters, queued = run(transport, policy, max_outbox, args.pairs,
+                                                       args.games, args.watchers, args.stalled)
+            p50, p99, p999 = (latencies[min(len(latencies) - 1, int(q * len(latencies)))] / 1e3
+                              for q in (0.5, 0.99, 0.999))
+            print(f"{name:>10} {args.pairs * args.games / elapsed:>9.0f} {p50:>8.1f} {p99:>8.1f} "
+                  f"{p999:>8.1f} {counters['messages_queued'] / max(1, counters['write_calls']):>10.1f} "
+                  f"{counters['slow_consumers']:>8} {queued / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import time
+import random
+import argparse
+import numpy as np
+from board import Board
+from batch import BatchBoard, PLAYING, WON, STALEMATE, OCCUPIED, OUT_OF_BOARD, OVER
+from exceptions import StaleMateException, OccupiedException, OutOfBoardException
+
+# Board geometries measured: (rows, cols, k)
+SIZES = [(3, 3, 3), (7, 7, 4), (15, 15, 5)]
+ILLEGAL = 0.1           # Share of the moves on a taken box or off the board
+
+
+def random_moves(rows, cols, count, seed=0):
+    """
+    Generate random games, the same ones for both ways of playing them. The
+    players take turns on the free boxes in a random order, and now and
+    then try a box that is taken or off the board, which does not end the
+    turn.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        count (int): Number of games.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        numpy.ndarray: Moves as (turn, game, [x, y, piece]), the last
+                       ones of the shorter games repeated.
+    """
+    rng = random.Random(seed)
+    boxes = [(x, y) for x in range(rows) for y in range(cols)]
+    games = []
+    for i in range(count):
+        order = boxes[:]
+        rng.shuffle(order)
+        moves = []
+        for n, (x, y) in enumerate(order):
+            while n and rng.random() < ILLEGAL:
+                bad = rng.choice(order[:n]) if rng.random() < 0.5 else (rows, rng.randrange(-1, cols))
+                moves.append((*bad, ord("OX"[n % 2])))
+            moves.append((x, y, ord("OX"[n % 2])))
+        games.append(moves)
+    turns = max(len(moves) for moves in games)
+    return np.array([moves + moves[-1:] * (turns - len(moves)) for moves in games],
+                    dtype=np.int64).transpose(1, 0, 2)
+
+
+def play_boards(rows, cols, k, moves):
+    """
+    Play the games one Board at a time.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        moves (numpy.ndarray): Moves of every game, from random_moves().
+
+    Returns:
+        tuple(float, list of list): Seconds taken and outcome of the moves
+                                    of every game, up to its end.
+    """
+    games = [moves[:, game].tolist() for game in range(moves.shape[1])]
+    outcomes = []
+    start = time.perf_counter()
+    for game in games:
+        board = Board(rows, cols, k)
+        played = []
+        for x, y, piece in game:
+            try:
+                played.append(WON if board.play(x, y, chr(piece)) else PLAYING)
+            except OccupiedException:
+                played.append(OCCUPIED)
+            except OutOfBoardException:
+                played.append(OUT_OF_BOARD)
+            except StaleMateException:
+                played.append(STALEMATE)
+            if played[-1] in (WON, STALEMATE):
+                break
+        outcomes.append(played)
+    return time.perf_counter() - start, outcomes
+
+
+def play_batch(rows, cols, k, moves):
+    """
+    Play the games as one batch, a move of every game at a time.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        moves (numpy.ndarray): Moves of every game, from random_moves().
+
+    Returns:
+        tuple(float, list of list): Seconds taken and outcome of the moves
+                                    of every game, up to its end.
+    """
+    start = time.perf_counter()
+    batch = BatchBoard(moves.shape[1], rows, cols, k)
+    turns = []
+    for turn in moves:
+        turns.append(batch.play(turn[:, 0], turn[:, 1], turn[:, 2]))
+        if batch.over.all():
+            break
+    elapsed = time.perf_counter() - start
+    outcomes = np.array(turns).T
+    return elapsed, [[int(o) for o in game if o != OVER] for game in outcomes]
+
+
+def main():
+    """
+    Main program. Play the same random games with a Board per game and as a
+    batch, check that every move has the same outcome both ways, and
+    report the games per second of each and the speedup.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the batch game evaluator")
+    parser.add_argument("--games", type=int, default=20000, help="games per 3x3 measure")
+    args = parser.parse_args()
+
+    print(f"{'size':>12} {'games':>7} {'Board/s':>9} {'batch/s':>9} {'speedup':>8} {'same':>5}")
+    for rows, cols, k in SIZES:
+        # Fewer games on larger boards, so every size takes a similar time
+        count = max(100, args.games * 9 // (rows * cols))
+        moves = random_moves(rows, cols, count)
+        looped, expected = play_boards(rows, cols, k, moves)
+        batched, outcomes = play_batch(rows, cols, k, moves)
+        print(f"{f'{rows}x{cols} k={k}':>12} {count:>7} {count / looped:>9.0f} "
+              f"{count / batched:>9.0f} {looped / batched:>7.1f}x {str(outcomes == expected):>5}")
+
+
+if __name__ == "__main__":
+    main()
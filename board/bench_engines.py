@@ -0,0 +1,117 @@
+import time
+import random
+import argparse
+import tracemalloc
+from board import Board
+from rules import ENGINES, line_masks
+from exceptions import StaleMateException
+
+# Board geometries measured: (rows, cols, k)
+SIZES = [(3, 3, 3), (15, 15, 5), (100, 100, 5)]
+
+
+def random_games(rows, cols, count, seed=0):
+    """
+    Generate random move orders, the same ones for every engine.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        count (int): Number of games.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        list: One shuffled list of (x, y) boxes per game.
+    """
+    rng = random.Random(seed)
+    boxes = [(x, y) for x in range(rows) for y in range(cols)]
+    games = []
+    for i in range(count):
+        order = boxes[:]
+        rng.shuffle(order)
+        games.append(order)
+    return games
+
+
+def memory_per_game(engine, rows, cols, k, count, moves):
+    """
+    Measure the memory held by a game after a number of moves.
+
+    Args:
+        engine (str): State engine.
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        count (int): Number of boards kept alive for the measure.
+        moves (int): Moves played on every board.
+
+    Returns:
+        float: Bytes per game.
+    """
+    # Warm the caches shared by all the games of the same geometry
+    line_masks(rows, cols, k)
+    order = random_games(rows, cols, 1)[0][:moves]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = []
+    for i in range(count):
+        board = Board(rows, cols, k, engine)
+        for n, (x, y) in enumerate(order):
+            board.play(x, y, "OX"[n % 2])
+        boards.append(board)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+def moves_per_second(engine, rows, cols, k, games):
+    """
+    Play whole games until they end and measure the move rate.
+
+    Args:
+        engine (str): State engine.
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        games (list): Move orders to play.
+
+    Returns:
+        float: Moves per second.
+    """
+    moves = 0
+    start = time.perf_counter()
+    for order in games:
+        board = Board(rows, cols, k, engine)
+        try:
+            for n, (x, y) in enumerate(order):
+                moves += 1
+                if board.play(x, y, "OX"[n % 2]):
+                    break
+        except StaleMateException:
+            pass
+    return moves / (time.perf_counter() - start)
+
+
+def main():
+    """
+    Main program. Report memory per game and moves per second of every
+    state engine on every board size.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the board state engines")
+    parser.add_argument("--games", type=int, default=2000, help="games played per 3x3 measure")
+    args = parser.parse_args()
+
+    print(f"{'size':>12} {'engine':>9} {'bytes/game':>11} {'moves/s':>11}")
+    for rows, cols, k in SIZES:
+        # Fewer games on larger boards, so every size takes a similar time
+        count = max(10, args.games * 9 // (rows * cols))
+        games = random_games(rows, cols, count)
+        for engine in ENGINES:
+            memory = memory_per_game(engine, rows, cols, k, count, min(rows * cols, 4 * k))
+            rate = moves_per_second(engine, rows, cols, k, games)
+            print(f"{f'{rows}x{cols} k={k}':>12} {engine:>9} {memory:>11.0f} {rate:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
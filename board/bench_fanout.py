@@ -0,0 +1,226 @@
+import os
+import time
+import socket
+import logging
+import argparse
+import selectors
+import threading
+import protocol
+from broker import Broker
+from board import clog, flog
+from topics import TopicRegistry
+
+# Moves of a game won by the first player: it plays the top row while the
+# second one plays the middle row
+FIRST = [(0, 0), (0, 1), (0, 2)]
+SECOND = [(1, 0), (1, 1)]
+EVENTS_PER_GAME = 1 + len(FIRST) + len(SECOND)
+
+UPDATE_SIZE = protocol.HEADER.size + protocol.SIZES[protocol.OP_UPDATE]
+
+
+class Subscriber:
+    """
+    Stand-in for a connection in the registry benchmark.
+
+    Attributes:
+        codec (BinaryCodec): Protocol of the subscriber.
+    """
+
+    __slots__ = ("codec",)
+
+    def __init__(self, codec):
+        """
+        Initialize the subscriber.
+
+        Args:
+            codec (BinaryCodec): Protocol of the subscriber.
+        """
+        self.codec = codec
+
+
+def registry(spectators, count):
+    """
+    Measure the cost of delivering an event to the subscribers of a match,
+    encoding it once as the registry does and once per recipient.
+
+    Args:
+        spectators (int): Subscribers of the match.
+        count (int): Events published.
+
+    Returns:
+        tuple(float, float): Nanoseconds per recipient of both ways.
+    """
+    topics = TopicRegistry()
+    for i in range(spectators):
+        topics.subscribe(0, protocol.ANY_PIECE, Subscriber(protocol.BINARY))
+    outbox = []
+    send = lambda conn, data: outbox.append(data)
+
+    start = time.perf_counter_ns()
+    for i in range(count):
+        topics.publish(0, 'O', lambda codec: codec.update(0, protocol.PLACED, 'O', 1, 2), send)
+        outbox.clear()
+    shared = (time.perf_counter_ns() - start) / (count * spectators)
+
+    start = time.perf_counter_ns()
+    for i in range(count):
+        for conn in topics.subscribers(0, 'O'):
+            send(conn, conn.codec.update(0, protocol.PLACED, 'O', 1, 2))
+        outbox.clear()
+    copied = (time.perf_counter_ns() - start) / (count * spectators)
+    return shared, copied
+
+
+def connect(address, request):
+    """
+    Open a blocking connection to the broker and wait for the confirmation
+    of a subscribe or spectate request.
+
+    Args:
+        address (tuple(str, int)): Address of the broker.
+        request (bytes): Encoded request.
+
+    Returns:
+        socket.socket: Connected socket.
+    """
+    sock = socket.create_connection(address)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(request)
+    expect(sock, 1)
+    return sock
+
+
+def expect(sock, frames):
+    """
+    Read a number of frames from a blocking socket, whatever they carry.
+
+    Args:
+        sock (socket.socket): Connected socket.
+        frames (int): Frames to read.
+    """
+    decoder = protocol.BinaryDecoder()
+    while frames > 0:
+        data = sock.recv(4096)
+        if not data:
+            raise ConnectionError("Connection closed by the broker")
+        frames -= len(decoder.feed(data))
+
+
+def connect_first(address):
+    """
+    Connect the player that waits in the lobby, without waiting for the
+    confirmation that only comes once the match starts.
+
+    Args:
+        address (tuple(str, int)): Address of the broker.
+
+    Returns:
+        socket.socket: Connected socket.
+    """
+    sock = socket.create_connection(address)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(protocol.BINARY.subscribe('X'))
+
+    # Give the broker time to put the player in the lobby first
+    time.sleep(0.005)
+    return sock
+
+
+def play(address, games):
+    """
+    Play a number of identical games, one after the other.
+
+    Args:
+        address (tuple(str, int)): Address of the broker.
+        games (int): Games to play.
+    """
+    codec = protocol.BINARY
+    for i in range(games):
+        first = connect_first(address)
+        second = connect(address, codec.subscribe('O'))
+        expect(first, 1)
+
+        # Every move is acknowledged to its player and shown to the other
+        for turn in range(len(FIRST) + len(SECOND)):
+            mover, other = (first, second) if turn % 2 == 0 else (second, first)
+            x, y = (FIRST if turn % 2 == 0 else SECOND)[turn // 2]
+            mover.sendall(codec.move('O' if turn % 2 == 0 else 'X', x, y))
+            expect(mover, 1)
+            expect(other, 1)
+        first.close()
+        second.close()
+
+
+def broker(address, spectators, games):
+    """
+    Measure the fan-out of a live broker: spectators follow every match
+    while a pair of players plays the games.
+
+    Args:
+        address (tuple(str, int)): Address of the broker.
+        spectators (int): Spectators connected.
+        games (int): Games played.
+
+    Returns:
+        tuple(int, float): Updates delivered and seconds taken.
+    """
+    selector = selectors.DefaultSelector()
+    socks = [connect(address, protocol.BINARY.spectate(protocol.ANY_MATCH, protocol.ANY_PIECE))
+             for i in range(spectators)]
+    for sock in socks:
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+
+    # Drain the spectators while the players run in their own thread
+    expected = spectators * games * EVENTS_PER_GAME * UPDATE_SIZE
+    received = 0
+    start = time.perf_counter()
+    players = threading.Thread(target=play, args=(address, games), daemon=True)
+    players.start()
+    while received < expected:
+        for key, mask in selector.select():
+            received += len(key.fileobj.recv(65536))
+    elapsed = time.perf_counter() - start
+
+    players.join()
+    for sock in socks:
+        sock.close()
+    selector.close()
+    return received // UPDATE_SIZE, elapsed
+
+
+def main():
+    """
+    Main program. Report the cost per recipient of the registry fan-out,
+    and the updates per second a broker delivers to hundreds of spectators.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the spectator fan-out")
+    parser.add_argument("--spectators", type=int, nargs="+", default=[100, 300, 500],
+                        help="spectators per game")
+    parser.add_argument("--games", type=int, default=20, help="games played per measure")
+    parser.add_argument("--count", type=int, default=200, help="events per registry measure")
+    args = parser.parse_args()
+
+    clog.setLevel(logging.WARNING)
+    flog.setLevel(logging.WARNING)
+
+    # The broker reads its address from the environment, like in a container
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    os.environ["SERVER_NAME"] = "127.0.0.1"
+    os.environ["SERVER_PORT"] = str(port)
+    threading.Thread(target=Broker(3, 3).serve, daemon=True).start()
+    time.sleep(0.2)
+
+    print(f"{'spectators':>10} {'shared ns':>10} {'copied ns':>10} {'updates':>9} {'updates/s':>10}")
+    for spectators in args.spectators:
+        shared, copied = registry(spectators, args.count)
+        updates, elapsed = broker(("127.0.0.1", port), spectators, args.games)
+        print(f"{spectators:>10} {shared:>10.0f} {copied:>10.0f} {updates:>9} {updates / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
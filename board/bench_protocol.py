@@ -0,0 +1,57 @@
+import time
+import argparse
+import protocol
+
+# Messages of a typical move: the publish and the two notifications
+MESSAGES = [
+    ("move", ('O', 1, 2), "server"),
+    ("ack", (1, 2), "client"),
+    ("adversary_move", ('O', 1, 2), "client"),
+]
+
+
+def per_message(function, count):
+    """
+    Measure the average time of a call.
+
+    Args:
+        function (callable): Function to call without arguments.
+        count (int): Number of calls.
+
+    Returns:
+        float: Nanoseconds per call.
+    """
+    start = time.perf_counter_ns()
+    for i in range(count):
+        function()
+    return (time.perf_counter_ns() - start) / count
+
+
+def main():
+    """
+    Main program. Report the encode and decode time per message of every
+    codec, decoding each message as a separate chunk like a socket would
+    deliver it.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the wire protocols")
+    parser.add_argument("--count", type=int, default=200000, help="messages per measure")
+    args = parser.parse_args()
+
+    print(f"{'message':>15} {'codec':>7} {'bytes':>6} {'encode ns':>10} {'decode ns':>10}")
+    for name, fields, side in MESSAGES:
+        for codec in protocol.CODECS.values():
+            encode = getattr(codec, name)
+            data = encode(*fields)
+
+            # The text decoder of the board expects the subscribe first
+            decoder = codec.server_decoder() if side == "server" else codec.client_decoder()
+            if side == "server":
+                decoder.feed(codec.subscribe('X'))
+
+            encode_ns = per_message(lambda: encode(*fields), args.count)
+            decode_ns = per_message(lambda: decoder.feed(data), args.count)
+            print(f"{name:>15} {codec.name:>7} {len(data):>6} {encode_ns:>10.0f} {decode_ns:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
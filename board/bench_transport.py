@@ -0,0 +1,210 @@
+import os
+import time
+import logging
+import argparse
+import tempfile
+import protocol
+from broker import Broker, ADVERSARY, PIECES
+from board import clog, flog
+from transport import TRANSPORTS, TcpTransport, UnixTransport, PairTransport, MemoryTransport
+
+
+def make_transport(name, directory):
+    """
+    Build a transport of the benchmark.
+
+    Args:
+        name (str): One of TRANSPORTS.
+        directory (str): Directory for the Unix domain socket.
+
+    Returns:
+        Transport: New transport, on a free port or path.
+    """
+    if name == "tcp":
+        return TcpTransport("127.0.0.1", 0)
+    if name == "unix":
+        return UnixTransport(os.path.join(directory, "board.sock"))
+    if name == "socketpair":
+        return PairTransport()
+    return MemoryTransport()
+
+
+class Client:
+    """
+    Non-blocking player of the benchmark, stepped by the loop that also
+    polls the broker. It plays a number of games in a row on one
+    connection, always taking the first free box, and times the round trip
+    of every move. The broker pairs the clients as they come, so the
+    adversary changes from game to game.
+
+    Parameters:
+        transport (Transport): Transport of the broker.
+        piece (char): Piece of the client.
+        games (int): Games to play.
+        latencies (list): List to append round-trip times to, in ns.
+
+    Attributes:
+        sock (object): Non-blocking connection to the broker.
+        decoder (BinaryDecoder): Decoder of the broker's messages.
+        games (int): Games left to play.
+        boxes (list of tuple(int, int)): Boxes of the board, in the order
+                                         they are taken.
+        taken (set of tuple(int, int)): Boxes taken in the current game.
+        sent (int): Time the pending move was sent at, None if there is
+                    none.
+        done (bool): Whether every game is over or not.
+    """
+
+    def __init__(self, transport, piece, games, latencies):
+        """
+        Connect to the broker and subscribe for the first game.
+
+        Args:
+            transport (Transport): Transport of the broker.
+            piece (char): Piece of the client.
+            games (int): Games to play.
+            latencies (list): List to append round-trip times to.
+        """
+        self.__codec = protocol.BINARY
+        self.__sock = transport.connect()
+        self.__sock.setblocking(False)
+        self.__decoder = self.__codec.client_decoder()
+        self.__piece = piece
+        self.__games = games
+        self.__latencies = latencies
+        self.__boxes = []
+        self.__taken = set()
+        self.__sent = None
+        self.__done = False
+        self.__sock.sendall(self.__codec.subscribe(ADVERSARY[piece]))
+
+
+    @property
+    def done(self):
+        """
+        Getter for done attribute.
+
+        Returns:
+            bool: True if every game is over; False otherwise.
+        """
+        return self.__done
+
+
+    def step(self):
+        """
+        Handle the messages of the broker that have arrived, if any.
+
+        Raises:
+            ConnectionError: If the broker closes the connection.
+        """
+        try:
+            data = self.__sock.recv(4096)
+        except BlockingIOError:
+            return
+        if not data:
+            raise ConnectionError("Connection closed by the broker")
+        for message in self.__decoder.feed(data):
+            self.__handle(message)
+
+
+    def __handle(self, message):
+        """
+        React to a message of the broker.
+
+        Args:
+            message (tuple): Decoded message, opcode first.
+        """
+        opcode = message[0]
+        if self.__sent is not None and opcode in (protocol.OP_ACK, protocol.OP_GAME_OVER):
+            self.__latencies.append(time.perf_counter_ns() - self.__sent)
+            self.__sent = None
+
+        if opcode == protocol.OP_SUBSCRIBED:
+            _, _, turn, rows, cols, k, match, token = message
+            self.__boxes = [(x, y) for x in range(rows) for y in range(cols)]
+            self.__taken.clear()
+            if turn == 0:
+                self.__move()
+        elif opcode == protocol.OP_ACK:
+            self.__taken.add((message[1], message[2]))
+        elif opcode == protocol.OP_ADVERSARY_MOVE:
+            self.__taken.add((message[2], message[3]))
+            self.__move()
+        elif opcode == protocol.OP_GAME_OVER:
+            self.__games -= 1
+            if self.__games:
+                self.__sock.sendall(self.__codec.subscribe(ADVERSARY[self.__piece]))
+            else:
+                self.__done = True
+                self.__sock.close()
+
+
+    def __move(self):
+        """
+        Take the first free box.
+        """
+        x, y = next(box for box in self.__boxes if box not in self.__taken)
+        self.__sent = time.perf_counter_ns()
+        self.__sock.sendall(self.__codec.move(self.__piece, x, y))
+
+
+def run(transport, pairs, games):
+    """
+    Serve the games of a number of client pairs with a broker of this
+    process, polling the broker and stepping the clients in turns from a
+    single thread: no thread switch nor lock is measured, only the broker
+    and the transport.
+
+    Args:
+        transport (Transport): Transport of the broker and clients.
+        pairs (int): Concurrent client pairs.
+        games (int): Games played by every client.
+
+    Returns:
+        tuple(float, list of int): Seconds taken and sorted round-trip
+                                   times of the moves.
+    """
+    broker = Broker(3, 3, transport=transport)
+    broker.listen()
+    latencies = []
+    start = time.perf_counter()
+    clients = [Client(transport, PIECES[i % 2], games, latencies) for i in range(2 * pairs)]
+    while clients:
+        broker.poll(0)
+        for client in clients:
+            client.step()
+        clients = [client for client in clients if not client.done]
+    elapsed = time.perf_counter() - start
+    broker.close()
+    return elapsed, sorted(latencies)
+
+
+def main():
+    """
+    Main program. Play the same games over every transport, each with a
+    broker and clients in this process, and report the throughput and the
+    round trip of the moves: the differences are the cost of the transport.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the broker over every transport")
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS),
+                        help="transports to measure")
+    parser.add_argument("--pairs", type=int, default=8, help="concurrent client pairs")
+    parser.add_argument("--games", type=int, default=200, help="games played by every client")
+    args = parser.parse_args()
+
+    clog.setLevel(logging.WARNING)
+    flog.setLevel(logging.WARNING)
+
+    print(f"{'transport':>10} {'games':>7} {'games/s':>9} {'moves/s':>9} {'p50 us':>8} {'p99 us':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.transports:
+            elapsed, latencies = run(make_transport(name, directory), args.pairs, args.games)
+            games = args.pairs * args.games
+            p50 = latencies[len(latencies) // 2] / 1e3
+            p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] / 1e3
+            print(f"{name:>10} {games:>7} {games / elapsed:>9.0f} {len(latencies) / elapsed:>9.0f} "
+                  f"{p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
-import socket
 import os
-import json
+import sys
+import time
+import signal
+import argparse
+import protocol
 import logger_config
-from exceptions import StaleMateException
-from datetime import datetime
+from collections import deque
+from exceptions import StaleMateException, OccupiedException, OutOfBoardException
+from rules import ENGINES, Game, SparseEngine, default_k, WON, STALEMATE, OCCUPIED, OUT_OF_BOARD
+from view import ConsoleView, WINDOW
+from transport import default_transport
 
-LOG_FILE_PATH = f"/tmp/{os.getenv("SERVER_NAME")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log"
+RECV_SIZE = 4096
+
+LOG_FILE_PATH = f"/tmp/{os.getenv("SERVER_NAME")}.log"
 
 flog = logger_config.get_file_logger(LOG_FILE_PATH, logger_config.logging.INFO)
 clog = logger_config.get_console_logger(logger_config.logging.INFO)
@@ -16,14 +24,33 @@ class Board():
     the players after a publisher-subscriber fashion.
 
     Parameters:
-        rows (int): Number of rows of the board.
-        cols (int): Number of columns of the board.
+        rows (int): Number of rows of the board, protocol.UNBOUNDED for a
+                    board without top nor bottom edge.
+        cols (int): Number of columns of the board, protocol.UNBOUNDED for a
+                    board without left nor right edge.
+        k (int): Pieces in a row needed to win. Defaults to the shortest
+                 side, which means completing a line on a square board, or
+                 five in a row on an unbounded one.
+        engine (str): Representation of the game state, one of the keys of
+                      rules.ENGINES: 'grid' (list of lists), 'bitboard'
+                      (one integer mask per piece), 'packed' (byte array,
+                      for large boards) or 'sparse' (hash map of the pieces,
+                      for huge and unbounded boards).
+        early_draw (bool): Whether the game ends in a stalemate as soon as
+                           no line can be completed, rather than once the
+                           board is full.
+        stats (Stats): Latency histograms where the placement and the end
+                       condition check of every move are recorded, None not
+                       to time them.
+        transport (Transport): Way the players connect when the board serves
+                               its own game; the one of the environment by
+                               default.
 
     Attributes:
         rows (int): Number of rows of the board.
         cols (int): Number of columns of the board.
-        board (2D char list (rows x cols)): Matrix-like structure that holds
-                                            the current state of the game.
+        k (int): Pieces in a row needed to win.
+        game (Game): Rules and current state of the game.
 
         topics (dict {'char': tuple(str, str)}): Topics which the players may
                                                  publish or subscribe to. The 
@@ -32,133 +59,124 @@ class Board():
                                                  addresses of the players 
                                                  subscribed to each piece.
 
+        transport (Transport): Way the players connect.
         socket (socket.socket): Socket for communication with the players.
+                                Only created when the board serves its own
+                                game, so boards hosted by a broker hold no
+                                file descriptor.
     """
 
-    def __init__(self, rows, cols):
+    def __init__(self, rows, cols, k=None, engine="grid", early_draw=True, stats=None,
+                 transport=None):
         """
-        Initialize the Board with its dimension, with all boxes empty and
-        create the socket.
+        Initialize the Board with its dimension, with all boxes empty.
 
         Args:
             rows (int): Number of rows.
             cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+            engine (str): Name of the state engine.
+            early_draw (bool): Whether to end the game once no line can be
+                               completed.
+            stats (Stats): Latency histograms of the moves.
+            transport (Transport): Way the players connect.
+
+        Raises:
+            ValueError: If the board is unbounded and the engine is not
+                        sparse.
         """
-        self.__rows = rows
-        self.__cols = cols
-        self.__board = [[' ' for i in range(0, self.__cols)] for i in range(0, self.__rows)]
+        self.__game = Game(rows, cols, k, engine, early_draw)
         self.__topics = {}
-        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__transport = transport
+        self.__socket = None
+        self.__stats = stats
 
     
-    def __str__(self):
+    @property
+    def rows(self):
         """
-        String representation of the board.
+        Getter for rows attribute.
 
         Returns:
-            str: Basic but useful graphic interface for the terminal.
-        """
-        s = ""
-        for row in range(self.__rows):
-            hor_div = "\n-" + "----" * self.__cols + "\n"
-            s += hor_div + "| "
-            for col in range(self.__cols):
-                s += self.__board[row][col] + " | "
-        s += hor_div
-        return s
-    
-    
-    def __out(self, x, y):
+            int: Number of rows of the board, protocol.UNBOUNDED if it has
+                 no edge.
         """
-        Check if a position is outside of the board.
+        return self.__game.rows
 
-        Args:
-            x (int): Horizontal coordinate.
-            y (int): Vertical coordinate.
 
-        Returns:
-            bool: True if the position is outside the board; False otherwise.
+    @property
+    def cols(self):
         """
-        return x >= self.__cols or y >= self.__rows
-    
-    
-    def __empty(self, x, y):
-        """
-        Check whether a box is empty or not.
-
-        Args:
-            x (int): Horizontal coordinate.
-            y (int): Vertical coordinate.
-
-        Raises:
-            IndexError: If the box is outside the board.
+        Getter for cols attribute.
 
         Returns:
-            bool: True if the character in the box is ' '; False otherwise.
+            int: Number of columns of the board, protocol.UNBOUNDED if it
+                 has no edge.
         """
-        if self.__out(x, y):
-            raise IndexError(f"[BOARD]: Position [{x},{y}]: OUT OF BOARD")
-        return self.__board[x][y] == ' '
-    
-    
-    def __check_horizontal_vertical(self):
+        return self.__game.cols
+
+
+    @property
+    def k(self):
         """
-        Check victory condition based on row or column completion,
-        but no diagonal.
+        Getter for k attribute.
 
         Returns:
-            bool: True if a row or column is completely filled with the same
-                  kind of piece; False otherwise.
+            int: Pieces in a row needed to win.
         """
-        for i in range(0, self.__rows):
-            # Horizontal check
-            if not self.__empty(i, 0) and all(x == self.__board[i][0] for x in self.__board[i]):
-                return True
-            
-            # Vertical check
-            col = [row[i] for row in self.__board]
-            if not self.__empty(0, i) and all(x == col[0] for x in col):
-               return True
-        return False
-    
-    
-    def __check_main_diagonal(self):
+        return self.__game.k
+
+
+    def __str__(self):
         """
-        Check victory condition based on main diagonal completion.
+        String representation of the board.
 
         Returns:
-            bool: True if the main diagonal is completely filled with the same
-                  kind of piece; False otherwise.
+            str: Basic but useful graphic interface for the terminal. An
+                 unbounded board is drawn up to the outermost pieces.
         """
-        return self.__board[0][0] != ' ' and all(self.__board[0][0] == self.__board[i][i] for i in range (1, self.__rows))
-    
-    
-    def __check_anti_diagonal(self):
+        if protocol.UNBOUNDED in (self.rows, self.cols):
+            top, left, bottom, right = self.__game.state.bounds or (0, 0, -1, -1)
+            return self.render(top, left, bottom - top + 1, right - left + 1)
+        return self.render()
+
+
+    def render(self, top=0, left=0, height=None, width=None):
         """
-        Check victory condition based on anti diagonal completion.
+        Draw a rectangular window of the board, in the same style as the
+        whole board is drawn. The text is built in a single join, so its
+        cost is linear in the boxes of the window, whatever the size of the
+        board.
+
+        Args:
+            top (int): First row of the window.
+            left (int): First column of the window.
+            height (int): Rows of the window; up to the last one if None,
+                          which an unbounded board does not have.
+            width (int): Columns of the window; up to the last one if None,
+                         which an unbounded board does not have.
 
         Returns:
-            bool: True if the anti diagonal is completely filled with the same
-                  kind of piece; False otherwise.
+            str: Drawing of the window.
         """
-        if self.__empty(0, self.__cols - 1):
-            return False
-        
-        # Start on top-right corner
-        j = self.__cols - 1
-        piece = self.__board[0][j]
-
-        # Each iteration increase row by one and decrease column by one
-        for i in range(self.__rows):
-            if self.__board[i][j] != piece:
-                return False
-            j -= 1
-        return True
+        state = self.__game.state
+        bottom = self.rows if height is None else min(self.rows, top + height)
+        right = self.cols if width is None else min(self.cols, left + width)
+        if isinstance(state, SparseEngine):
+            boxes = state.window(top, left, bottom - top, right - left)
+        else:
+            get = state.get
+            boxes = [[get(row, col) for col in range(left, right)] for row in range(top, bottom)]
+        hor_div = "\n-" + "----" * (right - left) + "\n"
+        lines = [hor_div + "| " + " | ".join(row) + " | " for row in boxes]
+        lines.append(hor_div)
+        return "".join(lines)
     
     
     def __place(self, x, y, piece):
         """
-        Place a piece in a certain box on the board.
+        Place a piece in a certain box on the board, by the rules of the
+        game.
 
         Args:
             x (int): Horizontal coordinate.
@@ -166,40 +184,118 @@ class Board():
             piece (char): Piece symbol.
 
         Raises:
-            IndexError: If the box is already occupied.
+            OccupiedException: If the box is already occupied.
+            OutOfBoardException: If the box is outside the board.
         """
-        if not self.__empty(x, y):
-            raise IndexError(f"[BOARD]: Position [{x},{y}]: OCCUPIED")
-        self.__board[x][y] = piece
+        placed = self.__game.place(x, y, piece)
+        if placed == OUT_OF_BOARD:
+            raise OutOfBoardException(f"[BOARD]: Position [{x},{y}]: OUT OF BOARD")
+        if placed == OCCUPIED:
+            raise OccupiedException(f"[BOARD]: Position [{x},{y}]: OCCUPIED")
 
 
     def __end_condition(self):
         """
         Check all victory or stalemate conditions to determine whether the
-        game has ended.
+        game has ended, by the rules of the game.
 
         Raises:
-            StaleMateException: If all boxes are filled but no victory
+            StaleMateException: If all boxes are filled, or no line can be
+                                completed any more, but no victory
                                 condition has been achieved.
 
         Returns:
             bool: True if victory condition is achieved; False otherwise.
         """
-        if all(not self.__empty(i, j) for i in range(0, self.__rows) for j in range(self.__cols)):
+        outcome = self.__game.outcome()
+        if outcome != STALEMATE:
+            return outcome == WON
+        if self.__game.state.filled == self.rows * self.cols:
             raise StaleMateException("[BOARD]: STALEMATE: END OF GAME")
-
-        return self.__check_horizontal_vertical() or self.__check_main_diagonal() \
-            or self.__check_anti_diagonal()
+        raise StaleMateException("[BOARD]: STALEMATE: NO LINE LEFT TO COMPLETE")
     
     
-    def serve(self):
+    def play(self, x, y, piece):
+        """
+        Place a piece and check whether the move ends the game. Public entry
+        point to the game rules for brokers hosting several boards.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Raises:
+            OccupiedException: If the box is already occupied.
+            OutOfBoardException: If the box is outside the board.
+            StaleMateException: If all boxes are filled, or no line can be
+                                completed any more, but no victory
+                                condition has been achieved.
+
+        Returns:
+            bool: True if the move wins the game; False otherwise.
+        """
+        if self.__stats is None:
+            self.__place(x, y, piece)
+            return self.__end_condition()
+
+        # Rejected and final moves are timed as well
+        start = time.perf_counter_ns()
+        try:
+            self.__place(x, y, piece)
+        finally:
+            placed = time.perf_counter_ns()
+            self.__stats.record("place", placed - start)
+        try:
+            return self.__end_condition()
+        finally:
+            self.__stats.record("end_condition", time.perf_counter_ns() - placed)
+
+
+    def __receive(self, conn, decoder, inbox):
+        """
+        Wait for the next message of a player. Messages decoded together
+        with a previous one are served first, before reading the socket.
+
+        Args:
+            conn (socket.socket): Connection of the player.
+            decoder (BinaryDecoder | TextServerDecoder): Decoder of the
+                                                         player's protocol.
+            inbox (deque): Messages already decoded.
+
+        Raises:
+            ConnectionError: If the player disconnects.
+
+        Returns:
+            tuple: Decoded message, opcode first.
+        """
+        while not inbox:
+            data = conn.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("[BOARD]: Player disconnected")
+            inbox.extend(decoder.feed(data))
+        return inbox.popleft()
+
+
+    def serve(self, snapshot_every=1, window=WINDOW, results=None):
         """
         Act as a broker for the players while the game is on course. Manage
         the flow of the game by handling connection and message exchange.
+        Each player may speak either the binary or the text protocol.
+
+        Args:
+            snapshot_every (int): Moves between two drawings of the board on
+                                  the console; every move is shown as a
+                                  line in between.
+            window (int): Rows and columns of the drawings at most, around
+                          the last move.
+            results (Results): Store where the game is recorded once won or
+                               drawn, None not to record it.
         """
+        view = ConsoleView(self, snapshot_every, window)
         # Initialize socket
-        self.__socket.bind((os.getenv("SERVER_NAME"), int(os.getenv("SERVER_PORT"))))
-        self.__socket.listen(2)
+        transport = self.__transport if self.__transport is not None else default_transport()
+        self.__socket = transport.listen(2)
         clog.info("The server is running...")
         flog.info("Server start")
 
@@ -207,22 +303,37 @@ class Board():
         # and initialize token subscriptions and give the players starting
         # turns based on who connected first.
         conns = []
+        codecs = {}
+        names = {}
+        decoders = []
+        inboxes = []
         for i in range(2):
-            conn, addr = self.__socket.accept()
-            clog.info(f"Connected to {addr}")
-            flog.info(f"Connected to {addr}")
-
+            conn, addr = transport.accept(self.__socket)
+            clog.info("Connected to %s", addr)
+            flog.info("Connected to %s", addr)
+
+            # The first byte tells which protocol the player speaks
+            data = conn.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("[BOARD]: Player disconnected")
+            codec = protocol.sniff(data[0])
             conns.append(conn)
-            sub = conn.recv(1024).decode('utf-8')
-            clog.info(f"[{addr}]: Subscribe request to topic {sub}")
-            flog.info(f"[{addr}]: Subscribe request to topic {sub}")
+            codecs[conn] = codec
+            decoders.append(codec.server_decoder())
+            inboxes.append(deque(decoders[i].feed(data)))
+
+            message = self.__receive(conn, decoders[i], inboxes[i])
+            sub = message[1]
+            names[conn] = protocol.player_name(message[2])
+            clog.info("[%s]: Subscribe request to topic %s", addr, sub)
+            flog.info("[%s]: Subscribe request to topic %s", addr, sub)
 
-            conn.send(f"[BOARD]: Subscribed to piece {sub},{i}".encode('utf-8'))
+            conn.sendall(codec.subscribed(sub, i, self.rows, self.cols, self.k))
             self.__topics[sub] = conn
-            clog.debug(f"[DEBUG]: Added topic {sub}")
-            flog.debug(f"[DEBUG]: Added topic {sub}")
-            clog.info(f"Subscribed {addr} to topic {sub}")
-            flog.info(f"Subscribed {addr} to topic {sub}")
+            clog.debug("[DEBUG]: Added topic %s", sub)
+            flog.debug("[DEBUG]: Added topic %s", sub)
+            clog.info("Subscribed %s to topic %s", addr, sub)
+            flog.info("Subscribed %s to topic %s", addr, sub)
 
 
         pieces = [key for key in self.__topics.keys()]
@@ -231,48 +342,209 @@ class Board():
         # Serve until the game is over
         while True:
             # Receive piece and position from the player who have the turn
-            data = json.loads(conns[turn].recv(1024).decode('utf-8'))
-            piece, position = next(iter(data.items()))
+            _, piece, x, y = self.__receive(conns[turn], decoders[turn], inboxes[turn])
+            mover = conns[turn]
+            adversary = self.__topics[piece]
 
             # Try to place the piece checking all possible restrictions
             try:
-                self.__place(position[0], position[1], piece)
-                print(self)
+                self.__place(x, y, piece)
+                view.placed(x, y, piece)
     
                 # Check if the game is over
                 if self.__end_condition():
-                    conns[turn].send(f"[BOARD]: YOU WIN!".encode('utf-8'))
-                    self.__topics[piece].send(f"[BOARD]: YOU LOSE...".encode('utf-8'))
-                    clog.debug(f"[DEBUG]: Winner: {pieces[(turn + 1) % len(pieces)]}")
-                    flog.debug(f"[DEBUG]: Winner: {pieces[(turn + 1) % len(pieces)]}")
+                    mover.sendall(codecs[mover].game_over(protocol.WIN, x, y))
+                    adversary.sendall(codecs[adversary].game_over(protocol.LOSE, x, y))
+                    self.__record(results, names, mover, adversary, protocol.WON, piece)
+                    clog.debug("[DEBUG]: Winner: %s", pieces[(turn + 1) % len(pieces)])
+                    flog.debug("[DEBUG]: Winner: %s", pieces[(turn + 1) % len(pieces)])
                     return
 
                 # If successful, inform both players of the changes and update turn
-                conns[turn].send(f"[BOARD]: Piece placed at {position}".encode('utf-8'))
-                self.__topics[piece].send(f"[BOARD]: Adversary move: {position}".encode('utf-8'))
-                clog.debug(f"[DEBUG]: Piece {pieces[turn]} placed at {position}")
-                flog.debug(f"[DEBUG]: Piece {pieces[turn]} placed at {position}")
+                mover.sendall(codecs[mover].ack(x, y))
+                adversary.sendall(codecs[adversary].adversary_move(piece, x, y))
+                clog.debug("[DEBUG]: Piece %s placed at %s", pieces[turn], [x, y])
+                flog.debug("[DEBUG]: Piece %s placed at %s", pieces[turn], [x, y])
                 turn = (turn + 1) % len(pieces)
 
-            except IndexError as e:
-                conns[turn].send(str(e).encode('utf-8'))
-                clog.debug(f"[DEBUG]: {e}")
-                flog.debug(f"[DEBUG]: {e}")
+            except OccupiedException as e:
+                mover.sendall(codecs[mover].reject(protocol.OCCUPIED, x, y))
+                clog.debug("[DEBUG]: %s", e)
+                flog.debug("[DEBUG]: %s", e)
+            except OutOfBoardException as e:
+                mover.sendall(codecs[mover].reject(protocol.OUT_OF_BOARD, x, y))
+                clog.debug("[DEBUG]: %s", e)
+                flog.debug("[DEBUG]: %s", e)
             except StaleMateException as sm:
-                conns[turn].send(str(sm).encode('utf-8'))
-                self.__topics[piece].send(str(sm).encode('utf-8'))
-                clog.debug(f"[DEBUG]: {sm}")
-                flog.debug(f"[DEBUG]: {sm}")
+                mover.sendall(codecs[mover].game_over(protocol.STALEMATE, x, y))
+                adversary.sendall(codecs[adversary].game_over(protocol.STALEMATE, x, y))
+                self.__record(results, names, mover, adversary, protocol.DRAWN, piece)
+                clog.debug("[DEBUG]: %s", sm)
+                flog.debug("[DEBUG]: %s", sm)
                 return
 
 
+    def __record(self, results, names, mover, adversary, event, piece):
+        """
+        Queue the game that has just ended for the results store, if any.
+
+        Args:
+            results (Results): Store of the game, None not to record it.
+            names (dict {socket.socket: str}): Name of every player.
+            mover (socket.socket): Connection of the player of the last move.
+            adversary (socket.socket): Connection of its adversary.
+            event (int): WON or DRAWN.
+            piece (char): Piece of the last move.
+        """
+        if results is None:
+            return
+        # The adversary plays the piece the mover subscribed to
+        other = next(topic for topic, conn in self.__topics.items() if conn is mover)
+        results.record(0, {piece: names[mover], other: names[adversary]}, event, piece,
+                       self.__game.state.filled)
+
+
 def main():
     """
-    Main program. Simply create the board server and launch it.
+    Main program. Simply create the board server and launch it. With the
+    --broker flag, a single process hosts as many matches as players arrive
+    instead of serving one game and exiting, and --workers spreads them
+    over several processes.
     """
 
-    board = Board(3, 3)
-    board.serve()
+    parser = argparse.ArgumentParser(description="TicTacToe board server")
+    parser.add_argument("--broker", action="store_true",
+                        help="serve many concurrent matches on one event loop")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="broker processes sharing the port, one per core")
+    parser.add_argument("--rows", type=int, default=3, help="rows of each board (0: unbounded)")
+    parser.add_argument("--cols", type=int, default=3, help="columns of each board (0: unbounded)")
+    parser.add_argument("--k", type=int, default=None,
+                        help="pieces in a row needed to win (default: shortest side, or 5 if unbounded)")
+    parser.add_argument("--engine", choices=ENGINES, default="grid",
+                        help="representation of the game state")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="keep a journal of the matches in DIR and recover them on start (broker)")
+    parser.add_argument("--no-fsync", action="store_true",
+                        help="do not wait for the disk on journal commits")
+    parser.add_argument("--tablebase", metavar="FILE",
+                        help="log the moves that are worse than perfect play (broker)")
+    parser.add_argument("--stats", type=int, metavar="PORT",
+                        help="time every stage of a move and serve the stats on PORT (broker)")
+    parser.add_argument("--stats-every", type=float, default=60.0,
+                        help="seconds between two stats summaries in the log (0: never)")
+    parser.add_argument("--turn-timeout", type=float, metavar="SECONDS",
+                        help="time a player has for every move (broker)")
+    parser.add_argument("--on-timeout", choices=["forfeit", "skip"], default="forfeit",
+                        help="whether a late player loses the match or only the turn")
+    parser.add_argument("--idle-timeout", type=float, metavar="SECONDS",
+                        help="close connections silent this long outside of a match (broker)")
+    parser.add_argument("--grace", type=float, metavar="SECONDS",
+                        help="keep the seat of a player that lost its connection this long (broker)")
+    parser.add_argument("--results", metavar="DB",
+                        help="record the finished games and rate the players in the SQLite DB")
+    parser.add_argument("--events", metavar="FILE",
+                        help="log the connections, matches and moves to FILE for events.py (broker)")
+    parser.add_argument("--max-outbox", type=int, default=1 << 16, metavar="BYTES",
+                        help="bytes queued for a connection before it is a slow consumer (broker)")
+    parser.add_argument("--backpressure", choices=["drop", "disconnect", "pause"], default="drop",
+                        help="whether slow players queue without bound, are disconnected or pause their match")
+    parser.add_argument("--backlog", type=int, default=1024,
+                        help="pending connections the kernel queues for the broker")
+    parser.add_argument("--rate", type=float, metavar="CONN/S",
+                        help="connections per second a source address may open (broker)")
+    parser.add_argument("--burst", type=int, default=10,
+                        help="connections a source address may open at once over --rate")
+    parser.add_argument("--max-connections", type=int, metavar="N",
+                        help="connections held at once, beyond which arrivals are shed (broker)")
+    parser.add_argument("--snapshot-every", type=int, default=1,
+                        help="moves between two drawings of the board (0: never)")
+    parser.add_argument("--window", type=int, default=WINDOW,
+                        help="rows and columns drawn at most, around the last move")
+    args = parser.parse_args()
+
+    # Stopping the container must still write the queued log records
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    # Boards without edges only store their pieces
+    args.rows = args.rows or protocol.UNBOUNDED
+    args.cols = args.cols or protocol.UNBOUNDED
+    if protocol.UNBOUNDED in (args.rows, args.cols) and args.engine != "sparse":
+        parser.error("unbounded boards need --engine sparse")
+
+    # Every broker process keeps a journal of its own
+    k = args.k if args.k is not None else default_k(args.rows, args.cols)
+    journal = None
+    if args.journal is not None:
+        from journal import Journal
+        journal = lambda path: Journal(path, args.rows, args.cols, k, not args.no_fsync)
+
+    # The workers share the pages of a single map of the tablebase
+    tablebase = None
+    if args.tablebase is not None:
+        from tablebase import Tablebase
+        tablebase = Tablebase(args.tablebase)
+        if not tablebase.covers(args.rows, args.cols, k):
+            parser.error(f"{args.tablebase} solves {tablebase.rows}x{tablebase.cols} boards, k={tablebase.k}")
+
+    # Every worker serves its stats on a port of its own, after the given one
+    stats = None
+    if args.stats is not None:
+        from stats import Stats
+        stats = lambda index: Stats(args.stats + index if args.stats else 0, args.stats_every)
+
+    # Every worker writes to the same database, each from a thread of its own
+    results = None
+    if args.results is not None:
+        from results import Results
+        results = lambda index: Results(args.results)
+
+    # Every worker logs its events to a file of its own, after the given one
+    events = None
+    if args.events is not None:
+        from events import EventLog
+        root, ext = os.path.splitext(args.events)
+        events = lambda index: EventLog(f"{root}-{index}{ext}" if index else args.events, index)
+
+    if args.broker and args.workers > 1:
+        if os.getenv("SERVER_SOCKET"):
+            parser.error("--workers share a TCP port, not a Unix domain socket")
+        from supervisor import Supervisor
+        worker_journal = None
+        if journal is not None:
+            worker_journal = lambda index: journal(os.path.join(args.journal, f"worker{index}"))
+        Supervisor(args.workers, args.rows, args.cols, args.k, args.engine, args.backlog,
+                   journal=worker_journal, tablebase=tablebase, stats=stats,
+                   turn_timeout=args.turn_timeout, on_timeout=args.on_timeout,
+                   idle_timeout=args.idle_timeout, results=results,
+                   max_outbox=args.max_outbox, backpressure=args.backpressure,
+                   events=events, rate=args.rate, burst=args.burst,
+                   max_connections=args.max_connections, grace=args.grace).serve()
+        flog.info("Server shut down")
+        return
+
+    if args.broker:
+        from broker import Broker
+        Broker(args.rows, args.cols, args.k, args.engine, args.backlog,
+               journal=journal(args.journal) if journal is not None else None,
+               tablebase=tablebase, stats=stats(0) if stats is not None else None,
+               turn_timeout=args.turn_timeout, on_timeout=args.on_timeout,
+               idle_timeout=args.idle_timeout,
+               results=results(0) if results is not None else None,
+               max_outbox=args.max_outbox, backpressure=args.backpressure,
+               events=events(0) if events is not None else None,
+               rate=args.rate, burst=args.burst,
+               max_connections=args.max_connections, grace=args.grace).serve()
+        flog.info("Server shut down")
+        return
+
+    board = Board(args.rows, args.cols, args.k, args.engine)
+    store = results(0) if results is not None else None
+    try:
+        board.serve(args.snapshot_every, args.window, store)
+    finally:
+        if store is not None:
+            store.close()
     clog.info("END OF THE GAME")
     flog.info("Server shut down")
 
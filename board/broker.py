@@ -0,0 +1,1571 @@
+import os
+import time
+import selectors
+import protocol
+from itertools import islice
+from collections import deque, OrderedDict
+from topics import TopicRegistry
+from tablebase import VALUES, masks
+from board import Board, clog, flog
+from rules import default_k
+from stats import Exporter
+from results import OUTCOMES
+from events import CONNECTED, CLOSED, REJECTED, MOVES
+from timers import TimerWheel
+from transport import default_transport
+from admission import RateLimiter, BURST
+from sessions import Sessions
+from exceptions import StaleMateException, OccupiedException, OutOfBoardException
+
+PIECES = ['O', 'X']
+ADVERSARY = {'O': 'X', 'X': 'O'}
+
+RECV_SIZE = 4096        # Bytes read from a ready socket per event
+REBALANCE = 0.05        # Seconds between lobby checks of a sharded broker
+POLICIES = ("forfeit", "skip")  # What happens to a turn that runs out of time
+KEEPALIVE_PROBES = 3    # Unanswered probes before a silent peer is dropped
+MAX_OUTBOX = 1 << 16    # Bytes queued for a connection before it is a slow consumer
+IOV_MAX = 1024          # Buffers written by one vectored call at most
+BACKPRESSURE = ("drop", "disconnect", "pause")  # What happens to a slow consumer
+ACCEPT_BATCH = 64       # Connections accepted per iteration of the loop at most
+RECOVERY_GRACE = 60.0   # Seconds the players of a recovered match have to come back
+
+
+class Connection:
+    """
+    State the broker keeps for every connected player or spectator.
+
+    Attributes:
+        sock (socket.socket): Non-blocking socket of the player.
+        addr (tuple(str, int)): Address of the player.
+        codec (BinaryCodec | TextCodec): Protocol of the player, None until
+                                         its first byte arrives.
+        decoder (BinaryDecoder | TextServerDecoder): Incremental decoder of
+                                                     the player's messages.
+        inbox (deque): Decoded messages not handled yet.
+        outbox (deque): Encoded messages waiting for the end of the loop
+                        iteration, or for the socket to be writable.
+        queued (int): Bytes in the outbox.
+        events (int): Selector events the socket is registered for, 0 if
+                      it is not.
+        topic (char): Piece the player is subscribed to, None until the
+                      subscribe request arrives.
+        piece (char): Piece the player publishes to, known once matched.
+        match (Match): Match the player takes part in, None in the lobby.
+        waiting (bool): Whether the player waits in the lobby.
+        spectating (list of tuple(int, char)): Topics followed by a
+                                               spectator, None for players.
+        closing (bool): Whether the connection closes once the outbox is
+                        drained.
+        closed (bool): Whether the connection has already been closed.
+        active (int): Tick of the timer wheel at which the player last sent
+                      something.
+        timer (Timer): Idle deadline of the connection, None without one.
+        skipped (int): Turns the player lost to the clock in its current
+                       match whose late move has not arrived yet.
+        name (str): Name the player is rated under, '' if anonymous.
+        id (int): Number of the connection in the event log.
+        read_at (int): Monotonic time of the last bytes read, in ns, kept
+                       only with an event log.
+    """
+
+    __slots__ = ("sock", "addr", "codec", "decoder", "inbox", "outbox", "queued", "events",
+                 "topic", "piece", "match", "waiting", "spectating", "closing", "closed",
+                 "active", "timer", "skipped", "name", "id", "read_at")
+
+    def __init__(self, sock, addr, id=0):
+        """
+        Initialize the connection state of a freshly accepted player.
+
+        Args:
+            sock (socket.socket): Non-blocking socket of the player.
+            addr (tuple(str, int)): Address of the player.
+            id (int): Number of the connection.
+        """
+        self.sock = sock
+        self.addr = addr
+        self.id = id
+        self.read_at = 0
+        self.codec = None
+        self.decoder = None
+        self.inbox = deque()
+        self.outbox = deque()
+        self.queued = 0
+        self.events = 0
+        self.topic = None
+        self.piece = None
+        self.match = None
+        self.waiting = False
+        self.spectating = None
+        self.closing = False
+        self.closed = False
+        self.active = 0
+        self.timer = None
+        self.skipped = 0
+        self.name = ""
+
+
+class Match:
+    """
+    A game hosted by the broker: a Board and the two players taking turns.
+
+    Attributes:
+        id (int): Identifier of the match within the broker.
+        board (Board): Game state of the match.
+        players (list of Connection): Players in turn order; the first one to
+                                      arrive at the lobby starts.
+        topics (dict {'char': Connection}): Player subscribed to each piece.
+        turn (int): Index in players of the player who has the turn.
+        moves (list of tuple(char, int, int)): Pieces placed so far, in
+                                               order, to show the match to
+                                               spectators arriving late.
+                                               Turns lost to the clock are
+                                               placed at PASS, PASS.
+        passes (int): Turns lost to the clock.
+        timer (Timer): Deadline of the current turn, None without one.
+        slow (set of Connection): Players with more bytes queued than the
+                                  broker allows, which pause the match
+                                  under the 'pause' policy.
+        away (dict {'char': Timer}): Deadline of the grace period of every
+                                     piece whose player lost its
+                                     connection.
+    """
+
+    __slots__ = ("id", "board", "players", "topics", "turn", "moves", "passes", "timer", "slow",
+                 "away")
+
+    def __init__(self, match_id, board, players):
+        """
+        Initialize the match with the first player holding the turn.
+
+        Args:
+            match_id (int): Identifier of the match.
+            board (Board): Empty board to play on.
+            players (list of Connection): Players in turn order.
+        """
+        self.id = match_id
+        self.board = board
+        self.players = players
+        self.topics = {p.topic: p for p in players}
+        self.turn = 0
+        self.moves = []
+        self.passes = 0
+        self.timer = None
+        self.slow = set()
+        self.away = {}
+
+
+class Broker:
+    """
+    Event-loop broker that hosts many TicTacToe matches in one process. The
+    listening socket stays open, incoming players wait in a lobby until a
+    player subscribed to the other piece arrives, and every match gets its
+    own Board. All sockets are non-blocking and multiplexed with a selector,
+    so a slow player never stalls the other matches. Read-only spectators
+    may follow the events of any match, or of all of them, through the
+    topic registry.
+
+    A broker may also be one of the workers of a Supervisor, sharing the
+    listening port with its siblings. Players whose adversary waits in
+    another worker are then handed over to that worker.
+
+    With a journal, the events of every match are written to disk, and a
+    restarted broker recovers the matches in course: their players resume
+    them by reconnecting, within the grace period or RECOVERY_GRACE
+    seconds, after which the player back wins the match. With a grace period, a player that loses its
+    connection keeps its seat that long and resumes the match the same way.
+    Every seat has a token, handed out when the match starts, that the
+    player proves it with.
+
+    With a tablebase of the board, every move is judged against perfect
+    play and the moves that throw away a win or a draw are logged.
+
+    With stats, every stage of a move is timed and the moves, matches and
+    connections are counted. They are exposed on a stats socket and
+    summarized in the file log from time to time.
+
+    With a turn timeout, a player who does not move in time loses the match
+    or its turn, and with an idle timeout, connections that sit outside of
+    any match are closed, while TCP keepalive probes detect peers that
+    vanished. All the deadlines live in a timer wheel advanced by the event
+    loop, where arming or cancelling one takes constant time.
+
+    Players reach the broker over a transport: TCP by default, a Unix domain
+    socket, or socket pairs and memory buffers for players in the same
+    process.
+
+    Arrivals are admitted a batch per iteration of the loop, the others
+    waiting in the listen queue, so a connection storm never delays the
+    moves of the matches in course by more than a batch. With a rate, every
+    source address may only open connections at that pace, and with a
+    maximum of connections, the arrivals beyond it are shed: they are
+    closed as soon as accepted, which tells their peer at once.
+
+    Parameters:
+        rows (int): Number of rows of every board, protocol.UNBOUNDED if
+                    they have no edge.
+        cols (int): Number of columns of every board, protocol.UNBOUNDED if
+                    they have no edge.
+        k (int): Pieces in a row needed to win, None for the board default.
+        engine (str): State engine of every board.
+        backlog (int): Size of the listen queue of pending connections.
+        shard (Shard): View of the sibling workers, None for a standalone
+                       broker.
+        journal (Journal): Journal of the matches, None not to keep any.
+        tablebase (Tablebase): Perfect play of the board, None not to judge
+                               the moves.
+        stats (Stats): Latency histograms and counters, None not to take
+                       any.
+        turn_timeout (float): Seconds a player has for every move, None for
+                              no limit.
+        on_timeout (str): Policy for a turn that runs out of time, one of
+                          POLICIES: 'forfeit' loses the match, 'skip' passes
+                          the turn to the adversary.
+        idle_timeout (float): Seconds a connection may stay silent outside
+                              of a match, None for no limit.
+        transport (Transport): Way the players connect; the one of the
+                               environment by default.
+        results (Results): Store of the finished matches and the ratings of
+                           the players, None not to keep them.
+        max_outbox (int): Bytes queued for a connection after a write
+                          before it is a slow consumer.
+        backpressure (str): What happens to slow consumers, one of
+                            BACKPRESSURE: 'drop' disconnects slow
+                            spectators and lets players queue without
+                            bound, 'disconnect' disconnects any slow
+                            connection, a player losing its match, and
+                            'pause' disconnects slow spectators and stops
+                            the match of a slow player, clock included,
+                            until half of its bytes are written.
+        events (EventLog): Structured log of the connections, matches and
+                           moves, None not to keep one.
+        rate (float): Connections per second a source address may open,
+                      None for no limit.
+        burst (int): Connections a source address may open at once.
+        max_connections (int): Connections open at once, beyond which new
+                               arrivals are shed; None for no limit.
+        grace (float): Seconds a player that lost its connection keeps its
+                       seat, None to end its match at once.
+
+    Attributes:
+        transport (Transport): Way the players connect.
+        listener (socket.socket): Listening end, None until listening.
+        selector (selectors.BaseSelector): Readiness notifier of all sockets.
+        lobby (dict {'char': OrderedDict}): Players waiting for an
+                                            adversary, by the topic they
+                                            subscribed to, in order of
+                                            arrival.
+        matches (dict {int: Match}): Matches in course.
+        topics (TopicRegistry): Spectators of the matches.
+        recovered (dict {int: tuple}): Matches recovered from the journal,
+                                       with their first piece, moves,
+                                       players back so far and deadline.
+        held (set of Connection): Connections with messages queued in the
+                                  current iteration of the loop, written
+                                  together once it ends and the events
+                                  they report are committed.
+        exporter (Exporter): Stats socket, None if not open.
+        wheel (TimerWheel): Deadlines of the turns and the connections, None
+                            without any timeout.
+        next_conn (int): Number of the next connection.
+        limiter (RateLimiter): Token buckets of the source addresses, None
+                               without a rate.
+        open (int): Connections open, players and spectators.
+        sessions (Sessions): Tokens of the seats, with a key kept with the
+                             journal, if any.
+    """
+
+    def __init__(self, rows, cols, k=None, engine="grid", backlog=1024, shard=None, journal=None,
+                 tablebase=None, stats=None, turn_timeout=None, on_timeout="forfeit",
+                 idle_timeout=None, transport=None, results=None, max_outbox=MAX_OUTBOX,
+                 backpressure="drop", events=None, rate=None, burst=BURST, max_connections=None,
+                 grace=None):
+        """
+        Initialize the broker with no players nor matches.
+
+        Args:
+            rows (int): Number of rows of every board.
+            cols (int): Number of columns of every board.
+            k (int): Pieces in a row needed to win.
+            engine (str): State engine of every board.
+            backlog (int): Size of the listen queue of pending connections.
+            shard (Shard): View of the sibling workers.
+            journal (Journal): Journal of the matches.
+            tablebase (Tablebase): Perfect play of the board.
+            stats (Stats): Latency histograms and counters.
+            turn_timeout (float): Seconds a player has for every move.
+            on_timeout (str): Policy for a turn that runs out of time.
+            idle_timeout (float): Seconds a connection may stay silent
+                                  outside of a match.
+            transport (Transport): Way the players connect.
+            results (Results): Store of the finished matches.
+            max_outbox (int): Bytes queued for a slow consumer.
+            backpressure (str): What happens to slow consumers.
+            events (EventLog): Structured log of the events.
+            rate (float): Connections per second a source may open.
+            burst (int): Connections a source may open at once.
+            max_connections (int): Connections open at once.
+            grace (float): Seconds a player that lost its connection keeps
+                           its seat.
+        """
+        self.__rows = rows
+        self.__cols = cols
+        self.__k = k
+        self.__engine = engine
+        self.__backlog = backlog
+        self.__transport = transport if transport is not None else default_transport()
+        self.__listener = None
+        self.__selector = self.__transport.selector()
+        self.__lobby = {piece: OrderedDict() for piece in PIECES}
+        self.__matches = {}
+        self.__topics = TopicRegistry()
+        self.__shard = shard
+        self.__journal = journal
+        self.__results = results
+        self.__events = events
+        self.__next_conn = 0
+        self.__tablebase = tablebase
+        self.__recovered = {}
+        self.__held = set()
+        self.__stats = stats
+        self.__exporter = None
+        self.__turn_timeout = turn_timeout
+        self.__on_timeout = on_timeout
+        self.__idle_timeout = idle_timeout
+        self.__max_outbox = max_outbox
+        self.__backpressure = backpressure
+        self.__grace = grace
+        self.__sessions = Sessions(journal.key_path if journal is not None else None)
+        self.__wheel = (TimerWheel() if turn_timeout or idle_timeout or grace or journal is not None
+                        else None)
+        self.__limiter = RateLimiter(rate, burst) if rate else None
+        self.__max_connections = max_connections
+        self.__open = 0
+        if stats is not None:
+            stats.gauge("matches_active", lambda: len(self.__matches))
+            stats.gauge("connections_open", lambda: self.__open)
+            stats.gauge("bytes_queued", lambda: sum(
+                key.data.queued for key in self.__selector.get_map().values()
+                if isinstance(key.data, Connection)))
+
+        # Workers number their matches apart from each other
+        self.__next_id = 0 if shard is None else shard.index
+        self.__id_step = 1 if shard is None else shard.workers
+
+
+    def serve(self):
+        """
+        Accept players and run every match until the process is stopped.
+        """
+        self.listen()
+        clog.info("The broker is running...")
+
+        # Sharded brokers check the lobbies of their siblings, and the stats
+        # summaries are due from time to time, even with no event at all
+        timeout = None if self.__shard is None else REBALANCE
+        stats = self.__stats
+        if stats is not None and stats.every:
+            timeout = min(timeout or stats.every, stats.every)
+        try:
+            while True:
+                self.poll(timeout)
+        finally:
+            self.close()
+
+
+    def listen(self):
+        """
+        Open the listening end of the transport, shared with the sibling
+        workers, and recover the matches of the journal. The broker is then
+        driven by calling poll.
+        """
+        self.__listener = self.__transport.listen(self.__backlog, shared=self.__shard is not None)
+        if self.__shard is not None:
+            self.__selector.register(self.__shard.inbox, selectors.EVENT_READ, self.__shard)
+        self.__listener.setblocking(False)
+        self.__selector.register(self.__listener, selectors.EVENT_READ, None)
+        flog.info("Broker start")
+        if self.__journal is not None:
+            self.__recover()
+        stats = self.__stats
+        if stats is not None and stats.port is not None:
+            self.__exporter = Exporter(stats, (os.getenv("SERVER_NAME"), stats.port))
+            self.__exporter.listen(self.__selector)
+            flog.info("Stats at %s", self.__exporter.address)
+
+
+    def poll(self, timeout=None):
+        """
+        Wait for readiness events and handle them: one iteration of the
+        event loop, which a simulation may drive from its own loop.
+
+        Args:
+            timeout (float): Seconds to wait at most, None to wait until
+                             an event or a deadline, 0 not to wait.
+        """
+        wheel = self.__wheel
+        stats = self.__stats
+        if wheel is not None:
+            due = wheel.timeout()
+            if due is not None and (timeout is None or due < timeout):
+                timeout = due
+        events = self.__selector.select(timeout)
+        # Deadlines due fire first, so the handlers below see the
+        # current tick, and a move arriving past its deadline is late
+        if wheel is not None:
+            wheel.advance()
+
+        # Dispatch readiness events: the listener has no data attached, the
+        # channel of a worker carries its Shard, the stats socket and its
+        # clients carry the Exporter and the players carry their Connection
+        for key, mask in events:
+            conn = key.data
+            if conn is None:
+                self.__accept(self.__listener)
+                continue
+            if conn is self.__shard:
+                self.__adopt()
+                continue
+            if conn is self.__exporter:
+                self.__exporter.handle(key.fileobj, mask)
+                continue
+            if conn.closed:
+                continue
+            if mask & selectors.EVENT_READ:
+                self.__read(conn)
+            if mask & selectors.EVENT_WRITE and not conn.closed:
+                self.__held.add(conn)
+        if self.__shard is not None:
+            self.__rebalance()
+
+        # The records of all the events handled above share a write,
+        # and only then are the players told about them
+        if self.__journal is not None:
+            if stats is not None:
+                start = time.perf_counter_ns()
+            self.__journal.commit()
+            if self.__journal.snapshot_due:
+                self.__journal.snapshot(self.__in_flight(), self.__next_id)
+            if stats is not None:
+                stats.record("commit", time.perf_counter_ns() - start)
+        if stats is not None:
+            start = time.perf_counter_ns()
+        self.__release()
+        if stats is not None:
+            stats.record("flush", time.perf_counter_ns() - start)
+        if self.__events is not None:
+            self.__events.flush()
+
+        if stats is not None and stats.due is not None and time.monotonic() >= stats.due:
+            for line in stats.summary():
+                flog.info("Stats: %s", line)
+
+
+    def close(self):
+        """
+        Close the listening end, the stats socket and the journal, and write
+        the results and events still queued.
+        """
+        if self.__exporter is not None:
+            self.__exporter.close()
+        self.__selector.close()
+        self.__listener.close()
+        if self.__journal is not None:
+            self.__journal.close()
+        if self.__results is not None:
+            self.__results.close()
+        if self.__events is not None:
+            self.__events.close()
+
+
+    def __release(self):
+        """
+        Write the messages queued in an iteration of the loop, one vectored
+        write per connection whatever the number of messages.
+        """
+        while self.__held:
+            held = self.__held
+            self.__held = set()
+            for conn in held:
+                if not conn.closed:
+                    self.__flush(conn)
+            # Slow consumers dropped above leave events of their own, for
+            # their adversaries and spectators
+            if self.__held and self.__journal is not None:
+                self.__journal.commit()
+
+
+    def __recover(self):
+        """
+        Load the matches in course from the journal. They wait for their
+        players to resume them until a deadline, and new matches are
+        numbered after every match the journal ever started, as a token of
+        an old seat would otherwise hold for the new match with its
+        identifier.
+        """
+        matches, next_id = self.__journal.recover()
+        grace = self.__grace or RECOVERY_GRACE
+        for match_id, (first, moves) in matches.items():
+            self.__recovered[match_id] = (first, moves, {},
+                                          self.__wheel.schedule(grace, self.__forsake, match_id))
+        while self.__next_id < next_id:
+            self.__next_id += self.__id_step
+        flog.info("Recovered %s matches in course", len(self.__recovered))
+
+
+    def __in_flight(self):
+        """
+        Matches in course, for a snapshot of the journal.
+
+        Returns:
+            dict {int: tuple(char, list)}: First piece and pieces placed of
+                                           every match in course.
+        """
+        matches = {match_id: (first, moves) for match_id, (first, moves, seats, timer)
+                   in self.__recovered.items()}
+        for match in self.__matches.values():
+            matches[match.id] = (match.players[0].piece, match.moves)
+        return matches
+
+
+    def __accept(self, listener):
+        """
+        Accept a batch of the pending connections of the listen queue, and
+        admit those that their source's rate and the load of the broker
+        allow.
+
+        Args:
+            listener (socket.socket): Listening end of the transport.
+        """
+        for _ in range(ACCEPT_BATCH):
+            try:
+                sock, addr = self.__transport.accept(listener)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # Out of descriptors or buffers, or a peer gone before it was
+                # set up: the arrival is shed and the rest wait for the next
+                # iteration, while the matches in course go on
+                flog.warning("Accept failed: %s, shedding", e)
+                if self.__stats is not None:
+                    self.__stats.count("connections_shed")
+                return
+            if not self.__admit(addr):
+                sock.close()
+                continue
+            sock.setblocking(False)
+            self.__open += 1
+            self.__next_conn += 1
+            conn = Connection(sock, addr, self.__next_conn)
+            self.__update_events(conn)
+            if self.__events is not None:
+                self.__events.append(CONNECTED, conn=conn.id)
+            flog.info("Connected to %s", addr)
+            if self.__stats is not None:
+                self.__stats.count("connections_accepted")
+            if self.__idle_timeout:
+                self.__watch(conn)
+
+
+    def __admit(self, addr):
+        """
+        Decide whether a connection just accepted may stay. Arrivals are
+        shed while the broker holds its maximum of connections, and refused
+        once their source address runs out of tokens.
+
+        Args:
+            addr (tuple): Address of the peer, its host first.
+
+        Returns:
+            bool: True if the connection is admitted, False if it must be
+                  closed.
+        """
+        if self.__max_connections is not None and self.__open >= self.__max_connections:
+            flog.debug("[%s]: %s connections open, shedding", addr, self.__open)
+            if self.__stats is not None:
+                self.__stats.count("connections_shed")
+            return False
+        if self.__limiter is not None and not self.__limiter.allow(addr[0]):
+            flog.debug("[%s]: Connection rate exceeded, refusing", addr)
+            if self.__stats is not None:
+                self.__stats.count("connections_limited")
+            return False
+        return True
+
+
+    def __watch(self, conn):
+        """
+        Start the idle deadline of a new connection, and have the kernel
+        probe its peer once it has been silent as long, so a peer that
+        vanished without closing the connection is detected even while it
+        waits for an adversary or a move.
+
+        Args:
+            conn (Connection): Connection just accepted or adopted.
+        """
+        self.__transport.keepalive(conn.sock, max(1, int(self.__idle_timeout)), KEEPALIVE_PROBES)
+        conn.active = self.__wheel.current
+        conn.timer = self.__wheel.schedule(self.__idle_timeout, self.__idle, conn)
+
+
+    def __idle(self, conn):
+        """
+        Close a connection that has been silent for the idle timeout outside
+        of any match, or check it again later. Players in a match are bound
+        by the turn deadline instead, and neither players waiting in the
+        lobby nor spectators are expected to speak.
+
+        Args:
+            conn (Connection): Connection whose idle deadline expired.
+        """
+        conn.timer = None
+        if conn.closed:
+            return
+        wheel = self.__wheel
+        silent = (wheel.current - conn.active) * wheel.tick
+        if conn.match is not None or conn.waiting or conn.spectating is not None:
+            silent = 0
+        if silent < self.__idle_timeout:
+            conn.timer = wheel.schedule(self.__idle_timeout - silent, self.__idle, conn)
+            return
+        flog.info("[%s]: Idle for %.1f s, closing", conn.addr, silent)
+        self.__close(conn)
+
+
+    def __read(self, conn):
+        """
+        Receive the available bytes of a player and handle the complete
+        messages among them.
+
+        Args:
+            conn (Connection): Player whose socket is readable.
+        """
+        stats = self.__stats
+        if stats is not None:
+            start = time.perf_counter_ns()
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            flog.info("[%s]: Connection error: %s", conn.addr, e)
+            data = b""
+
+        if not data:
+            self.__lose(conn)
+            return
+        if self.__idle_timeout:
+            conn.active = self.__wheel.current
+        if self.__events is not None:
+            conn.read_at = time.monotonic_ns()
+        if stats is not None:
+            received = time.perf_counter_ns()
+            stats.record("recv", received - start)
+
+        # The first byte tells which protocol the player speaks
+        if conn.codec is None:
+            conn.codec = protocol.sniff(data[0])
+            conn.decoder = conn.codec.server_decoder()
+        try:
+            conn.inbox.extend(conn.decoder.feed(data))
+        except protocol.ProtocolError as e:
+            flog.info("[%s]: %s, dropping client", conn.addr, e)
+            self.__drop(conn)
+            return
+        if stats is not None:
+            stats.record("decode", time.perf_counter_ns() - received)
+        self.__process(conn)
+
+
+    def __process(self, conn):
+        """
+        Handle the decoded messages of a player. Moves are left in the inbox
+        while it is not the player's turn, as a blocking server would leave
+        them in the socket. Spectators may only send spectate requests.
+
+        Args:
+            conn (Connection): Player with decoded messages.
+        """
+        while conn.inbox and not conn.closing:
+            message = conn.inbox[0]
+            if message[0] == protocol.OP_SUBSCRIBE and conn.topic is None and conn.spectating is None:
+                conn.inbox.popleft()
+                conn.name = protocol.player_name(message[2])
+                self.__subscribe(conn, message[1])
+                continue
+            if message[0] == protocol.OP_SPECTATE and conn.topic is None:
+                conn.inbox.popleft()
+                self.__spectate(conn, message[2], message[1])
+                continue
+            if message[0] == protocol.OP_RESUME and conn.topic is None and conn.spectating is None:
+                conn.inbox.popleft()
+                self.__resume(conn, message)
+                continue
+            if conn.spectating is not None:
+                flog.info("[%s]: Spectators are read-only, dropping client", conn.addr)
+                self.__drop(conn)
+                return
+
+            # Moves that arrive after their match is over, or after the turn
+            # they were meant for ran out of time, are answered already
+            if message[0] == protocol.OP_MOVE and (conn.skipped or conn.match is None and conn.topic is None):
+                conn.inbox.popleft()
+                if conn.skipped:
+                    conn.skipped -= 1
+                continue
+
+            match = conn.match
+            if match is None or match.players[match.turn] is not conn or match.slow:
+                return
+            conn.inbox.popleft()
+            if message[0] != protocol.OP_MOVE:
+                flog.info("[%s]: Unexpected message %s, dropping client", conn.addr, message)
+                self.__drop(conn)
+                return
+            self.__move(match, conn, message[2], message[3])
+
+
+    def __subscribe(self, conn, topic, hand_over=True):
+        """
+        Subscribe a player to a topic and pair it with a player waiting for
+        the opposite one, or leave it in the lobby otherwise. A worker that
+        has no such player sends it to a sibling that has one.
+
+        Args:
+            conn (Connection): Player requesting the subscription.
+            topic (char): Piece the player subscribes to.
+            hand_over (bool): Whether the player may be sent to a sibling.
+        """
+        if topic not in ADVERSARY:
+            flog.info("[%s]: Unknown topic %r, dropping client", conn.addr, topic)
+            self.__drop(conn)
+            return
+
+        conn.topic = topic
+        flog.info("[%s]: Subscribe request to topic %s", conn.addr, topic)
+
+        # Players that leave the lobby are taken out of it, so the first
+        # one is always there to play
+        waiting = self.__lobby[ADVERSARY[topic]]
+        if waiting:
+            other = next(iter(waiting))
+            self.__unpark(other)
+            self.__start(other, conn)
+            return
+
+        # The adversary may be waiting in a sibling worker
+        if self.__shard is not None and hand_over:
+            worker = self.__shard.holder(ADVERSARY[topic])
+            if worker is not None and self.__hand_over(conn, worker):
+                return
+        self.__park(conn)
+
+
+    def __resume(self, conn, message):
+        """
+        Give a player back its seat in a match, once it proves it with the
+        token of the seat. A match held for a player that lost its
+        connection goes on at once, and a match recovered from the journal
+        once both players are back.
+
+        Args:
+            conn (Connection): Player requesting to resume.
+            message (tuple): Resume request, with the piece of the player,
+                             the match, the moves the player saw and the
+                             token of the seat.
+        """
+        _, piece, match_id, seen, token = message
+
+        # Every match belongs to the worker that numbered it
+        if self.__shard is not None and match_id % self.__shard.workers != self.__shard.index:
+            conn.inbox.appendleft(message)
+            if not self.__hand_over(conn, match_id % self.__shard.workers):
+                self.__drop(conn)
+            return
+
+        if piece not in ADVERSARY or not self.__sessions.check(match_id, piece, token):
+            flog.info("[%s]: No seat %s in match %s for this token, dropping client", conn.addr,
+                      piece, match_id)
+            self.__drop(conn)
+            return
+        match = self.__matches.get(match_id)
+        if match is not None:
+            self.__rejoin(conn, match, piece, seen)
+            return
+
+        recovered = self.__recovered.get(match_id)
+        seats = recovered[2] if recovered is not None else {}
+        if recovered is None or (piece in seats and not seats[piece][0].closed):
+            flog.info("[%s]: No match %s to resume as %s, dropping client", conn.addr, match_id, piece)
+            self.__drop(conn)
+            return
+
+        conn.topic = ADVERSARY[piece]
+        seats[piece] = (conn, seen)
+        flog.info("[%s]: Back in match %s as %s", conn.addr, match_id, piece)
+        if len(seats) < len(PIECES) or any(player.closed for player, _ in seats.values()):
+            return
+
+        # Rebuild the board and hand the turn to whoever had it
+        first, moves, seats, timer = self.__recovered.pop(match_id)
+        self.__wheel.cancel(timer)
+        board = Board(self.__rows, self.__cols, self.__k, self.__engine, stats=self.__stats)
+        for placed, x, y in moves:
+            if x != protocol.PASS:
+                board.play(x, y, placed)
+        match = Match(match_id, board, [seats[first][0], seats[ADVERSARY[first]][0]])
+        match.moves = moves
+        match.passes = sum(x == protocol.PASS for placed, x, y in moves)
+        match.turn = len(moves) % len(PIECES)
+        self.__matches[match_id] = match
+
+        for player in match.players:
+            player.match = match
+            player.piece = ADVERSARY[player.topic]
+            self.__resync(player, match, seats[player.piece][1])
+        flog.info("Match %s resumed after %s moves", match_id, len(moves))
+        self.__arm(match)
+
+        for player in match.players:
+            self.__process(player)
+
+
+    def __rejoin(self, conn, match, piece, seen):
+        """
+        Seat a player back in a match in course, on a new connection. The
+        player may notice the loss of the old one before the broker does,
+        which then closes it.
+
+        Args:
+            conn (Connection): New connection of the player.
+            match (Match): Match of the player.
+            piece (char): Piece of the player.
+            seen (int): Moves of the match the player knows of.
+        """
+        if seen > len(match.moves):
+            flog.info("[%s]: Saw %s moves of match %s, which has %s, dropping client", conn.addr,
+                      seen, match.id, len(match.moves))
+            self.__drop(conn)
+            return
+        old = match.topics[ADVERSARY[piece]]
+        if not old.closed:
+            self.__close(old)
+        timer = match.away.pop(piece, None)
+        if timer is not None:
+            self.__wheel.cancel(timer)
+
+        conn.topic = old.topic
+        conn.piece = piece
+        conn.name = old.name
+        conn.match = match
+        match.players[match.players.index(old)] = conn
+        match.topics[conn.topic] = conn
+        flog.info("[%s]: Back in match %s as %s after %s moves", conn.addr, match.id, piece,
+                  len(match.moves) - seen)
+        self.__resync(conn, match, seen)
+
+        # A paused match waited for the old connection to catch up
+        if old in match.slow:
+            match.slow.discard(old)
+            if not match.slow:
+                self.__unpause(match)
+                return
+        self.__process(conn)
+
+
+    def __resync(self, player, match, seen):
+        """
+        Bring a player that resumes a match up to date: the confirmation
+        sums the state of the match up, with the turn and the moves played,
+        and only the moves the player missed follow.
+
+        Args:
+            player (Connection): Player back in the match.
+            match (Match): Match resumed.
+            seen (int): Moves of the match the player knows of.
+        """
+        codec = player.codec
+        turn = 0 if match.players[match.turn] is player else 1
+        missed = [codec.passed(piece) if x == protocol.PASS
+                  else codec.ack(x, y) if piece == player.piece
+                  else codec.adversary_move(piece, x, y)
+                  for piece, x, y in match.moves[seen:]]
+        self.__send(player, b"".join([codec.resumed(turn, match.id, len(match.moves))] + missed))
+
+
+    def __park(self, conn):
+        """
+        Leave a player in the lobby, counting it for the sibling workers.
+
+        Args:
+            conn (Connection): Subscribed player.
+        """
+        self.__lobby[conn.topic][conn] = None
+        conn.waiting = True
+        if self.__shard is not None:
+            self.__shard.waiting(conn.topic, 1)
+
+
+    def __unpark(self, conn):
+        """
+        Take a player out of the lobby, whether to play, to go to a sibling
+        worker or because it left, and stop counting it.
+
+        Args:
+            conn (Connection): Player in the lobby.
+        """
+        del self.__lobby[conn.topic][conn]
+        conn.waiting = False
+        if self.__shard is not None:
+            self.__shard.waiting(conn.topic, -1)
+
+
+    def __hand_over(self, conn, worker):
+        """
+        Send a subscribed player to a sibling worker, with the bytes and
+        messages received from it so far, and forget it.
+
+        Args:
+            conn (Connection): Player not paired yet, out of the lobby.
+            worker (int): Position of the sibling.
+
+        Returns:
+            bool: True if the sibling got the player; False if the channel
+                  was full or messages are still queued for the player, and
+                  the player stays here.
+        """
+        if conn.outbox:
+            return False
+        state = (conn.addr, conn.topic, conn.name, conn.codec.name, conn.decoder, list(conn.inbox))
+        try:
+            self.__shard.hand_over(worker, state, conn.sock)
+        except OSError as e:
+            flog.info("[%s]: Hand over to worker %s failed: %s", conn.addr, worker, e)
+            return False
+
+        if conn.waiting:
+            self.__unpark(conn)
+        if conn.timer is not None:
+            self.__wheel.cancel(conn.timer)
+            conn.timer = None
+        self.__open -= 1
+        conn.closed = True
+        conn.closing = True
+        if conn.events:
+            self.__selector.unregister(conn.sock)
+        conn.sock.close()
+        flog.info("[%s]: Handed over to worker %s", conn.addr, worker)
+        return True
+
+
+    def __adopt(self):
+        """
+        Take the players handed over by sibling workers, as if they had just
+        subscribed here, or as they were if they had not subscribed. Players
+        are not sent any further, so two siblings can not keep exchanging
+        one.
+        """
+        while True:
+            try:
+                (addr, topic, name, codec, decoder, inbox), sock = self.__shard.receive()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            self.__open += 1
+            self.__next_conn += 1
+            conn = Connection(sock, addr, self.__next_conn)
+            conn.name = name
+            conn.codec = protocol.CODECS[codec]
+            conn.decoder = decoder
+            conn.inbox.extend(inbox)
+            self.__update_events(conn)
+            if self.__events is not None:
+                self.__events.append(CONNECTED, conn=conn.id)
+            if self.__idle_timeout:
+                self.__watch(conn)
+            if topic is not None:
+                self.__subscribe(conn, topic, hand_over=False)
+            self.__process(conn)
+
+
+    def __rebalance(self):
+        """
+        Send a waiting player to a sibling of a lower position that has
+        players waiting for the opposite topic. Players only move to lower
+        positions, so two siblings never swap theirs, and players that could
+        not be sent on arrival, because their adversary was not counted yet,
+        still meet.
+        """
+        for topic, waiting in self.__lobby.items():
+            if not waiting:
+                continue
+            worker = self.__shard.holder(ADVERSARY[topic], below=self.__shard.index)
+            if worker is not None:
+                self.__hand_over(next(iter(waiting)), worker)
+
+
+    def __spectate(self, conn, match, piece):
+        """
+        Subscribe a spectator to the events of a topic, which may name a
+        match that has not started yet. The request is confirmed with the
+        dimension of the boards.
+
+        Args:
+            conn (Connection): Spectator requesting the subscription.
+            match (int): Match identifier, or ANY_MATCH.
+            piece (char): Piece symbol, or ANY_PIECE.
+        """
+        if piece not in ADVERSARY and piece != protocol.ANY_PIECE:
+            flog.info("[%s]: Unknown topic %r, dropping client", conn.addr, piece)
+            self.__drop(conn)
+            return
+
+        if conn.spectating is None:
+            conn.spectating = []
+        conn.spectating.append((match, piece))
+        self.__topics.subscribe(match, piece, conn)
+        k = self.__k if self.__k is not None else default_k(self.__rows, self.__cols)
+        self.__send(conn, conn.codec.subscribed(piece, 0, self.__rows, self.__cols, k))
+        self.__snapshot(conn, match, piece)
+        flog.info("[%s]: Spectating topic %s", conn.addr, protocol.topic_name(match, piece))
+
+
+    def __snapshot(self, conn, match_id, piece):
+        """
+        Bring a new spectator up to date with the matches of a topic that
+        are in course: their start and the pieces placed so far are sent
+        in a single write, before any later event.
+
+        Args:
+            conn (Connection): Spectator.
+            match_id (int): Match identifier, or ANY_MATCH.
+            piece (char): Piece symbol, or ANY_PIECE.
+        """
+        if match_id == protocol.ANY_MATCH:
+            matches = self.__matches.values()
+        else:
+            matches = [self.__matches[match_id]] if match_id in self.__matches else []
+
+        codec = conn.codec
+        frames = []
+        for match in matches:
+            first = match.players[0].piece
+            if piece in (protocol.ANY_PIECE, first):
+                frames.append(codec.update(match.id, protocol.STARTED, first))
+            frames.extend(codec.update(match.id, protocol.PASSED, p) if x == protocol.PASS
+                          else codec.update(match.id, protocol.PLACED, p, x, y)
+                          for p, x, y in match.moves if piece in (protocol.ANY_PIECE, p))
+        if frames:
+            self.__send(conn, b"".join(frames))
+
+
+    def __publish(self, match, event, piece, x=0, y=0):
+        """
+        Deliver an event of a match to its spectators, and record it in the
+        journal. The ending of a match is also queued for the results
+        store.
+
+        Args:
+            match (Match): Match of the event.
+            event (int): STARTED, PLACED, WON, DRAWN, LEFT, PASSED or
+                         FORFEITED.
+            piece (char): Piece the event concerns.
+            x (int): Horizontal coordinate of the move, if any.
+            y (int): Vertical coordinate of the move, if any.
+        """
+        if self.__journal is not None:
+            self.__journal.append(match.id, event, piece, x, y)
+        if self.__events is not None:
+            mover = next((player for player in match.players if player.piece == piece), None)
+            self.__events.append(event, match.id, mover.id if mover else 0, len(match.moves),
+                                 piece, x, y, mover.read_at if mover and event in MOVES else 0)
+        if self.__results is not None and event in OUTCOMES:
+            # The last move of a won or drawn match is not among its moves
+            placed = len(match.moves) - match.passes + (event in (protocol.WON, protocol.DRAWN))
+            self.__results.record(match.id, {p.piece: p.name for p in match.players},
+                                  event, piece, placed)
+        self.__topics.publish(match.id, piece,
+                              lambda codec: codec.update(match.id, event, piece, x, y),
+                              self.__send)
+
+
+    def __start(self, first, second):
+        """
+        Start a match between two players. The one that waited in the lobby
+        makes the first move.
+
+        Args:
+            first (Connection): Player that was waiting in the lobby.
+            second (Connection): Player that has just subscribed.
+        """
+        board = Board(self.__rows, self.__cols, self.__k, self.__engine, stats=self.__stats)
+        match = Match(self.__next_id, board, [first, second])
+        self.__next_id += self.__id_step
+        self.__matches[match.id] = match
+        if self.__stats is not None:
+            self.__stats.count("matches_started")
+
+        for turn, player in enumerate(match.players):
+            player.match = match
+            player.piece = ADVERSARY[player.topic]
+            board = match.board
+            token = self.__sessions.token(match.id, player.piece)
+            self.__send(player, player.codec.subscribed(player.topic, turn, board.rows,
+                                                        board.cols, board.k, match.id, token))
+        flog.info("Match %s: %s (%s) vs %s (%s)", match.id, first.addr, first.piece,
+                  second.addr, second.piece)
+        self.__publish(match, protocol.STARTED, first.piece)
+        self.__arm(match)
+
+        # The starting player may have published before being matched
+        self.__process(first)
+
+
+    def __move(self, match, conn, x, y):
+        """
+        Try to place the piece of the player who has the turn, inform both
+        players and pass the turn on success.
+
+        Args:
+            match (Match): Match the move belongs to.
+            conn (Connection): Player who has the turn.
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        piece = conn.piece
+        adversary = match.topics[piece]
+        stats = self.__stats
+        try:
+            won = match.board.play(x, y, piece)
+        except (OccupiedException, OutOfBoardException) as e:
+            if stats is not None:
+                stats.count("moves_rejected")
+            if self.__events is not None:
+                self.__events.append(REJECTED, match.id, conn.id, len(match.moves), piece,
+                                     x, y, conn.read_at)
+            reason = protocol.OCCUPIED if isinstance(e, OccupiedException) else protocol.OUT_OF_BOARD
+            self.__send(conn, conn.codec.reject(reason, x, y))
+            return
+        except StaleMateException:
+            if stats is not None:
+                stats.count("moves_accepted")
+            self.__send(conn, conn.codec.game_over(protocol.STALEMATE, x, y))
+            self.__send(adversary, adversary.codec.game_over(protocol.STALEMATE, x, y))
+            self.__publish(match, protocol.DRAWN, piece, x, y)
+
+            # Boards end drawn games as soon as no line can be completed
+            board = match.board
+            left = board.rows * board.cols - (len(match.moves) - match.passes) - 1
+            self.__finish(match, f"stalemate, {left} boxes left" if left else "stalemate")
+            return
+
+        if stats is not None:
+            stats.count("moves_accepted")
+        if won:
+            self.__send(conn, conn.codec.game_over(protocol.WIN, x, y))
+            self.__send(adversary, adversary.codec.game_over(protocol.LOSE, x, y))
+            self.__publish(match, protocol.WON, piece, x, y)
+            self.__finish(match, f"winner {piece}")
+            return
+
+        if stats is None:
+            self.__send(conn, conn.codec.ack(x, y))
+            self.__send(adversary, adversary.codec.adversary_move(piece, x, y))
+        else:
+            start = time.perf_counter_ns()
+            ack = conn.codec.ack(x, y)
+            moved = adversary.codec.adversary_move(piece, x, y)
+            encoded = time.perf_counter_ns()
+            self.__send(conn, ack)
+            sent = time.perf_counter_ns()
+            self.__send(adversary, moved)
+            stats.record("encode", encoded - start)
+            stats.record("send_mover", sent - encoded)
+            stats.record("send_subscriber", time.perf_counter_ns() - sent)
+        # Events count the moves before theirs, so the move joins after
+        self.__publish(match, protocol.PLACED, piece, x, y)
+        match.moves.append((piece, x, y))
+        if self.__tablebase is not None and not match.passes:
+            self.__judge(match)
+        match.turn = (match.turn + 1) % len(match.players)
+        self.__arm(match)
+
+        # The adversary may have published ahead of its turn
+        self.__process(adversary)
+
+
+    def __arm(self, match):
+        """
+        Start the deadline of the turn of a match, replacing the previous one.
+
+        Args:
+            match (Match): Match whose turn has just begun.
+        """
+        if not self.__turn_timeout:
+            return
+        if match.timer is not None:
+            self.__wheel.cancel(match.timer)
+        match.timer = self.__wheel.schedule(self.__turn_timeout, self.__expire, match)
+
+
+    def __expire(self, match):
+        """
+        Apply the timeout policy to a player who did not move in time: it
+        either forfeits the match or loses the turn, which passes to its
+        adversary under a new deadline.
+
+        Args:
+            match (Match): Match whose turn ran out of time.
+        """
+        match.timer = None
+        conn = match.players[match.turn]
+        piece = conn.piece
+        adversary = match.topics[piece]
+        if self.__on_timeout == "forfeit":
+            self.__send(conn, conn.codec.game_over(protocol.TIMED_OUT))
+            self.__send(adversary, adversary.codec.game_over(protocol.ADVERSARY_TIMED_OUT))
+            self.__publish(match, protocol.FORFEITED, piece)
+            self.__finish(match, f"{piece} ran out of time")
+            return
+
+        # The move the player sends late is discarded on arrival
+        conn.skipped += 1
+        self.__send(conn, conn.codec.passed(piece))
+        self.__send(adversary, adversary.codec.passed(piece))
+        self.__publish(match, protocol.PASSED, piece)
+        match.moves.append((piece, protocol.PASS, protocol.PASS))
+        match.passes += 1
+        flog.info("Match %s: %s ran out of time, turn skipped", match.id, piece)
+        match.turn = (match.turn + 1) % len(match.players)
+        self.__arm(match)
+        self.__process(adversary)
+
+
+    def __judge(self, match):
+        """
+        Compare the value of the last move of a match with the best one,
+        and log it if it was worse.
+
+        Args:
+            match (Match): Match whose last move is judged.
+        """
+        first = match.players[0].piece
+        cols = match.board.cols
+        piece, x, y = match.moves[-1]
+        before = self.__tablebase.probe(*masks(match.moves[:-1], first, cols))
+        after = self.__tablebase.probe(*masks(match.moves, first, cols))
+        if before is None or after is None or -after[0] >= before[0]:
+            return
+        flog.info("Match %s: %s at %s turns a %s into a %s, best was %s", match.id, piece,
+                  [x, y], VALUES[before[0]], VALUES[-after[0]], list(before[1]))
+
+
+    def __finish(self, match, outcome):
+        """
+        Remove a match whose game is over. Binary players stay connected,
+        and may subscribe again to play another match on the same
+        connection; text players are disconnected once their last messages
+        are delivered.
+
+        Args:
+            match (Match): Finished match.
+            outcome (str): Description of the result for the log.
+        """
+        if self.__matches.pop(match.id, None) is None:
+            return
+        if match.timer is not None:
+            self.__wheel.cancel(match.timer)
+            match.timer = None
+        for timer in match.away.values():
+            self.__wheel.cancel(timer)
+        match.away.clear()
+        paused = bool(match.slow)
+        match.slow.clear()
+        for player in match.players:
+            player.match = None
+            if paused and not player.closed:
+                self.__update_events(player)
+            if player.codec is protocol.BINARY and not player.closed:
+                # Moves sent ahead of a turn that never came are dropped,
+                # and late moves still awaited belong to this match only
+                player.topic = None
+                player.piece = None
+                player.inbox.clear()
+                player.skipped = 0
+                continue
+            player.closing = True
+            if not player.outbox:
+                self.__close(player)
+        flog.info("Match %s over: %s", match.id, outcome)
+
+
+    def __send(self, conn, data):
+        """
+        Queue a message for a player or spectator. Messages are written at
+        the end of the iteration of the loop, all those of a connection in
+        one call, and with a journal only once the events they report are
+        committed, so no player learns of an event a crash could lose.
+
+        Args:
+            conn (Connection): Recipient.
+            data (bytes): Encoded message.
+        """
+        if conn.closed:
+            return
+        conn.outbox.append(data)
+        conn.queued += len(data)
+        self.__held.add(conn)
+        if self.__stats is not None:
+            self.__stats.count("messages_queued")
+
+
+    def __flush(self, conn):
+        """
+        Write the queued messages of a connection until the socket would
+        block, gathering them in vectored writes, then apply the
+        backpressure policy to what is left.
+
+        Args:
+            conn (Connection): Player or spectator with messages queued.
+        """
+        outbox = conn.outbox
+        while outbox:
+            try:
+                if len(outbox) == 1:
+                    sent = conn.sock.send(outbox[0])
+                else:
+                    sent = conn.sock.sendmsg(list(islice(outbox, IOV_MAX)))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self.__lose(conn)
+                return
+            if self.__stats is not None:
+                self.__stats.count("write_calls")
+            conn.queued -= sent
+            while sent:
+                size = len(outbox[0])
+                if sent < size:
+                    outbox[0] = memoryview(outbox[0])[sent:]
+                    break
+                outbox.popleft()
+                sent -= size
+            else:
+                continue
+            break
+
+        if conn.closing and not outbox:
+            self.__close(conn)
+            return
+        self.__throttle(conn)
+        if not conn.closed:
+            self.__update_events(conn)
+
+
+    def __throttle(self, conn):
+        """
+        Apply the backpressure policy to a connection whose socket took
+        less than was queued. A slow spectator is always disconnected, and
+        a slow player under the 'disconnect' policy too, losing its match;
+        under 'pause', its match stops until half of its bytes are written.
+        Otherwise players between matches, which receive nothing more, are
+        left alone.
+
+        Args:
+            conn (Connection): Player or spectator just written to.
+        """
+        match = conn.match
+        if conn.queued > self.__max_outbox:
+            if match is not None and conn in match.slow:
+                return
+            if conn.spectating is None and self.__backpressure != "disconnect":
+                if match is None or self.__backpressure == "drop":
+                    return
+                match.slow.add(conn)
+                if len(match.slow) == 1:
+                    self.__pause(match)
+                flog.warning("[%s]: Slow consumer, %s bytes queued, match %s paused",
+                             conn.addr, conn.queued, match.id)
+                return
+            flog.warning("[%s]: Slow consumer, %s bytes queued, disconnected",
+                         conn.addr, conn.queued)
+            if self.__stats is not None:
+                self.__stats.count("slow_consumers")
+            self.__drop(conn)
+        elif match is not None and conn in match.slow and conn.queued <= self.__max_outbox // 2:
+            match.slow.discard(conn)
+            if not match.slow:
+                self.__unpause(match)
+
+
+    def __pause(self, match):
+        """
+        Stop a match whose player cannot keep up: the clock of the turn
+        is stopped and the moves of its players are left unread.
+
+        Args:
+            match (Match): Match to pause.
+        """
+        if self.__stats is not None:
+            self.__stats.count("slow_consumers")
+        if match.timer is not None:
+            self.__wheel.cancel(match.timer)
+            match.timer = None
+        for player in match.players:
+            if not player.closed:
+                self.__update_events(player)
+
+
+    def __unpause(self, match):
+        """
+        Restart a paused match once its players have caught up, with a new
+        deadline for the turn, and handle the moves received meanwhile.
+
+        Args:
+            match (Match): Match to resume.
+        """
+        flog.info("Match %s resumed", match.id)
+        self.__arm(match)
+        for player in match.players:
+            if not player.closed:
+                self.__update_events(player)
+        for player in match.players:
+            if not player.closed and player.match is match:
+                self.__process(player)
+
+
+    def __update_events(self, conn):
+        """
+        Register the socket of a connection for the events it waits for:
+        reading, unless its match is paused, and writing while messages
+        are queued.
+
+        Args:
+            conn (Connection): Player or spectator.
+        """
+        events = 0
+        if conn.match is None or not conn.match.slow:
+            events |= selectors.EVENT_READ
+        if conn.outbox:
+            events |= selectors.EVENT_WRITE
+        if events == conn.events:
+            return
+        if not conn.events:
+            self.__selector.register(conn.sock, events, conn)
+        elif not events:
+            self.__selector.unregister(conn.sock)
+        else:
+            self.__selector.modify(conn.sock, events, conn)
+        conn.events = events
+
+
+    def __drop(self, conn):
+        """
+        Handle a player that disconnected or broke the protocol. Its
+        adversary, if any, wins the match.
+
+        Args:
+            conn (Connection): Player to drop.
+        """
+        match = conn.match
+        self.__close(conn)
+        if match is not None:
+            self.__leave(match, conn)
+
+
+    def __forsake(self, match_id):
+        """
+        End a match recovered from the journal whose players did not all
+        come back in time. A player back wins it, and is told at once; with
+        none back, the player who had the turn is the one that left.
+
+        Args:
+            match_id (int): Identifier of the match.
+        """
+        first, moves, seats, timer = self.__recovered.pop(match_id)
+        back = [(piece, conn) for piece, (conn, seen) in seats.items() if not conn.closed]
+        left = ADVERSARY[back[0][0]] if back else first if len(moves) % 2 == 0 else ADVERSARY[first]
+        if self.__journal is not None:
+            self.__journal.append(match_id, protocol.LEFT, left)
+        if self.__events is not None:
+            self.__events.append(protocol.LEFT, match_id, 0, len(moves), left)
+        for piece, conn in back:
+            self.__send(conn, conn.codec.game_over(protocol.ADVERSARY_LEFT))
+            conn.topic = None
+            conn.inbox.clear()
+        flog.info("Match %s over: %s did not come back after recovery", match_id, left)
+
+
+    def __lose(self, conn):
+        """
+        Handle a connection that broke. With a grace period, a binary player
+        in a match keeps its seat meanwhile, to resume the match on a new
+        connection. The match goes on: the adversary may still move and the
+        clock of the turn still runs. Other connections are dropped.
+
+        Args:
+            conn (Connection): Player or spectator whose connection broke.
+        """
+        match = conn.match
+        if match is None or not self.__grace or conn.codec is not protocol.BINARY:
+            self.__drop(conn)
+            return
+        self.__close(conn)
+        match.away[conn.piece] = self.__wheel.schedule(self.__grace, self.__abandon, match, conn)
+        flog.info("[%s]: Connection lost, seat %s of match %s kept for %s s", conn.addr,
+                  conn.piece, match.id, self.__grace)
+
+
+    def __abandon(self, match, conn):
+        """
+        Give up the seat of a player that did not come back within the grace
+        period: its adversary wins the match.
+
+        Args:
+            match (Match): Match of the player.
+            conn (Connection): Lost connection of the player.
+        """
+        del match.away[conn.piece]
+        self.__leave(match, conn)
+
+
+    def __leave(self, match, conn):
+        """
+        End a match whose player left it, in favour of its adversary.
+
+        Args:
+            match (Match): Match of the player.
+            conn (Connection): Player that left.
+        """
+        adversary = match.topics[conn.piece]
+        self.__send(adversary, adversary.codec.game_over(protocol.ADVERSARY_LEFT))
+        self.__publish(match, protocol.LEFT, conn.piece)
+        self.__finish(match, f"{conn.addr} left")
+
+
+    def __close(self, conn):
+        """
+        Unregister and close the socket of a player or spectator.
+
+        Args:
+            conn (Connection): Player or spectator to disconnect.
+        """
+        if conn.closed:
+            return
+        conn.closed = True
+        conn.closing = True
+        self.__open -= 1
+        if conn.timer is not None:
+            self.__wheel.cancel(conn.timer)
+            conn.timer = None
+        if conn.waiting:
+            self.__unpark(conn)
+        for match, piece in conn.spectating or ():
+            self.__topics.unsubscribe(match, piece, conn)
+        if conn.events:
+            self.__selector.unregister(conn.sock)
+            conn.events = 0
+        conn.sock.close()
+        if self.__events is not None:
+            self.__events.append(CLOSED, conn=conn.id)
+        flog.info("Disconnected from %s", conn.addr)
@@ -0,0 +1,319 @@
+import os
+import time
+import heapq
+import struct
+import argparse
+import protocol
+from collections import Counter, namedtuple
+from stats import Histogram, QUANTILES
+
+# An event log is a header followed by fixed-size records, so a reader
+# walks it in large chunks and a record cut short by a crash is simply
+# left out. Times are nanoseconds of the monotonic clock, which the header
+# ties to the wall clock of the moment the file was opened.
+HEADER = struct.Struct("!4sHQQ")        # magic, worker, wall clock ns, monotonic ns
+RECORD = struct.Struct("!QBBIIIiiQ")    # time, kind, piece, match, connection, ply, x, y, latency
+MAGIC = b"TTTE"
+
+# Kinds of event: those of a match are the ones published to its
+# spectators, the others concern a connection
+CONNECTED = 16
+CLOSED = 17
+REJECTED = 18
+KINDS = {
+    protocol.STARTED: "started",
+    protocol.PLACED: "placed",
+    protocol.WON: "won",
+    protocol.DRAWN: "drawn",
+    protocol.LEFT: "left",
+    protocol.PASSED: "passed",
+    protocol.FORFEITED: "forfeited",
+    CONNECTED: "connected",
+    CLOSED: "closed",
+    REJECTED: "rejected",
+}
+ENDINGS = {protocol.WON, protocol.DRAWN, protocol.LEFT, protocol.FORFEITED}
+MOVES = {protocol.PLACED, protocol.WON, protocol.DRAWN}
+
+BUFFER = 1 << 16        # Bytes of records buffered before a write
+MAX_BYTES = 64 << 20    # Size at which the file is rotated
+BACKUPS = 5             # Rotated files kept
+CHUNK = 4096            # Records read at once
+
+# Record of the stream, with the wall clock time it maps to
+Event = namedtuple("Event", "time wall worker kind piece match conn ply x y latency")
+
+
+class EventLog:
+    """
+    Structured log of the events of a broker: connections, the events of
+    every match and rejected moves, with the connection and the ply they
+    concern. Records are buffered and written once per iteration of the
+    event loop, or sooner if the buffer fills. The file is rotated by
+    size, and on opening so that every file has a single header.
+
+    Parameters:
+        path (str): Path of the log.
+        worker (int): Position of the broker among the workers.
+        max_bytes (int): Size at which the file is rotated.
+        backups (int): Rotated files kept, path.1 being the newest.
+
+    Attributes:
+        file (io.FileIO): File being written, unbuffered.
+        size (int): Bytes written to it.
+        pending (bytearray): Records not written yet.
+    """
+
+    def __init__(self, path, worker=0, max_bytes=MAX_BYTES, backups=BACKUPS):
+        """
+        Start a new log file, rotating the previous one if there is one.
+
+        Args:
+            path (str): Path of the log.
+            worker (int): Position of the broker among the workers.
+            max_bytes (int): Size at which the file is rotated.
+            backups (int): Rotated files kept.
+        """
+        self.__path = path
+        self.__worker = worker
+        self.__max_bytes = max_bytes
+        self.__backups = backups
+        self.__pending = bytearray()
+        self.__file = None
+        if os.path.exists(path) and os.path.getsize(path):
+            self.__rotate()
+        self.__open()
+
+
+    def __open(self):
+        """
+        Open a new file and write its header.
+        """
+        self.__file = open(self.__path, "wb", buffering=0)
+        self.__file.write(HEADER.pack(MAGIC, self.__worker, time.time_ns(), time.monotonic_ns()))
+        self.__size = HEADER.size
+
+
+    def __rotate(self):
+        """
+        Shift the rotated files by one, dropping the oldest, and move the
+        current one to path.1.
+        """
+        if self.__file is not None:
+            self.__file.close()
+        for n in range(self.__backups - 1, 0, -1):
+            if os.path.exists(f"{self.__path}.{n}"):
+                os.replace(f"{self.__path}.{n}", f"{self.__path}.{n + 1}")
+        if self.__backups:
+            os.replace(self.__path, f"{self.__path}.1")
+
+
+    def append(self, kind, match=0, conn=0, ply=0, piece=' ', x=0, y=0, since=0):
+        """
+        Buffer a record, timed now.
+
+        Args:
+            kind (int): Kind of event, one of KINDS.
+            match (int): Match identifier, if any.
+            conn (int): Connection identifier.
+            ply (int): Moves of the match before this one.
+            piece (char): Piece the event concerns, if any.
+            x (int): Horizontal coordinate of the move, if any.
+            y (int): Vertical coordinate of the move, if any.
+            since (int): Monotonic time the bytes of the move were read at,
+                         to record the latency of the broker; 0 if none.
+        """
+        now = time.monotonic_ns()
+        self.__pending += RECORD.pack(now, kind, ord(piece), match, conn, ply, x, y,
+                                      now - since if since else 0)
+        if len(self.__pending) >= BUFFER:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Write the buffered records, and rotate the file once it is full.
+        """
+        if not self.__pending:
+            return
+        self.__file.write(self.__pending)
+        self.__size += len(self.__pending)
+        self.__pending.clear()
+        if self.__size >= self.__max_bytes:
+            self.__rotate()
+            self.__open()
+
+
+    def close(self):
+        """
+        Write the buffered records and close the file.
+        """
+        self.flush()
+        self.__file.close()
+
+
+def rotated(path):
+    """
+    Files of a log, oldest first: its rotated files and itself.
+
+    Args:
+        path (str): Path of the log.
+
+    Returns:
+        list of str: Existing files.
+    """
+    directory, name = os.path.split(path)
+    backups = [int(entry[len(name) + 1:]) for entry in os.listdir(directory or ".")
+               if entry.startswith(name + ".") and entry[len(name) + 1:].isdigit()]
+    files = [f"{path}.{n}" for n in sorted(backups, reverse=True)]
+    return files + [path] if os.path.exists(path) else files
+
+
+def read(path):
+    """
+    Records of a log file, read in chunks.
+
+    Args:
+        path (str): Path of the file.
+
+    Raises:
+        ValueError: If the file is not an event log.
+
+    Yields:
+        Event: Every whole record, in the order written.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        magic, worker, wall, monotonic = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"[BOARD]: {path} is not an event log")
+        while True:
+            chunk = f.read(RECORD.size * CHUNK)
+            whole = len(chunk) - len(chunk) % RECORD.size
+            for t, kind, piece, match, conn, ply, x, y, latency in RECORD.iter_unpack(chunk[:whole]):
+                yield Event(t, wall + t - monotonic, worker, kind, chr(piece), match, conn, ply,
+                            x, y, latency)
+            if len(chunk) < RECORD.size * CHUNK:
+                return
+
+
+def stream(paths):
+    """
+    Records of several logs, each with its rotated files, oldest first.
+
+    Args:
+        paths (list of str): Paths of the logs.
+
+    Yields:
+        Event: Every record.
+    """
+    for path in paths:
+        for name in rotated(path):
+            yield from read(name)
+
+
+def matches(events, think=None, latency=None):
+    """
+    Follow the matches through a stream of records and yield each of them
+    once it ends. Only the matches in course are remembered, so memory
+    depends on the concurrent matches and not on the length of the logs.
+    Matches whose start is not in the logs are left out.
+
+    Args:
+        events (iterable of Event): Records, oldest first.
+        think (Histogram): Histogram of the time between two moves of a
+                           match, None not to measure it.
+        latency (Histogram): Histogram of the time from reading a move to
+                             publishing it, None not to measure it.
+
+    Yields:
+        tuple: Worker, match, wall clock time of the start, duration in
+               ns, moves and kind of ending of every match.
+    """
+    open_ = {}
+    for event in events:
+        key = (event.worker, event.match)
+        if event.kind == protocol.STARTED:
+            open_[key] = [event.time, event.wall, event.time, 0]
+            continue
+        if event.kind == REJECTED and latency is not None:
+            latency.record(event.latency)
+        found = open_.get(key)
+        if found is None or event.kind not in MOVES and event.kind not in ENDINGS:
+            continue
+        if event.kind in MOVES:
+            if think is not None:
+                think.record(event.time - found[2])
+            if latency is not None:
+                latency.record(event.latency)
+            found[2] = event.time
+            found[3] += 1
+        if event.kind in ENDINGS:
+            del open_[key]
+            yield event.worker, event.match, found[1], event.time - found[0], found[3], event.kind
+
+
+def describe(event):
+    """
+    Line of text of a record.
+
+    Args:
+        event (Event): Record.
+
+    Returns:
+        str: Date, worker, kind and fields of the record.
+    """
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event.wall // 10**9))
+    line = (f"{when}.{event.wall % 10**9:09d} w{event.worker} {KINDS.get(event.kind, event.kind):<9} "
+            f"conn {event.conn}")
+    if event.kind not in (CONNECTED, CLOSED):
+        line += f" match {event.match} ply {event.ply} {event.piece}"
+    if event.kind in MOVES or event.kind == REJECTED:
+        line += f" [{event.x}, {event.y}] in {event.latency / 1e3:.1f} us"
+    return line
+
+
+def main():
+    """
+    Main program. Read event logs and their rotated files as a stream, and
+    report the durations of the matches, the time between moves and the
+    latency of the broker, or print every record.
+    """
+    parser = argparse.ArgumentParser(description="Analysis of the event logs of the broker")
+    parser.add_argument("logs", nargs="+", help="event logs; their rotated files are read too")
+    parser.add_argument("--dump", action="store_true", help="print every record instead")
+    parser.add_argument("--slowest", type=int, default=5, help="longest matches shown")
+    args = parser.parse_args()
+
+    if args.dump:
+        for event in stream(args.logs):
+            print(describe(event))
+        return
+
+    durations = Histogram()
+    think = Histogram()
+    latency = Histogram()
+    outcomes = Counter()
+    slowest = []
+    for worker, match, wall, duration, moves, kind in matches(stream(args.logs), think, latency):
+        durations.record(duration)
+        outcomes[KINDS[kind]] += 1
+        heapq.heappush(slowest, (duration, match, worker, wall, moves))
+        if len(slowest) > args.slowest:
+            heapq.heappop(slowest)
+
+    print(f"matches: {sum(outcomes.values())} ({', '.join(f'{n} {kind}' for kind, n in outcomes.most_common())})")
+    for name, histogram, unit, scale in (("match duration", durations, "ms", 1e6),
+                                         ("time between moves", think, "ms", 1e6),
+                                         ("broker latency", latency, "us", 1e3)):
+        quantiles = " ".join(f"{label} {histogram.percentile(q) / scale:.3f}" for label, q in QUANTILES)
+        print(f"{name} ({unit}): {quantiles}")
+    for duration, match, worker, wall, moves in sorted(slowest, reverse=True):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(wall // 10**9))
+        print(f"match {match} (worker {worker}) started {when}: {duration / 1e6:.1f} ms, {moves} moves")
+
+
+if __name__ == "__main__":
+    main()
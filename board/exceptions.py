@@ -1,2 +1,10 @@
 class StaleMateException(Exception):
+    pass
+
+
+class OccupiedException(IndexError):
+    pass
+
+
+class OutOfBoardException(IndexError):
     pass
\ No newline at end of file
@@ -0,0 +1,272 @@
+import os
+import mmap
+import struct
+import protocol
+
+# The journal is a header followed by fixed-size records, one per event of
+# a match, the same events the spectators receive. Pieces are stored as
+# their character code.
+HEADER = struct.Struct("!4sIIH")        # magic, rows, cols, k
+RECORD = struct.Struct("!IBBii")        # match, event, piece, x, y
+MAGIC = b"TTTJ"
+
+# A snapshot is a header followed by every match in course: its start and
+# the pieces placed so far. The header keeps the next match identifier,
+# so identifiers are never handed out twice
+SNAPSHOT = struct.Struct("!4sQII")      # magic, journal offset, next match, matches
+SNAPSHOT_MATCH = struct.Struct("!IBI")  # match, first piece, moves
+SNAPSHOT_MOVE = struct.Struct("!Bii")   # piece, x, y
+SNAPSHOT_MAGIC = b"TTS2"
+
+JOURNAL_FILE = "moves.journal"
+SNAPSHOT_FILE = "matches.snapshot"
+KEY_FILE = "sessions.key"
+
+ENDINGS = {protocol.WON, protocol.DRAWN, protocol.LEFT, protocol.FORFEITED}
+
+
+class Journal:
+    """
+    Append-only record of the events of the matches of a broker, kept on
+    disk to survive a crash. Records are buffered while the broker handles
+    a batch of ready sockets and committed together, with a single write
+    and a single flush to the disk (group commit). Every so many records,
+    the matches in course are also saved to a snapshot, so that recovery
+    only replays the journal written after it.
+
+    Parameters:
+        directory (str): Directory of the journal and the snapshot, created
+                         if needed.
+        rows (int): Number of rows of the boards.
+        cols (int): Number of columns of the boards.
+        k (int): Pieces in a row needed to win.
+        fsync (bool): Whether every commit waits for the disk; without it a
+                      crash of the process loses nothing, but one of the
+                      machine may.
+        snapshot_every (int): Records between two snapshots.
+
+    Attributes:
+        key_path (str): File of the key of the session tokens, kept with
+                        the journal so that the players of the matches it
+                        recovers prove their seats.
+        offset (int): Bytes of the journal committed so far.
+        pending (bytearray): Records not committed yet.
+        since_snapshot (int): Records appended since the last snapshot.
+    """
+
+    def __init__(self, directory, rows, cols, k, fsync=True, snapshot_every=100000):
+        """
+        Open the journal of a directory, creating it if it does not exist.
+
+        Args:
+            directory (str): Directory of the journal and the snapshot.
+            rows (int): Number of rows of the boards.
+            cols (int): Number of columns of the boards.
+            k (int): Pieces in a row needed to win.
+            fsync (bool): Whether every commit waits for the disk.
+            snapshot_every (int): Records between two snapshots.
+
+        Raises:
+            ValueError: If the journal was written for other boards.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.__path = os.path.join(directory, JOURNAL_FILE)
+        self.__snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.__key_path = os.path.join(directory, KEY_FILE)
+        self.__fsync = fsync
+        self.__snapshot_every = snapshot_every
+        self.__fd = os.open(self.__path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self.__pending = bytearray()
+        self.__since_snapshot = 0
+
+        header = HEADER.pack(MAGIC, rows, cols, k)
+        self.__offset = os.fstat(self.__fd).st_size
+        if self.__offset == 0:
+            os.write(self.__fd, header)
+            self.__offset = HEADER.size
+        elif os.pread(self.__fd, HEADER.size, 0) != header:
+            raise ValueError(f"[BOARD]: Journal {self.__path} belongs to other boards")
+
+        # Leave out a record cut short by a crash, so appends stay aligned
+        torn = (self.__offset - HEADER.size) % RECORD.size
+        if torn:
+            self.__offset -= torn
+            os.truncate(self.__fd, self.__offset)
+
+
+    @property
+    def key_path(self):
+        """
+        Getter for key_path attribute.
+
+        Returns:
+            str: File of the key of the session tokens.
+        """
+        return self.__key_path
+
+
+    @property
+    def snapshot_due(self):
+        """
+        Whether enough records were appended to take a new snapshot.
+
+        Returns:
+            bool: True if a snapshot is due; False otherwise.
+        """
+        return self.__since_snapshot >= self.__snapshot_every
+
+
+    def append(self, match, event, piece, x=0, y=0):
+        """
+        Buffer the record of an event until the next commit.
+
+        Args:
+            match (int): Match identifier.
+            event (int): STARTED, PLACED, WON, DRAWN, LEFT, PASSED or
+                         FORFEITED.
+            piece (char): Piece the event concerns.
+            x (int): Horizontal coordinate of the move, if any.
+            y (int): Vertical coordinate of the move, if any.
+        """
+        self.__pending += RECORD.pack(match, event, ord(piece), x, y)
+        self.__since_snapshot += 1
+
+
+    def commit(self):
+        """
+        Write the buffered records in one go and wait for the disk to keep
+        them, if fsync is enabled. Nothing is done if no record is pending.
+        """
+        pending = self.__pending
+        if not pending:
+            return
+        view = memoryview(pending)
+        written = 0
+        while written < len(pending):
+            written += os.write(self.__fd, view[written:])
+        view.release()
+        if self.__fsync:
+            os.fdatasync(self.__fd)
+        self.__offset += len(pending)
+        pending.clear()
+
+
+    def snapshot(self, matches, next_id):
+        """
+        Save the matches in course, after committing the pending records.
+        The snapshot is written to a temporary file renamed over the last
+        one, so a crash leaves either of them whole.
+
+        Args:
+            matches (dict {int: tuple(char, list)}): First piece and pieces
+                                                     placed, as (piece, x,
+                                                     y), of every match in
+                                                     course.
+            next_id (int): Identifier of the next match to start.
+        """
+        self.commit()
+        parts = [SNAPSHOT.pack(SNAPSHOT_MAGIC, self.__offset, next_id, len(matches))]
+        for match, (first, moves) in matches.items():
+            parts.append(SNAPSHOT_MATCH.pack(match, ord(first), len(moves)))
+            parts.extend(SNAPSHOT_MOVE.pack(ord(piece), x, y) for piece, x, y in moves)
+
+        temporary = self.__snapshot_path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(b"".join(parts))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.__snapshot_path)
+        self.__since_snapshot = 0
+
+
+    def recover(self):
+        """
+        Rebuild the matches that were in course when the journal was last
+        written: load the snapshot, if any, and replay the records after it.
+        Finished matches are left out, but their identifiers still count,
+        so that the tokens of their seats are never valid for a new match.
+
+        Returns:
+            tuple(dict, int): First piece and pieces placed, as (piece, x,
+                              y), of every match in course, and lowest
+                              identifier never started. Skipped turns are
+                              placed at PASS, PASS.
+        """
+        matches, offset, next_id = self.__load_snapshot()
+        for match, event, piece, x, y in replay(self.__path, offset):
+            if event == protocol.STARTED:
+                matches[match] = (chr(piece), [])
+                next_id = max(next_id, match + 1)
+            elif event == protocol.PLACED and match in matches:
+                matches[match][1].append((chr(piece), x, y))
+            elif event == protocol.PASSED and match in matches:
+                matches[match][1].append((chr(piece), protocol.PASS, protocol.PASS))
+            elif event in ENDINGS:
+                matches.pop(match, None)
+        return matches, next_id
+
+
+    def __load_snapshot(self):
+        """
+        Read the snapshot through a memory map.
+
+        Returns:
+            tuple(dict, int, int): Matches saved, as returned by recover(),
+                                   journal offset the snapshot covers and
+                                   next match identifier.
+        """
+        try:
+            f = open(self.__snapshot_path, "rb")
+        except FileNotFoundError:
+            return {}, HEADER.size, 0
+
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, offset, next_id, count = SNAPSHOT.unpack_from(data, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"[BOARD]: {self.__snapshot_path} is not a snapshot")
+            pos = SNAPSHOT.size
+            matches = {}
+            for i in range(count):
+                match, first, moves = SNAPSHOT_MATCH.unpack_from(data, pos)
+                pos += SNAPSHOT_MATCH.size
+                matches[match] = (chr(first), [(chr(piece), x, y) for piece, x, y in
+                                               SNAPSHOT_MOVE.iter_unpack(data[pos:pos + moves * SNAPSHOT_MOVE.size])])
+                pos += moves * SNAPSHOT_MOVE.size
+        return matches, offset, next_id
+
+
+    def close(self):
+        """
+        Commit the pending records and close the journal.
+        """
+        self.commit()
+        os.close(self.__fd)
+
+
+def replay(path, offset=HEADER.size):
+    """
+    Read the records of a journal sequentially, straight from a memory map
+    of the file. Records are unpacked in bulk, without a read call per
+    record, so replay goes as fast as the disk delivers the file.
+
+    Args:
+        path (str): Path of the journal.
+        offset (int): Position of the first record to read.
+
+    Returns:
+        iterator of tuple(int, int, int, int, int): Match, event, piece
+                                                    code, x and y of every
+                                                    record.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        end = offset + (size - offset) // RECORD.size * RECORD.size
+        if end <= offset:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            data.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(data)[offset:end]
+            try:
+                yield from RECORD.iter_unpack(view)
+            finally:
+                view.release()
@@ -0,0 +1,207 @@
+import os
+import time
+import random
+import argparse
+import protocol
+from collections import Counter
+from board import Board
+from rules import live_lines
+from exceptions import StaleMateException
+from journal import Journal, replay, JOURNAL_FILE, HEADER, RECORD, ENDINGS
+
+# Moves of a game won by the first player: it plays the top row while the
+# second one plays the middle row
+FIRST = [(0, 0), (0, 1), (0, 2)]
+SECOND = [(1, 0), (1, 1)]
+
+
+def generate(directory, games, batch=1000):
+    """
+    Write the journal of a number of identical 3x3 games, committed in
+    batches as a busy broker would.
+
+    Args:
+        directory (str): Directory of the journal.
+        games (int): Games recorded.
+        batch (int): Games per commit.
+
+    Returns:
+        float: Seconds taken.
+    """
+    journal = Journal(directory, 3, 3, 3, fsync=False, snapshot_every=float("inf"))
+    start = time.perf_counter()
+    for match in range(games):
+        first, second = random.sample(['O', 'X'], 2)
+        journal.append(match, protocol.STARTED, first)
+        for turn in range(len(FIRST) + len(SECOND)):
+            piece = first if turn % 2 == 0 else second
+            x, y = (FIRST if turn % 2 == 0 else SECOND)[turn // 2]
+            journal.append(match, protocol.PLACED, piece, x, y)
+        journal.append(match, protocol.WON, first, *FIRST[-1])
+        if match % batch == batch - 1:
+            journal.commit()
+    journal.close()
+    return time.perf_counter() - start
+
+
+def record(directory, games, rows, cols, k, seed=0):
+    """
+    Write the journal of random games played until the board is full or a
+    player wins, as boards did before ending dead games early.
+
+    Args:
+        directory (str): Directory of the journal.
+        games (int): Games recorded.
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        float: Seconds taken.
+    """
+    journal = Journal(directory, rows, cols, k, fsync=False, snapshot_every=float("inf"))
+    rng = random.Random(seed)
+    boxes = [(x, y) for x in range(rows) for y in range(cols)]
+    start = time.perf_counter()
+    for match in range(games):
+        board = Board(rows, cols, k, "bitboard", early_draw=False)
+        rng.shuffle(boxes)
+        journal.append(match, protocol.STARTED, 'O')
+        for n, (x, y) in enumerate(boxes):
+            piece = "OX"[n % 2]
+            try:
+                if board.play(x, y, piece):
+                    journal.append(match, protocol.WON, piece, x, y)
+                    break
+            except StaleMateException:
+                journal.append(match, protocol.DRAWN, piece, x, y)
+                break
+            journal.append(match, protocol.PLACED, piece, x, y)
+    journal.close()
+    return time.perf_counter() - start
+
+
+def savings(path, rows, cols, k):
+    """
+    Find, for every drawn match of a journal, the move after which no line
+    could be completed, and count the moves played after it, which ending
+    dead games early saves.
+
+    Args:
+        path (str): Path of the journal.
+        rows (int): Number of rows of the boards.
+        cols (int): Number of columns of the boards.
+        k (int): Pieces in a row needed to win.
+
+    Returns:
+        tuple(int, int, int, int): Matches finished, matches drawn, moves
+                                   played and moves saved.
+    """
+    in_course = {}
+    finished = drawn = played = saved = 0
+    for match, event, piece, x, y in replay(path):
+        if event == protocol.STARTED:
+            in_course[match] = [live_lines(rows, cols, k), 0, None]
+            continue
+        state = in_course.get(match)
+        if state is None:
+            continue
+
+        # The last move of a match is recorded by its ending
+        if event not in (protocol.LEFT, protocol.PASSED, protocol.FORFEITED):
+            lines, moves, dead = state
+            state[1] = moves = moves + 1
+            if dead is None and lines is not None and lines.place(x, y, chr(piece)) == 0:
+                state[2] = moves
+        if event in ENDINGS:
+            del in_course[match]
+            lines, moves, dead = state
+            finished += 1
+            played += moves
+            if event == protocol.DRAWN:
+                drawn += 1
+                if dead is not None:
+                    saved += moves - dead
+    return finished, drawn, played, saved
+
+
+def analyze(path):
+    """
+    Stream the records of a journal once and count the outcomes of the
+    matches, without keeping any match in memory.
+
+    Args:
+        path (str): Path of the journal.
+
+    Returns:
+        tuple(int, Counter): Records read and matches per outcome event.
+    """
+    records = 0
+    outcomes = Counter()
+    for match, event, piece, x, y in replay(path):
+        records += 1
+        if event != protocol.PLACED:
+            outcomes[event] += 1
+    return records, outcomes
+
+
+def main():
+    """
+    Main program. Replay the journal of a broker and report the outcomes of
+    its matches and the speed of the replay. With --generate, a synthetic
+    journal is written first, and with --record a corpus of random games.
+    --savings reports the moves early draws save over the matches.
+    """
+    parser = argparse.ArgumentParser(description="Replay of a broker journal")
+    parser.add_argument("directory", help="directory of the journal")
+    parser.add_argument("--generate", type=int, metavar="GAMES",
+                        help="write a journal of GAMES games first")
+    parser.add_argument("--record", type=int, metavar="GAMES",
+                        help="write a journal of GAMES random games first")
+    parser.add_argument("--rows", type=int, default=3, help="rows of the recorded games")
+    parser.add_argument("--cols", type=int, default=3, help="columns of the recorded games")
+    parser.add_argument("--k", type=int, help="pieces in a row needed to win in the recorded games")
+    parser.add_argument("--savings", action="store_true",
+                        help="report the moves saved by ending dead games early")
+    args = parser.parse_args()
+
+    if args.generate:
+        elapsed = generate(args.directory, args.generate)
+        print(f"Wrote {args.generate} games in {elapsed:.2f} s")
+    if args.record:
+        k = args.k if args.k is not None else min(args.rows, args.cols)
+        elapsed = record(args.directory, args.record, args.rows, args.cols, k)
+        print(f"Recorded {args.record} random games in {elapsed:.2f} s")
+
+    path = os.path.join(args.directory, JOURNAL_FILE)
+    start = time.perf_counter()
+    records, outcomes = analyze(path)
+    elapsed = time.perf_counter() - start
+
+    size = records * RECORD.size + HEADER.size
+    print(f"Replayed {records} records ({size / 1e6:.1f} MB) in {elapsed:.2f} s: "
+          f"{records / elapsed:.0f} records/s, {size / 1e6 / elapsed:.1f} MB/s")
+    names = {protocol.STARTED: "started", protocol.WON: "won", protocol.DRAWN: "drawn",
+             protocol.LEFT: "left", protocol.PASSED: "passed", protocol.FORFEITED: "forfeited"}
+    print(", ".join(f"{count} {names[event]}" for event, count in sorted(outcomes.items())))
+
+    # Recovery replays the same records, keeping the matches in course
+    with open(path, "rb") as f:
+        magic, rows, cols, k = HEADER.unpack(f.read(HEADER.size))
+    journal = Journal(args.directory, rows, cols, k)
+    start = time.perf_counter()
+    matches, next_id = journal.recover()
+    elapsed = time.perf_counter() - start
+    journal.close()
+    print(f"Recovered {len(matches)} matches in course in {elapsed:.2f} s, next match {next_id}")
+
+    if args.savings:
+        finished, drawn, played, saved = savings(path, rows, cols, k)
+        print(f"{finished} matches, {drawn} drawn, {played} moves: ending dead games early "
+              f"saves {saved} moves ({saved / max(played, 1):.1%}, "
+              f"{saved / max(drawn, 1):.1f} per draw)")
+
+
+if __name__ == "__main__":
+    main()
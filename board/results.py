@@ -0,0 +1,346 @@
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+import protocol
+from board import flog
+
+BATCH = 512             # Games written in one transaction at most
+FLUSH_EVERY = 1.0       # Seconds a finished game waits to be written at most
+BUSY_TIMEOUT = 30.0     # Seconds a writer waits for the lock of another process
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0         # Largest change of an Elo rating in one game
+
+# Name of every ending of a game, and whether the winner is the piece of
+# the event (True), its adversary (False) or none (None)
+OUTCOMES = {
+    protocol.WON: ("won", True),
+    protocol.DRAWN: ("drawn", None),
+    protocol.LEFT: ("left", False),
+    protocol.FORFEITED: ("forfeited", False),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    match INTEGER NOT NULL,
+    o TEXT NOT NULL,
+    x TEXT NOT NULL,
+    winner TEXT,
+    outcome TEXT NOT NULL,
+    moves INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_o ON games (o, finished);
+CREATE INDEX IF NOT EXISTS games_x ON games (x, finished);
+CREATE INDEX IF NOT EXISTS games_finished ON games (finished);
+CREATE INDEX IF NOT EXISTS games_outcome ON games (outcome, finished);
+CREATE TABLE IF NOT EXISTS ratings (
+    player TEXT PRIMARY KEY,
+    rating REAL NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ratings_rating ON ratings (rating DESC);
+"""
+
+UPSERT = """
+INSERT INTO ratings VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (player) DO UPDATE SET rating = excluded.rating, games = excluded.games,
+    wins = excluded.wins, draws = excluded.draws, losses = excluded.losses,
+    updated = excluded.updated
+"""
+
+
+def expected(rating, other):
+    """
+    Score a player is expected to make against another one, after Elo.
+
+    Args:
+        rating (float): Rating of the player.
+        other (float): Rating of its adversary.
+
+    Returns:
+        float: Expected score, between 0 (loss) and 1 (win).
+    """
+    return 1.0 / (1.0 + 10.0 ** ((other - rating) / 400.0))
+
+
+def connect(path):
+    """
+    Open a results database, creating its tables if needed, in WAL mode so
+    that readers never wait for the writers nor the other way round.
+    Transactions are begun explicitly.
+
+    Args:
+        path (str): Path of the database.
+
+    Returns:
+        sqlite3.Connection: Connection to the database.
+    """
+    db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                         check_same_thread=False)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+class Results:
+    """
+    Store of the finished games in an SQLite database, with the Elo rating
+    of every named player. The broker only queues the games, in constant
+    time: a writer thread inserts them by batches, each in one transaction
+    that also updates the ratings of the players involved, so the
+    leaderboard is read from the ratings table and never computed from the
+    games. Several broker processes may share the database: each batch
+    reads the ratings it updates under the write lock.
+
+    Games with an anonymous player, or between two players of the same
+    name, are stored but not rated.
+
+    Parameters:
+        path (str): Path of the database.
+        batch (int): Games written in one transaction at most.
+        flush_every (float): Seconds a game waits to be written at most.
+
+    Attributes:
+        queue (SimpleQueue): Games waiting for the writer, None to stop it.
+        writer (threading.Thread): Thread writing the games.
+        reader (sqlite3.Connection): Connection of the queries.
+        written (int): Games written so far.
+    """
+
+    def __init__(self, path, batch=BATCH, flush_every=FLUSH_EVERY):
+        """
+        Open the database and start the writer.
+
+        Args:
+            path (str): Path of the database.
+            batch (int): Games written in one transaction at most.
+            flush_every (float): Seconds a game waits to be written at most.
+        """
+        self.__path = path
+        self.__batch = batch
+        self.__flush_every = flush_every
+        self.__reader = connect(path)
+        self.__queue = queue.SimpleQueue()
+        self.__written = 0
+        self.__writer = threading.Thread(target=self.__write, name="results", daemon=True)
+        self.__writer.start()
+
+
+    @property
+    def written(self):
+        """
+        Getter for written attribute.
+
+        Returns:
+            int: Games written to the database so far.
+        """
+        return self.__written
+
+
+    def record(self, match, names, event, piece, moves):
+        """
+        Queue a finished game for the writer.
+
+        Args:
+            match (int): Identifier of the match.
+            names (dict {'char': str}): Name of the player of every piece, ''
+                                        if anonymous.
+            event (int): Ending of the game: WON, DRAWN, LEFT or FORFEITED.
+            piece (char): Piece the ending concerns: the winner, the last to
+                          move in a draw, or the one that left or ran out of
+                          time.
+            moves (int): Pieces placed in the game.
+        """
+        outcome, winner = OUTCOMES[event]
+        if winner is not None:
+            winner = piece if winner else next(p for p in names if p != piece)
+        self.__queue.put((time.time(), match, names.get('O', ''), names.get('X', ''),
+                          winner, outcome, moves))
+
+
+    def __write(self):
+        """
+        Body of the writer: wait for games and write them by batches, once a
+        batch is full or its first game has waited long enough.
+        """
+        db = connect(self.__path)
+        pending = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                game = self.__queue.get(timeout=timeout)
+                if game is None:
+                    stopping = True
+                else:
+                    pending.append(game)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.__flush_every
+            except queue.Empty:
+                pass
+            if pending and (stopping or len(pending) >= self.__batch
+                            or time.monotonic() >= deadline):
+                try:
+                    self.__flush(db, pending)
+                    self.__written += len(pending)
+                except sqlite3.Error as e:
+                    flog.error("Results: %s games lost: %s", len(pending), e)
+                pending = []
+                deadline = None
+        db.close()
+
+
+    def __flush(self, db, games):
+        """
+        Insert a batch of games and update the ratings of their players, in
+        one transaction.
+
+        Args:
+            db (sqlite3.Connection): Connection of the writer.
+            games (list of tuple): Games, as queued by record().
+        """
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("INSERT INTO games (finished, match, o, x, winner, outcome, moves) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?)", games)
+            ratings = {}
+            for finished, match, o, x, winner, outcome, moves in games:
+                if not o or not x or o == x:
+                    continue
+                for name in (o, x):
+                    if name not in ratings:
+                        row = db.execute("SELECT rating, games, wins, draws, losses FROM ratings "
+                                         "WHERE player = ?", (name,)).fetchone()
+                        ratings[name] = list(row) if row else [INITIAL_RATING, 0, 0, 0, 0]
+                    ratings[name][1] += 1
+                first, second = ratings[o], ratings[x]
+                score = 0.5 if winner is None else float(winner == 'O')
+                change = K_FACTOR * (score - expected(first[0], second[0]))
+                first[0] += change
+                second[0] -= change
+                if winner is None:
+                    first[3] += 1
+                    second[3] += 1
+                else:
+                    (first if winner == 'O' else second)[2] += 1
+                    (second if winner == 'O' else first)[4] += 1
+            now = time.time()
+            db.executemany(UPSERT, [(name, *row, now) for name, row in ratings.items()])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+
+    def leaderboard(self, limit=10, offset=0):
+        """
+        Best rated players, read through the index of the ratings.
+
+        Args:
+            limit (int): Players returned at most.
+            offset (int): Players skipped first, for the next pages.
+
+        Returns:
+            list of tuple: Name, rating, games, wins, draws and losses of
+                           every player, best first.
+        """
+        return self.__reader.execute(
+            "SELECT player, rating, games, wins, draws, losses FROM ratings "
+            "ORDER BY rating DESC LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+
+
+    def player(self, name):
+        """
+        Rating of a player and its rank.
+
+        Args:
+            name (str): Name of the player.
+
+        Returns:
+            tuple: Rank, rating, games, wins, draws and losses; None if the
+                   player has no rated game.
+        """
+        row = self.__reader.execute("SELECT rating, games, wins, draws, losses FROM ratings "
+                                    "WHERE player = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        rank, = self.__reader.execute("SELECT COUNT(*) FROM ratings WHERE rating > ?",
+                                      (row[0],)).fetchone()
+        return (rank + 1,) + row
+
+
+    def history(self, name, limit=10):
+        """
+        Last games of a player, read through the indexes by player.
+
+        Args:
+            name (str): Name of the player.
+            limit (int): Games returned at most.
+
+        Returns:
+            list of tuple: Time finished, match, players of O and X, winner
+                           piece (None for a draw), outcome and moves of
+                           every game, last first.
+        """
+        return self.__reader.execute(
+            "SELECT finished, match, o, x, winner, outcome, moves FROM ("
+            "SELECT * FROM (SELECT * FROM games WHERE o = ? ORDER BY finished DESC LIMIT ?) "
+            "UNION ALL "
+            "SELECT * FROM (SELECT * FROM games WHERE x = ? ORDER BY finished DESC LIMIT ?)) "
+            "ORDER BY finished DESC LIMIT ?", (name, limit, name, limit, limit)).fetchall()
+
+
+    def close(self):
+        """
+        Write the games still queued and stop the writer.
+        """
+        self.__queue.put(None)
+        self.__writer.join()
+        self.__reader.close()
+
+
+def main():
+    """
+    Main program. Show the leaderboard of a results database, or the rating
+    and last games of a player.
+    """
+    parser = argparse.ArgumentParser(description="Leaderboard of the finished games")
+    parser.add_argument("database", help="results database of the board server")
+    parser.add_argument("--top", type=int, default=10, help="players shown")
+    parser.add_argument("--player", help="show the rating and last games of a player")
+    args = parser.parse_args()
+
+    results = Results(args.database)
+    try:
+        if args.player is not None:
+            found = results.player(args.player)
+            if found is None:
+                print(f"{args.player} has no rated game")
+                return
+            rank, rating, games, wins, draws, losses = found
+            print(f"#{rank} {args.player}: {rating:.0f} ({games} games: {wins} won, "
+                  f"{draws} drawn, {losses} lost)")
+            for finished, match, o, x, winner, outcome, moves in results.history(args.player, args.top):
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(finished))
+                print(f"{when} match {match}: {o or '?'} (O) vs {x or '?'} (X), {outcome}"
+                      f"{f' by {winner}' if winner else ''} in {moves} moves")
+            return
+
+        print(f"{'rank':>4} {'player':<16} {'rating':>6} {'games':>6} {'won':>6} {'drawn':>6} {'lost':>6}")
+        for rank, (name, rating, games, wins, draws, losses) in enumerate(results.leaderboard(args.top), 1):
+            print(f"{rank:>4} {name:<16} {rating:>6.0f} {games:>6} {wins:>6} {draws:>6} {losses:>6}")
+    finally:
+        results.close()
+
+
+if __name__ == "__main__":
+    main()
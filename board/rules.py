@@ -0,0 +1,886 @@
+from array import array
+from functools import lru_cache
+from protocol import UNBOUNDED, PASS
+
+# Row, column, main diagonal and anti diagonal steps
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+TILE = 16               # Side of the squares the pieces of a sparse board are indexed by
+LISTED_LINES = 1 << 16  # Boxes of the largest board whose lines are all listed
+FREESTYLE_K = 5         # Pieces in a row needed to win on an unbounded board
+
+# Outcome of a move
+PLAYING = 0             # The piece was placed and the game goes on
+WON = 1                 # The piece completed k in a row
+STALEMATE = 2           # The board is full, or no line can be completed any more
+OCCUPIED = 3            # The box was taken: nothing changed
+OUT_OF_BOARD = 4        # The box is outside the board: nothing changed
+
+
+class GridEngine:
+    """
+    Game state stored as a list of lists of one-character strings, as the
+    board was originally drawn. Keeps the length of the run of equal pieces
+    at both ends of every run along each direction, so a move knows whether
+    it completes k in a row without scanning any line.
+
+    Parameters:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+
+    Attributes:
+        board (2D char list (rows x cols)): Piece in every box, ' ' if empty.
+        runs (list of 4 int lists): Length of the run of equal pieces each
+                                    box belongs to along every direction.
+                                    Only the ends of a run are kept up to
+                                    date.
+        filled (int): Number of occupied boxes.
+    """
+
+    __slots__ = ("rows", "cols", "k", "board", "runs", "filled")
+
+    def __init__(self, rows, cols, k):
+        """
+        Initialize an empty grid.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.board = [[' ' for i in range(0, cols)] for i in range(0, rows)]
+        self.runs = [[0] * (rows * cols) for i in range(len(DIRECTIONS))]
+        self.filled = 0
+
+
+    def get(self, x, y):
+        """
+        Piece in a box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            char: Piece symbol, ' ' if the box is empty.
+        """
+        return self.board[x][y]
+
+
+    def __run(self, runs, x, y, piece):
+        """
+        Length of the run of a piece that ends at a box, along the direction
+        of the given run table. The box must be next to an empty one, so it
+        is always an end of its run.
+
+        Args:
+            runs (int list): Run lengths of one direction.
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            int: Number of consecutive pieces ending at the box; 0 if the box
+                 is outside the board or holds another piece.
+        """
+        if not (0 <= x < self.rows and 0 <= y < self.cols) or self.board[x][y] != piece:
+            return 0
+        return runs[x * self.cols + y]
+
+
+    def place(self, x, y, piece):
+        """
+        Place a piece in an empty box. The placed piece joins the runs of the
+        same piece on both sides along each direction, whose lengths are
+        stored at their end boxes.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            bool: True if the piece completes k in a row; False otherwise.
+        """
+        self.board[x][y] = piece
+        self.filled += 1
+
+        won = False
+        for runs, (dx, dy) in zip(self.runs, DIRECTIONS):
+            before = self.__run(runs, x - dx, y - dy, piece)
+            after = self.__run(runs, x + dx, y + dy, piece)
+            length = before + after + 1
+
+            # Only the two ends of the merged run need the new length
+            runs[(x - before * dx) * self.cols + y - before * dy] = length
+            runs[(x + after * dx) * self.cols + y + after * dy] = length
+            if length >= self.k:
+                won = True
+        return won
+
+
+@lru_cache(maxsize=None)
+def line_masks(rows, cols, k):
+    """
+    Precompute, for every box of a bitboard, the masks of the lines of at
+    most 2k-1 boxes centered on it along each direction, together with the
+    shifts that test them for k in a row. Boards sharing a geometry share
+    the result, so games only store their stones.
+
+    Boxes are numbered x * (cols + 1) + y: the spare bit at the end of every
+    row keeps shifted rows from wrapping into the next one.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+
+    Returns:
+        list: For each bit index, a tuple of (mask, shifts) pairs, one per
+              direction with room for k boxes.
+    """
+    width = cols + 1
+    lines = [()] * (rows * width)
+    for x in range(rows):
+        for y in range(cols):
+            cell_lines = []
+            for dx, dy in DIRECTIONS:
+                mask = 0
+                length = 0
+                for i in range(-(k - 1), k):
+                    cx, cy = x + i * dx, y + i * dy
+                    if 0 <= cx < rows and 0 <= cy < cols:
+                        mask |= 1 << (cx * width + cy)
+                        length += 1
+                if length < k:
+                    continue
+
+                # Doubling steps: after shifting by n boxes, a bit survives
+                # if it starts a run of n + step boxes
+                step = dx * width + dy
+                shifts = []
+                n = 1
+                while n < k:
+                    grow = min(n, k - n)
+                    shifts.append(grow * step)
+                    n += grow
+                cell_lines.append((mask, tuple(shifts)))
+            lines[x * width + y] = tuple(cell_lines)
+    return lines
+
+
+class BitboardEngine:
+    """
+    Game state stored as one integer bitmask per piece. Winning is tested
+    only on the lines through the last move, with precomputed masks and a
+    few shift-and-AND operations, and the whole state of a game is a couple
+    of integers.
+
+    Parameters:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+
+    Attributes:
+        width (int): Bits per row, one more than the columns.
+        lines (list): Line masks shared by every board of the same geometry.
+        stones (dict {'char': int}): Bitmask of the boxes of every piece.
+        occupied (int): Bitmask of the occupied boxes.
+        filled (int): Number of occupied boxes.
+    """
+
+    __slots__ = ("width", "lines", "stones", "occupied", "filled")
+
+    def __init__(self, rows, cols, k):
+        """
+        Initialize an empty bitboard.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+        """
+        self.width = cols + 1
+        self.lines = line_masks(rows, cols, k)
+        self.stones = {}
+        self.occupied = 0
+        self.filled = 0
+
+
+    def get(self, x, y):
+        """
+        Piece in a box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            char: Piece symbol, ' ' if the box is empty.
+        """
+        bit = 1 << (x * self.width + y)
+        if self.occupied & bit:
+            for piece, stones in self.stones.items():
+                if stones & bit:
+                    return piece
+        return ' '
+
+
+    def place(self, x, y, piece):
+        """
+        Place a piece in an empty box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            bool: True if the piece completes k in a row; False otherwise.
+        """
+        cell = x * self.width + y
+        bit = 1 << cell
+        stones = self.stones.get(piece, 0) | bit
+        self.stones[piece] = stones
+        self.occupied |= bit
+        self.filled += 1
+
+        for mask, shifts in self.lines[cell]:
+            run = stones & mask
+            for shift in shifts:
+                run &= run >> shift
+            if run:
+                return True
+        return False
+
+
+class PackedEngine:
+    """
+    Game state stored as one byte per box in a packed array, for boards too
+    large for lists of strings or for integers rebuilt on every move. Bytes
+    hold the index of the piece in the pieces list, 0 meaning empty, and
+    winning is tested by counting equal bytes around the last move.
+
+    Parameters:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+
+    Attributes:
+        cells (array('B')): Piece index of every box, row after row.
+        pieces (char list): Piece symbols by index, ' ' first.
+        filled (int): Number of occupied boxes.
+    """
+
+    __slots__ = ("rows", "cols", "k", "cells", "pieces", "filled")
+
+    def __init__(self, rows, cols, k):
+        """
+        Initialize an empty packed board.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = array('B', bytes(rows * cols))
+        self.pieces = [' ']
+        self.filled = 0
+
+
+    def get(self, x, y):
+        """
+        Piece in a box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            char: Piece symbol, ' ' if the box is empty.
+        """
+        return self.pieces[self.cells[x * self.cols + y]]
+
+
+    def __count(self, code, x, y, dx, dy):
+        """
+        Count the consecutive boxes holding a piece from a box onwards, up to
+        k - 1 of them.
+
+        Args:
+            code (int): Index of the piece.
+            x (int): Horizontal coordinate of the first box.
+            y (int): Vertical coordinate of the first box.
+            dx (int): Horizontal step.
+            dy (int): Vertical step.
+
+        Returns:
+            int: Number of consecutive boxes.
+        """
+        n = 0
+        while n < self.k - 1 and 0 <= x < self.rows and 0 <= y < self.cols \
+                and self.cells[x * self.cols + y] == code:
+            n += 1
+            x += dx
+            y += dy
+        return n
+
+
+    def place(self, x, y, piece):
+        """
+        Place a piece in an empty box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            bool: True if the piece completes k in a row; False otherwise.
+        """
+        if piece not in self.pieces:
+            self.pieces.append(piece)
+        code = self.pieces.index(piece)
+        self.cells[x * self.cols + y] = code
+        self.filled += 1
+
+        for dx, dy in DIRECTIONS:
+            if 1 + self.__count(code, x + dx, y + dy, dx, dy) \
+                    + self.__count(code, x - dx, y - dy, -dx, -dy) >= self.k:
+                return True
+        return False
+
+
+class SparseEngine:
+    """
+    Game state stored as a hash map of the occupied boxes only, for huge or
+    unbounded boards: its memory grows with the moves played, not with the
+    size of the board. The pieces are also indexed by the TILE x TILE
+    square they fall in, so a window of the board is drawn by visiting the
+    squares it overlaps instead of every box, and winning is tested by
+    counting equal pieces around the last move, k - 1 boxes at most in
+    every direction.
+
+    Parameters:
+        rows (int): Number of rows of the board, UNBOUNDED if it has none.
+        cols (int): Number of columns of the board, UNBOUNDED if it has none.
+        k (int): Pieces in a row needed to win.
+
+    Attributes:
+        cells (dict {tuple(int, int): char}): Piece of every occupied box.
+        tiles (dict {tuple(int, int): list}): Occupied boxes of every square
+                                              holding any.
+        bounds (tuple(int, int, int, int)): First row, first column, last
+                                            row and last column holding a
+                                            piece, None while the board is
+                                            empty.
+        filled (int): Number of occupied boxes.
+    """
+
+    __slots__ = ("rows", "cols", "k", "cells", "tiles", "bounds", "filled")
+
+    def __init__(self, rows, cols, k):
+        """
+        Initialize an empty sparse board.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = {}
+        self.tiles = {}
+        self.bounds = None
+        self.filled = 0
+
+
+    def get(self, x, y):
+        """
+        Piece in a box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            char: Piece symbol, ' ' if the box is empty.
+        """
+        return self.cells.get((x, y), ' ')
+
+
+    def window(self, top, left, height, width):
+        """
+        Pieces in a rectangular window of the board, found through the
+        squares of the index that the window overlaps.
+
+        Args:
+            top (int): First row of the window.
+            left (int): First column of the window.
+            height (int): Rows of the window.
+            width (int): Columns of the window.
+
+        Returns:
+            2D char list (height x width): Piece in every box of the window,
+                                           ' ' if empty.
+        """
+        rows = [[' '] * width for i in range(height)]
+        cells = self.cells
+        for tx in range(top // TILE, (top + height - 1) // TILE + 1):
+            for ty in range(left // TILE, (left + width - 1) // TILE + 1):
+                for x, y in self.tiles.get((tx, ty), ()):
+                    if 0 <= x - top < height and 0 <= y - left < width:
+                        rows[x - top][y - left] = cells[(x, y)]
+        return rows
+
+
+    def __count(self, piece, x, y, dx, dy):
+        """
+        Count the consecutive boxes holding a piece from a box onwards, up to
+        k - 1 of them. Boxes outside the board are never occupied.
+
+        Args:
+            piece (char): Piece symbol.
+            x (int): Horizontal coordinate of the first box.
+            y (int): Vertical coordinate of the first box.
+            dx (int): Horizontal step.
+            dy (int): Vertical step.
+
+        Returns:
+            int: Number of consecutive boxes.
+        """
+        n = 0
+        cells = self.cells
+        while n < self.k - 1 and cells.get((x, y)) == piece:
+            n += 1
+            x += dx
+            y += dy
+        return n
+
+
+    def place(self, x, y, piece):
+        """
+        Place a piece in an empty box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            bool: True if the piece completes k in a row; False otherwise.
+        """
+        self.cells[(x, y)] = piece
+        self.tiles.setdefault((x // TILE, y // TILE), []).append((x, y))
+        self.filled += 1
+        if self.bounds is None:
+            self.bounds = (x, y, x, y)
+        else:
+            top, left, bottom, right = self.bounds
+            self.bounds = (min(top, x), min(left, y), max(bottom, x), max(right, y))
+
+        for dx, dy in DIRECTIONS:
+            if 1 + self.__count(piece, x + dx, y + dy, dx, dy) \
+                    + self.__count(piece, x - dx, y - dy, -dx, -dy) >= self.k:
+                return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def line_windows(rows, cols, k):
+    """
+    Number every line of k boxes of a board and list, for every box, the
+    lines through it. Boards sharing a geometry share the result.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+
+    Returns:
+        tuple(tuple, int): Lines through every box, numbered x * cols + y,
+                           and number of lines.
+    """
+    windows = [[] for i in range(rows * cols)]
+    count = 0
+    for x in range(rows):
+        for y in range(cols):
+            for dx, dy in DIRECTIONS:
+                if not (0 <= x + (k - 1) * dx < rows and 0 <= y + (k - 1) * dy < cols):
+                    continue
+                for i in range(k):
+                    windows[(x + i * dx) * cols + y + i * dy].append(count)
+                count += 1
+    return tuple(tuple(w) for w in windows), count
+
+
+class LiveLines:
+    """
+    Lines of k boxes that some player may still complete. Every line keeps
+    which pieces it holds, one bit per piece, and a line holding both is
+    dead. Placing a piece only visits the lines through its box, so the
+    number of live lines is known at any time without scanning the board.
+
+    Parameters:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+
+    Attributes:
+        windows (tuple): Lines through every box, shared by every board of
+                         the same geometry.
+        marks (bytearray): Pieces held by every line, one bit per piece.
+        bits (dict {'char': int}): Bit of every piece seen so far.
+        live (int): Number of lines still live.
+    """
+
+    __slots__ = ("cols", "windows", "marks", "bits", "live")
+
+    def __init__(self, rows, cols, k):
+        """
+        Initialize the lines of an empty board, all of them live.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+        """
+        self.cols = cols
+        self.windows, self.live = line_windows(rows, cols, k)
+        self.marks = bytearray(self.live)
+        self.bits = {}
+
+
+    def place(self, x, y, piece):
+        """
+        Take note of a piece placed in a box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            int: Number of lines still live.
+        """
+        bit = self.bits.get(piece)
+        if bit is None:
+            bit = self.bits[piece] = 1 << len(self.bits)
+        marks = self.marks
+        for w in self.windows[x * self.cols + y]:
+            mark = marks[w]
+            if mark and not mark & bit and mark & (mark - 1) == 0:
+                self.live -= 1
+            marks[w] = mark | bit
+        return self.live
+
+
+class SparseLines:
+    """
+    Lines of k boxes that some player may still complete, for boards too
+    large to list them all. Only the lines through an occupied box are
+    kept, numbered by their first box and direction, and the total comes
+    from the size of the board, so memory grows with the moves played.
+
+    Parameters:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+
+    Attributes:
+        marks (dict {tuple(int, int, int): int}): Pieces held by every line
+                                                  that holds any, one bit
+                                                  per piece.
+        bits (dict {'char': int}): Bit of every piece seen so far.
+        live (int): Number of lines still live.
+    """
+
+    __slots__ = ("rows", "cols", "k", "marks", "bits", "live")
+
+    def __init__(self, rows, cols, k):
+        """
+        Initialize the lines of an empty board, all of them live.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.marks = {}
+        self.bits = {}
+        self.live = sum(max(0, rows - (k - 1) * abs(dx)) * max(0, cols - (k - 1) * abs(dy))
+                        for dx, dy in DIRECTIONS)
+
+
+    def place(self, x, y, piece):
+        """
+        Take note of a piece placed in a box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            int: Number of lines still live.
+        """
+        bit = self.bits.get(piece)
+        if bit is None:
+            bit = self.bits[piece] = 1 << len(self.bits)
+        marks = self.marks
+        k = self.k
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            for i in range(k):
+                sx, sy = x - i * dx, y - i * dy
+                if not (0 <= sx < self.rows and 0 <= sy < self.cols
+                        and 0 <= sx + (k - 1) * dx < self.rows and 0 <= sy + (k - 1) * dy < self.cols):
+                    continue
+                mark = marks.get((sx, sy, d), 0)
+                if mark and not mark & bit and mark & (mark - 1) == 0:
+                    self.live -= 1
+                marks[(sx, sy, d)] = mark | bit
+        return self.live
+
+
+def live_lines(rows, cols, k):
+    """
+    Lines of an empty board that may still be completed, all listed on
+    small boards and only the ones in play on large ones.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+
+    Returns:
+        LiveLines | SparseLines: Live lines of the board, None if the board
+                                 is unbounded, where an empty line is always
+                                 left.
+    """
+    if UNBOUNDED in (rows, cols):
+        return None
+    if rows * cols > LISTED_LINES:
+        return SparseLines(rows, cols, k)
+    return LiveLines(rows, cols, k)
+
+
+def default_k(rows, cols):
+    """
+    Pieces in a row needed to win when the game does not tell: the shortest
+    side of the board, or FREESTYLE_K if it has no side.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+
+    Returns:
+        int: Pieces in a row needed to win.
+    """
+    k = min(rows, cols)
+    return FREESTYLE_K if k == UNBOUNDED else k
+
+
+ENGINES = {
+    "grid": GridEngine,
+    "bitboard": BitboardEngine,
+    "packed": PackedEngine,
+    "sparse": SparseEngine,
+}
+
+
+class Game:
+    """
+    Rules of a game of k in a row, over one of the state engines: where a
+    piece may go, and whether a move wins or draws the game. The board
+    server plays its games through it, and so do tournaments run without
+    the server.
+
+    Parameters:
+        rows (int): Number of rows of the board, UNBOUNDED for a board
+                    without top nor bottom edge.
+        cols (int): Number of columns of the board, UNBOUNDED for a board
+                    without left nor right edge.
+        k (int): Pieces in a row needed to win. Defaults to default_k.
+        engine (str): Representation of the game state, one of the keys of
+                      ENGINES.
+        early_draw (bool): Whether the game ends in a stalemate as soon as
+                           no line can be completed, rather than once the
+                           board is full.
+
+    Attributes:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+        state (GridEngine | BitboardEngine | PackedEngine | SparseEngine):
+            Engine that holds the current state of the game.
+        won (bool): Whether a run of k pieces has been completed.
+        lines (LiveLines | SparseLines): Lines that may still be completed,
+                                         None without early draws or on an
+                                         unbounded board.
+        xs (range): Rows a piece may be placed in.
+        ys (range): Columns a piece may be placed in.
+    """
+
+    def __init__(self, rows, cols, k=None, engine="grid", early_draw=True):
+        """
+        Initialize the game with all boxes empty.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+            engine (str): Name of the state engine.
+            early_draw (bool): Whether to end the game once no line can be
+                               completed.
+
+        Raises:
+            ValueError: If the board is unbounded and the engine is not
+                        sparse.
+        """
+        if UNBOUNDED in (rows, cols) and ENGINES[engine] is not SparseEngine:
+            raise ValueError(f"[BOARD]: The {engine} engine needs a bounded board")
+        self.__rows = rows
+        self.__cols = cols
+        self.__k = k if k is not None else default_k(rows, cols)
+        self.__state = ENGINES[engine](rows, cols, self.__k)
+        self.__won = False
+        self.__lines = live_lines(rows, cols, self.__k) if early_draw else None
+        self.__xs = self.__span(rows)
+        self.__ys = self.__span(cols)
+
+
+    @property
+    def rows(self):
+        """
+        Getter for rows attribute.
+
+        Returns:
+            int: Number of rows of the board, UNBOUNDED if it has no edge.
+        """
+        return self.__rows
+
+
+    @property
+    def cols(self):
+        """
+        Getter for cols attribute.
+
+        Returns:
+            int: Number of columns of the board, UNBOUNDED if it has no
+                 edge.
+        """
+        return self.__cols
+
+
+    @property
+    def k(self):
+        """
+        Getter for k attribute.
+
+        Returns:
+            int: Pieces in a row needed to win.
+        """
+        return self.__k
+
+
+    @property
+    def state(self):
+        """
+        Getter for state attribute.
+
+        Returns:
+            GridEngine | BitboardEngine | PackedEngine | SparseEngine: Engine
+                that holds the current state of the game.
+        """
+        return self.__state
+
+
+    @staticmethod
+    def __span(size):
+        """
+        Coordinates of the boxes along one dimension of the board.
+
+        Args:
+            size (int): Number of boxes, UNBOUNDED if there is no edge.
+
+        Returns:
+            range: Valid coordinates: from 0 on a bounded dimension, and any
+                   32-bit signed integer but PASS on an unbounded one.
+        """
+        if size == UNBOUNDED:
+            return range(PASS + 1, -PASS)
+        return range(size)
+
+
+    def place(self, x, y, piece):
+        """
+        Place a piece in an empty box. The state engine tells whether it
+        completes k in a row by looking only around the box.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            int: PLAYING if the piece was placed, OUT_OF_BOARD or OCCUPIED
+                 if it was not.
+        """
+        if x not in self.__xs or y not in self.__ys:
+            return OUT_OF_BOARD
+        if self.__state.get(x, y) != ' ':
+            return OCCUPIED
+        if self.__state.place(x, y, piece):
+            self.__won = True
+        if self.__lines is not None:
+            self.__lines.place(x, y, piece)
+        return PLAYING
+
+
+    def outcome(self):
+        """
+        Check all victory or stalemate conditions to determine whether the
+        game has ended. Both are kept up to date on placement, so the check
+        takes constant time whatever the size of the board.
+
+        Returns:
+            int: WON if k in a row has been completed, STALEMATE if all
+                 boxes are filled or no line can be completed any more,
+                 PLAYING otherwise.
+        """
+        if self.__won:
+            return WON
+        if self.__state.filled == self.__rows * self.__cols:
+            return STALEMATE
+        if self.__lines is not None and self.__lines.live == 0:
+            return STALEMATE
+        return PLAYING
+
+
+    def play(self, x, y, piece):
+        """
+        Place a piece and check whether the move ends the game.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+
+        Returns:
+            int: Outcome of the move: PLAYING, WON, STALEMATE, OCCUPIED or
+                 OUT_OF_BOARD.
+        """
+        placed = self.place(x, y, piece)
+        return placed if placed != PLAYING else self.outcome()
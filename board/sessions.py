@@ -0,0 +1,79 @@
+import os
+import hmac
+import struct
+import hashlib
+
+KEY_SIZE = 32           # Bytes of the secret key
+TOKEN_SIZE = 8          # Bytes of a token, an unsigned 64-bit integer
+SEAT = struct.Struct("!IB")     # match, piece
+
+
+class Sessions:
+    """
+    Tokens of the seats of the matches, which let a player that lost its
+    connection take its seat back and nobody else. A token is a keyed hash
+    of the match and the piece, so the broker stores nothing per match and
+    checks a token in constant time. The key may be kept on disk, so the
+    tokens handed out before a restart still hold after it.
+
+    Parameters:
+        path (str): File of the key, created if it does not exist; None for
+                    a key of this process only.
+
+    Attributes:
+        key (bytes): Secret key of the tokens.
+    """
+
+    def __init__(self, path=None):
+        """
+        Load the key of a file, or draw a new one.
+
+        Args:
+            path (str): File of the key.
+        """
+        if path is None:
+            self.__key = os.urandom(KEY_SIZE)
+            return
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                self.__key = f.read()
+            return
+        self.__key = os.urandom(KEY_SIZE)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.__key)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+    def token(self, match, piece):
+        """
+        Token of a seat.
+
+        Args:
+            match (int): Identifier of the match.
+            piece (char): Piece of the seat.
+
+        Returns:
+            int: Token, never 0.
+        """
+        digest = hashlib.blake2b(SEAT.pack(match, ord(piece)), key=self.__key,
+                                 digest_size=TOKEN_SIZE).digest()
+        return int.from_bytes(digest, "big") or 1
+
+
+    def check(self, match, piece, token):
+        """
+        Whether a token is the one of a seat, compared in constant time.
+
+        Args:
+            match (int): Identifier of the match.
+            piece (char): Piece of the seat.
+            token (int): Token sent by the player.
+
+        Returns:
+            bool: True if the token holds; False otherwise.
+        """
+        return hmac.compare_digest(self.token(match, piece).to_bytes(TOKEN_SIZE, "big"),
+                                   token.to_bytes(TOKEN_SIZE, "big"))
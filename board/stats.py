@@ -0,0 +1,367 @@
+import time
+import socket
+import selectors
+
+# Stages of a move, in the order the broker goes through them
+STAGES = ("recv", "decode", "place", "end_condition", "encode", "send_mover",
+          "send_subscriber", "commit", "flush")
+COUNTERS = ("moves_accepted", "moves_rejected", "matches_started", "connections_accepted",
+            "connections_limited", "connections_shed", "messages_queued", "write_calls",
+            "slow_consumers")
+
+PREFIX = "tictactoe"
+SUB_BUCKETS = 4         # Buckets per power of two of a histogram
+BUCKETS = 64 * SUB_BUCKETS
+EXPOSED = range(8, 35)  # Powers of two of nanoseconds exposed as bucket bounds
+QUANTILES = (("p50", 0.5), ("p99", 0.99), ("p999", 0.999))
+REQUEST_SIZE = 4096
+
+
+class Histogram:
+    """
+    Distribution of durations in nanoseconds, with logarithmic buckets: each
+    power of two is split into four, so a bucket is at most a quarter as
+    wide as its values. Recording a value takes a few integer operations and
+    no allocation.
+
+    Attributes:
+        counts (list of int): Values recorded in every bucket.
+        total (int): Sum of the values recorded.
+        marks (list of int): Counts at the last summary.
+    """
+
+    __slots__ = ("counts", "total", "marks")
+
+    def __init__(self):
+        """
+        Initialize an empty histogram.
+        """
+        self.counts = [0] * BUCKETS
+        self.total = 0
+        self.marks = [0] * BUCKETS
+
+
+    def record(self, ns):
+        """
+        Add a duration to the histogram.
+
+        Args:
+            ns (int): Duration in nanoseconds.
+        """
+        if ns < 2 * SUB_BUCKETS:
+            self.counts[ns] += 1
+        else:
+            shift = ns.bit_length() - 3
+            self.counts[SUB_BUCKETS * shift + (ns >> shift)] += 1
+        self.total += ns
+
+
+    @staticmethod
+    def upper(index):
+        """
+        Exclusive upper bound of the values of a bucket.
+
+        Args:
+            index (int): Position of the bucket.
+
+        Returns:
+            int: Bound in nanoseconds.
+        """
+        if index < 2 * SUB_BUCKETS:
+            return index + 1
+        shift = index // SUB_BUCKETS - 1
+        return (index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift
+
+
+    def percentile(self, fraction, counts=None):
+        """
+        Upper bound of the bucket below which a fraction of the values fall.
+
+        Args:
+            fraction (float): Fraction between 0 and 1.
+            counts (list of int): Counts to use instead of all of them.
+
+        Returns:
+            int: Nanoseconds, 0 if there are no values.
+        """
+        counts = self.counts if counts is None else counts
+        rank = fraction * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                return self.upper(index)
+        return 0
+
+
+    def since_mark(self):
+        """
+        Counts recorded since the last call, which sets a new mark.
+
+        Returns:
+            list of int: Values recorded in every bucket meanwhile.
+        """
+        counts = [now - then for now, then in zip(self.counts, self.marks)]
+        self.marks = self.counts.copy()
+        return counts
+
+
+class Stats:
+    """
+    Latency histograms of every stage of a move and counters of a broker,
+    exposed in the Prometheus text format and summarized in the file log.
+    The broker only takes timestamps when it has a Stats, so it pays for a
+    single comparison per stage without one.
+
+    Parameters:
+        port (int): Port of the stats socket, 0 for any free one, None not
+                    to open it.
+        every (float): Seconds between two summaries in the log, None for
+                       no summary.
+
+    Attributes:
+        stages (dict {str: Histogram}): Duration of every stage.
+        counters (dict {str: int}): Events counted since the start.
+        gauges (dict {str: callable}): Functions returning the current value
+                                       of every gauge.
+        due (float): Monotonic time of the next summary.
+    """
+
+    def __init__(self, port=None, every=None):
+        """
+        Initialize the histograms and counters empty.
+
+        Args:
+            port (int): Port of the stats socket.
+            every (float): Seconds between two summaries in the log.
+        """
+        self.port = port
+        self.every = every
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges = {}
+        self.due = time.monotonic() + every if every else None
+
+
+    def record(self, stage, ns):
+        """
+        Add the duration of a stage.
+
+        Args:
+            stage (str): One of STAGES.
+            ns (int): Duration in nanoseconds.
+        """
+        self.stages[stage].record(ns)
+
+
+    def count(self, counter, n=1):
+        """
+        Increase a counter.
+
+        Args:
+            counter (str): One of COUNTERS.
+            n (int): Increment.
+        """
+        self.counters[counter] += n
+
+
+    def gauge(self, name, value):
+        """
+        Add a gauge, read when the stats are exposed.
+
+        Args:
+            name (str): Name of the gauge.
+            value (callable): Function returning its current value.
+        """
+        self.gauges[name] = value
+
+
+    def exposition(self):
+        """
+        Render the stats in the Prometheus text format. Histograms are in
+        seconds, with a bucket bound at every power of two of nanoseconds.
+
+        Returns:
+            str: Exposition, one sample per line.
+        """
+        lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+        for stage, histogram in self.stages.items():
+            # Buckets are cut at powers of two, so every one falls under a bound
+            cumulative = 0
+            index = 0
+            for power in EXPOSED:
+                while index < BUCKETS and histogram.upper(index) <= 1 << power:
+                    cumulative += histogram.counts[index]
+                    index += 1
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{(1 << power) / 1e9:.9g}"}} {cumulative}')
+            count = sum(histogram.counts)
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram.total / 1e9:.9g}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {count}')
+        for counter, value in self.counters.items():
+            lines.append(f"# TYPE {PREFIX}_{counter}_total counter")
+            lines.append(f"{PREFIX}_{counter}_total {value}")
+        for name, value in self.gauges.items():
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value()}")
+        return "\n".join(lines) + "\n"
+
+
+    def summary(self):
+        """
+        Describe the stages since the previous summary, and set the time of
+        the next one.
+
+        Returns:
+            list of str: One line per stage with values, then the counters
+                         and gauges.
+        """
+        self.due = time.monotonic() + self.every
+        lines = []
+        for stage, histogram in self.stages.items():
+            counts = histogram.since_mark()
+            if not any(counts):
+                continue
+            quantiles = " ".join(f"{label}={histogram.percentile(fraction, counts) / 1e3:.1f}us"
+                                 for label, fraction in QUANTILES)
+            lines.append(f"{stage}: n={sum(counts)} {quantiles}")
+        values = [f"{counter}={value}" for counter, value in self.counters.items()]
+        values += [f"{name}={value()}" for name, value in self.gauges.items()]
+        lines.append(" ".join(values))
+        return lines
+
+
+class Exporter:
+    """
+    Stats socket of a broker, served by the broker's own selector. Every
+    request, be it an HTTP GET of a Prometheus scrape or a bare line sent
+    with netcat, is answered with the current exposition and the
+    connection is closed.
+
+    Parameters:
+        stats (Stats): Stats to expose.
+        address (tuple(str, int)): Address to listen at.
+
+    Attributes:
+        listener (socket.socket): Listening socket, None until listening.
+        address (tuple(str, int)): Address actually bound.
+        clients (dict {socket.socket: memoryview}): Bytes of the answer
+                                                    left to send to every
+                                                    client, None until its
+                                                    request arrives.
+    """
+
+    def __init__(self, stats, address):
+        """
+        Initialize the exporter, not listening yet.
+
+        Args:
+            stats (Stats): Stats to expose.
+            address (tuple(str, int)): Address to listen at.
+        """
+        self.__stats = stats
+        self.__address = address
+        self.__listener = None
+        self.__selector = None
+        self.__clients = {}
+
+
+    @property
+    def address(self):
+        """
+        Getter for address attribute.
+
+        Returns:
+            tuple(str, int): Address the stats socket is bound to.
+        """
+        return self.__listener.getsockname()
+
+
+    def listen(self, selector):
+        """
+        Open the stats socket and register it in a selector, with the
+        exporter as its data.
+
+        Args:
+            selector (selectors.BaseSelector): Selector of the broker.
+        """
+        self.__listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__listener.bind(self.__address)
+        self.__listener.listen()
+        self.__listener.setblocking(False)
+        self.__selector = selector
+        selector.register(self.__listener, selectors.EVENT_READ, self)
+
+
+    def handle(self, sock, mask):
+        """
+        Handle a readiness event of the stats socket or of a client.
+
+        Args:
+            sock (socket.socket): Socket that is ready.
+            mask (int): Events of the socket.
+        """
+        if sock is self.__listener:
+            try:
+                client, _ = sock.accept()
+            except BlockingIOError:
+                return
+            client.setblocking(False)
+            self.__clients[client] = None
+            self.__selector.register(client, selectors.EVENT_READ, self)
+            return
+
+        if self.__clients[sock] is None:
+            try:
+                request = sock.recv(REQUEST_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                request = b""
+            if not request:
+                self.__close(sock)
+                return
+            body = self.__stats.exposition().encode()
+            head = (f"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n").encode()
+            self.__clients[sock] = memoryview(head + body)
+            self.__selector.modify(sock, selectors.EVENT_WRITE, self)
+
+        # Answers are sent as the client takes them, never blocking the broker
+        reply = self.__clients.get(sock)
+        if reply is None:
+            return
+        try:
+            sent = sock.send(reply)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self.__close(sock)
+            return
+        if sent < len(reply):
+            self.__clients[sock] = reply[sent:]
+            return
+        self.__close(sock)
+
+
+    def __close(self, sock):
+        """
+        Forget a client and close its socket.
+
+        Args:
+            sock (socket.socket): Client of the stats socket.
+        """
+        self.__clients.pop(sock, None)
+        self.__selector.unregister(sock)
+        sock.close()
+
+
+    def close(self):
+        """
+        Close the stats socket and every client.
+        """
+        for sock in list(self.__clients):
+            self.__close(sock)
+        if self.__listener is not None:
+            self.__listener.close()
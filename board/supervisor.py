@@ -0,0 +1,290 @@
+import os
+import sys
+import pickle
+import signal
+import socket
+from multiprocessing.sharedctypes import RawArray
+import logger_config
+from board import clog, flog, LOG_FILE_PATH
+from broker import Broker, PIECES, MAX_OUTBOX
+from admission import BURST
+
+MAX_HANDOFF = 65536     # Bytes of the state of a player handed over
+
+
+class Shard:
+    """
+    View a broker worker has of its siblings. The lobby sizes of all the
+    workers live in shared memory, each slot written only by its owner, and
+    every worker receives players handed over by the others through a Unix
+    datagram socket, which carries the file descriptor of the player
+    together with its state.
+
+    Parameters:
+        index (int): Position of the worker among its siblings.
+        waiting (multiprocessing.sharedctypes.RawArray): Players waiting in
+                                                         the lobby of every
+                                                         worker, by piece.
+        channels (list of tuple(socket.socket, socket.socket)): Receiving
+                                                               and sending
+                                                               ends of the
+                                                               channel of
+                                                               every worker.
+
+    Attributes:
+        index (int): Position of the worker.
+        workers (int): Number of workers.
+        inbox (socket.socket): Receiving end of the worker's channel.
+    """
+
+    def __init__(self, index, waiting, channels):
+        """
+        Initialize the view of a worker.
+
+        Args:
+            index (int): Position of the worker.
+            waiting (RawArray): Shared lobby sizes.
+            channels (list of tuple(socket.socket, socket.socket)): Channels
+                                                                   of all the
+                                                                   workers.
+        """
+        self.__index = index
+        self.__waiting = waiting
+        self.__channels = channels
+
+
+    @property
+    def index(self):
+        """
+        Getter for index attribute.
+
+        Returns:
+            int: Position of the worker.
+        """
+        return self.__index
+
+
+    @property
+    def workers(self):
+        """
+        Getter for workers attribute.
+
+        Returns:
+            int: Number of workers.
+        """
+        return len(self.__channels)
+
+
+    @property
+    def inbox(self):
+        """
+        Getter for inbox attribute.
+
+        Returns:
+            socket.socket: Receiving end of the worker's channel.
+        """
+        return self.__channels[self.__index][0]
+
+
+    def waiting(self, topic, delta):
+        """
+        Update the number of players of the worker waiting in its lobby.
+
+        Args:
+            topic (char): Piece the players subscribed to.
+            delta (int): Change of the number of players.
+        """
+        self.__waiting[self.__index * len(PIECES) + PIECES.index(topic)] += delta
+
+
+    def holder(self, topic, below=None):
+        """
+        Find another worker with players waiting for a topic. The counts may
+        be slightly stale, so the player found may be gone on arrival.
+
+        Args:
+            topic (char): Piece the waiting players subscribed to.
+            below (int): Only consider workers of a lower position.
+
+        Returns:
+            int: Position of the worker, None if there is none.
+        """
+        slot = PIECES.index(topic)
+        for worker in range(self.workers if below is None else below):
+            if worker != self.__index and self.__waiting[worker * len(PIECES) + slot] > 0:
+                return worker
+        return None
+
+
+    def hand_over(self, worker, state, sock):
+        """
+        Send a player to another worker. The local socket may be closed
+        afterwards, the receiver holds its own descriptor.
+
+        Args:
+            worker (int): Position of the receiving worker.
+            state (object): Picklable state of the player.
+            sock (socket.socket): Socket of the player.
+
+        Raises:
+            OSError: If the channel is full or the state too large.
+        """
+        socket.send_fds(self.__channels[worker][1], [pickle.dumps(state)], [sock.fileno()])
+
+
+    def receive(self):
+        """
+        Take a player handed over by another worker.
+
+        Raises:
+            BlockingIOError: If no player is waiting in the channel.
+
+        Returns:
+            tuple(object, socket.socket): State and socket of the player.
+        """
+        data, fds, flags, addr = socket.recv_fds(self.inbox, MAX_HANDOFF, 1)
+        return pickle.loads(data), socket.socket(fileno=fds[0])
+
+
+class Supervisor:
+    """
+    Parent of a set of broker workers that share the listening port through
+    SO_REUSEPORT, so the kernel spreads the players among them and every
+    worker runs its own matches on its own core. Players whose adversary
+    waits in another worker are handed over to it.
+
+    Parameters:
+        workers (int): Number of worker processes.
+        rows (int): Number of rows of every board.
+        cols (int): Number of columns of every board.
+        k (int): Pieces in a row needed to win, None for the board default.
+        engine (str): State engine of every board.
+        backlog (int): Size of the listen queue of every worker.
+        journal (callable): Function that opens the journal of a worker
+                            from its position; None not to keep journals.
+        tablebase (Tablebase): Perfect play of the board, whose pages the
+                               workers share; None not to judge the moves.
+        stats (callable): Function that creates the stats of a worker from
+                          its position; None not to take any.
+        turn_timeout (float): Seconds a player has for every move, None for
+                              no limit.
+        on_timeout (str): Policy for a turn that runs out of time.
+        idle_timeout (float): Seconds a connection may stay silent outside
+                              of a match, None for no limit.
+        results (callable): Function that opens the results store of a
+                            worker from its position; None not to keep
+                            results. The workers may share a database.
+        max_outbox (int): Bytes queued for a connection before it is a
+                          slow consumer.
+        backpressure (str): What happens to slow consumers.
+        events (callable): Function that opens the event log of a worker
+                           from its position; None not to keep event logs.
+        rate (float): Connections per second a source address may open to
+                      every worker, None for no limit.
+        burst (int): Connections a source address may open at once.
+        max_connections (int): Connections every worker holds at once,
+                               beyond which new arrivals are shed; None for
+                               no limit.
+        grace (float): Seconds a player that lost its connection keeps its
+                       seat, None to end its match at once.
+
+    Attributes:
+        pids (list of int): Process ids of the workers.
+    """
+
+    def __init__(self, workers, rows, cols, k=None, engine="grid", backlog=1024, journal=None,
+                 tablebase=None, stats=None, turn_timeout=None, on_timeout="forfeit",
+                 idle_timeout=None, results=None, max_outbox=MAX_OUTBOX, backpressure="drop",
+                 events=None, rate=None, burst=BURST, max_connections=None, grace=None):
+        """
+        Initialize the supervisor, without starting any worker.
+
+        Args:
+            workers (int): Number of worker processes.
+            rows (int): Number of rows of every board.
+            cols (int): Number of columns of every board.
+            k (int): Pieces in a row needed to win.
+            engine (str): State engine of every board.
+            backlog (int): Size of the listen queue of every worker.
+            journal (callable): Function that opens the journal of a worker.
+            tablebase (Tablebase): Perfect play of the board.
+            stats (callable): Function that creates the stats of a worker.
+            turn_timeout (float): Seconds a player has for every move.
+            on_timeout (str): Policy for a turn that runs out of time.
+            idle_timeout (float): Seconds a connection may stay silent
+                                  outside of a match.
+            results (callable): Function that opens the results store of a
+                                worker.
+            max_outbox (int): Bytes queued for a slow consumer.
+            backpressure (str): What happens to slow consumers.
+            events (callable): Function that opens the event log of a
+                               worker.
+            rate (float): Connections per second a source may open.
+            burst (int): Connections a source may open at once.
+            max_connections (int): Connections every worker holds at once.
+            grace (float): Seconds a player that lost its connection keeps
+                           its seat.
+        """
+        self.__workers = workers
+        self.__broker = (rows, cols, k, engine, backlog)
+        self.__journal = journal
+        self.__tablebase = tablebase
+        self.__stats = stats
+        self.__deadlines = (turn_timeout, on_timeout, idle_timeout, grace)
+        self.__results = results
+        self.__backpressure = (max_outbox, backpressure)
+        self.__events = events
+        self.__admission = (rate, burst, max_connections)
+        self.__pids = []
+
+
+    def serve(self):
+        """
+        Fork the workers and wait for them until the process is stopped,
+        which stops them too.
+        """
+        waiting = RawArray('i', self.__workers * len(PIECES))
+        channels = [socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+                    for i in range(self.__workers)]
+        for pair in channels:
+            for end in pair:
+                end.setblocking(False)
+
+        for index in range(self.__workers):
+            pid = os.fork()
+            if pid == 0:
+                # The worker leaves through SystemExit, so that its queued
+                # log records are written at exit. Each one logs to a file of
+                # its own, as rotating a shared one would lose records
+                root, ext = os.path.splitext(LOG_FILE_PATH)
+                logger_config.redirect(f"{root}-{index}{ext}")
+                journal = self.__journal(index) if self.__journal is not None else None
+                stats = self.__stats(index) if self.__stats is not None else None
+                results = self.__results(index) if self.__results is not None else None
+                turn_timeout, on_timeout, idle_timeout, grace = self.__deadlines
+                max_outbox, backpressure = self.__backpressure
+                events = self.__events(index) if self.__events is not None else None
+                rate, burst, max_connections = self.__admission
+                Broker(*self.__broker, shard=Shard(index, waiting, channels), journal=journal,
+                       tablebase=self.__tablebase, stats=stats, turn_timeout=turn_timeout,
+                       on_timeout=on_timeout, idle_timeout=idle_timeout,
+                       results=results, max_outbox=max_outbox,
+                       backpressure=backpressure, events=events, rate=rate, burst=burst,
+                       max_connections=max_connections, grace=grace).serve()
+                sys.exit(0)
+            self.__pids.append(pid)
+        clog.info("The supervisor is running %s workers...", self.__workers)
+        flog.info("Supervisor start: workers %s", self.__pids)
+
+        # Stop the workers together with the supervisor
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            while self.__pids:
+                pid, status = os.wait()
+                self.__pids.remove(pid)
+                flog.info("Worker %s exited with status %s", pid, status)
+        finally:
+            for pid in self.__pids:
+                os.kill(pid, signal.SIGTERM)
+            for pid in self.__pids:
+                os.waitpid(pid, 0)
@@ -0,0 +1,485 @@
+import os
+import mmap
+import time
+import struct
+import argparse
+import multiprocessing
+
+# A tablebase is a header followed by one record per position that is not
+# over yet, sorted by key. A position is keyed by the pieces of the player
+# who moved first in its low bits and those of the other player above
+# them, boxes numbered x * cols + y, taking the smallest key among its
+# rotations and reflections.
+HEADER = struct.Struct("!4sBBBQ")       # magic, rows, cols, k, records
+KEY = struct.Struct("!Q")
+RECORD = struct.Struct("!QbBB")         # key, value, best box, plies left
+MAGIC = b"TTTB"
+MAX_BOXES = 32                          # Both sides must fit in a key
+
+WIN, DRAW, LOSS = 1, 0, -1              # Values for the player to move
+VALUES = {WIN: "win", DRAW: "draw", LOSS: "loss"}
+
+# Row, column, main diagonal and anti diagonal steps
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def symmetries(rows, cols):
+    """
+    Permutations of the boxes that map the board onto itself: the 8
+    rotations and reflections of a square, or the 4 reflections of a
+    rectangle.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+
+    Returns:
+        list of list of int: Image of every box under each symmetry, the
+                             identity first.
+    """
+    r, c = rows - 1, cols - 1
+    maps = [lambda x, y: (x, y), lambda x, y: (r - x, y),
+            lambda x, y: (x, c - y), lambda x, y: (r - x, c - y)]
+    if rows == cols:
+        maps += [lambda x, y: (y, x), lambda x, y: (c - y, x),
+                 lambda x, y: (y, r - x), lambda x, y: (c - y, r - x)]
+    perms = []
+    for transform in maps:
+        perm = []
+        for x in range(rows):
+            for y in range(cols):
+                tx, ty = transform(x, y)
+                perm.append(tx * cols + ty)
+        perms.append(perm)
+    return perms
+
+
+def windows(rows, cols, k):
+    """
+    Masks of every line of k boxes of the board.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+
+    Returns:
+        list of int: One bit mask per line.
+    """
+    masks = []
+    for x in range(rows):
+        for y in range(cols):
+            for dx, dy in DIRECTIONS:
+                if 0 <= x + (k - 1) * dx < rows and 0 <= y + (k - 1) * dy < cols:
+                    masks.append(sum(1 << ((x + i * dx) * cols + y + i * dy) for i in range(k)))
+    return masks
+
+
+def transform(mask, perm):
+    """
+    Image of a set of boxes under a symmetry.
+
+    Args:
+        mask (int): Bit mask of the boxes.
+        perm (list of int): Image of every box.
+
+    Returns:
+        int: Bit mask of the images.
+    """
+    image = 0
+    while mask:
+        low = mask & -mask
+        image |= 1 << perm[low.bit_length() - 1]
+        mask ^= low
+    return image
+
+
+def canonical(first, second, cells, perms):
+    """
+    Key of a position, the same for all its symmetric images.
+
+    Args:
+        first (int): Boxes of the player who moved first.
+        second (int): Boxes of the other player.
+        cells (int): Number of boxes.
+        perms (list of list of int): Symmetries of the board.
+
+    Returns:
+        tuple(int, int): Key of the position and the symmetry giving it.
+    """
+    best = None
+    best_sym = 0
+    for sym, perm in enumerate(perms):
+        key = transform(first, perm) | transform(second, perm) << cells
+        if best is None or key < best:
+            best, best_sym = key, sym
+    return best, best_sym
+
+
+# State of the generator, set before the worker processes are forked so
+# they share it instead of receiving a copy with every task
+_geometry = None
+_solved = {}
+
+
+def _expand(keys):
+    """
+    Positions reached in one move from some positions that are not over.
+
+    Args:
+        keys (list of int): Keys of the positions.
+
+    Returns:
+        set of int: Keys of the positions reached.
+    """
+    cells, full, lines, perms = _geometry
+    reached = set()
+    for key in keys:
+        first, second = key & full, key >> cells
+        if _over(first, second, full, lines):
+            continue
+        empty = full & ~(first | second)
+        first_moves = first.bit_count() == second.bit_count()
+        while empty:
+            low = empty & -empty
+            empty ^= low
+            if first_moves:
+                reached.add(canonical(first | low, second, cells, perms)[0])
+            else:
+                reached.add(canonical(first, second | low, cells, perms)[0])
+    return reached
+
+
+def _over(first, second, full, lines):
+    """
+    Whether the game of a position is over: a line is complete or the
+    board is full.
+
+    Args:
+        first (int): Boxes of the player who moved first.
+        second (int): Boxes of the other player.
+        full (int): Mask of every box.
+        lines (list of int): Masks of the lines of k boxes.
+
+    Returns:
+        bool: True if the game is over; False otherwise.
+    """
+    if first | second == full:
+        return True
+    for line in lines:
+        if first & line == line or second & line == line:
+            return True
+    return False
+
+
+def _solve(keys):
+    """
+    Value of some positions, from the values of the positions one move
+    later.
+
+    Args:
+        keys (list of int): Keys of the positions.
+
+    Returns:
+        list of tuple(int, int, int, int): Key, value for the player to
+                                           move, best box, in the frame of
+                                           the key, and plies left of every
+                                           position.
+    """
+    cells, full, lines, perms = _geometry
+    solved = []
+    for key in keys:
+        first, second = key & full, key >> cells
+
+        # The last player to move completed a line or filled the board
+        if any(first & line == line or second & line == line for line in lines):
+            solved.append((key, LOSS, 0, 0))
+            continue
+        if first | second == full:
+            solved.append((key, DRAW, 0, 0))
+            continue
+
+        # Wins as soon as possible, losses as late as possible
+        best = None
+        empty = full & ~(first | second)
+        first_moves = first.bit_count() == second.bit_count()
+        while empty:
+            low = empty & -empty
+            empty ^= low
+            if first_moves:
+                child = canonical(first | low, second, cells, perms)[0]
+            else:
+                child = canonical(first, second | low, cells, perms)[0]
+            value, plies = _solved[child]
+            score = (-value, plies + 1 if value == WIN else -(plies + 1))
+            if best is None or score > best[0]:
+                best = (score, low.bit_length() - 1, plies + 1)
+        (value, _), box, plies = best
+        solved.append((key, value, box, plies))
+    return solved
+
+
+def _chunks(items, count):
+    """
+    Split a list into about count slices of similar size.
+
+    Args:
+        items (list): Items to split.
+        count (int): Slices wanted.
+
+    Returns:
+        list of list: Slices, none of them empty.
+    """
+    size = max(1, -(-len(items) // count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def generate(path, rows, cols, k, workers=None):
+    """
+    Solve every position reachable on a board and write the tablebase.
+    Positions are enumerated layer by layer, a layer per number of pieces
+    placed, and then solved from the last layer back to the empty board.
+    Every layer is split among a pool of processes.
+
+    Args:
+        path (str): Path of the tablebase written.
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        workers (int): Processes of the pool, one per core by default.
+
+    Raises:
+        ValueError: If the board has more boxes than a key holds.
+
+    Returns:
+        int: Positions written.
+    """
+    global _geometry, _solved
+    cells = rows * cols
+    if cells > MAX_BOXES:
+        raise ValueError(f"[TABLEBASE]: {rows}x{cols} boards have more than {MAX_BOXES} boxes")
+    workers = workers or os.cpu_count()
+    _geometry = (cells, (1 << cells) - 1, windows(rows, cols, k), symmetries(rows, cols))
+
+    # The workers are forked for every layer, inheriting what is known
+    context = multiprocessing.get_context("fork")
+    layers = [[0]]
+    while layers[-1]:
+        with context.Pool(workers) as pool:
+            reached = set().union(*pool.map(_expand, _chunks(layers[-1], workers)))
+        layers.append(sorted(reached))
+    layers.pop()
+
+    records = []
+    _solved = {}
+    for layer in reversed(layers):
+        with context.Pool(workers) as pool:
+            solved = [position for part in pool.map(_solve, _chunks(layer, workers))
+                      for position in part]
+        _solved = {key: (value, plies) for key, value, box, plies in solved}
+        records.extend(position for position in solved if position[3] > 0)
+    _solved = {}
+
+    records.sort()
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, rows, cols, k, len(records)))
+        f.write(b"".join(RECORD.pack(*record) for record in records))
+    os.replace(temporary, path)
+    return len(records)
+
+
+class Tablebase:
+    """
+    Perfect-play values and moves of every position of a small board, read
+    straight from a memory map of the file: looking a position up is a
+    binary search over the sorted records, and nothing is loaded into
+    Python objects. Processes opening the same file share its pages.
+
+    Parameters:
+        path (str): Path of the tablebase.
+
+    Attributes:
+        rows (int): Number of rows of the board.
+        cols (int): Number of columns of the board.
+        k (int): Pieces in a row needed to win.
+        count (int): Positions in the tablebase.
+        data (mmap.mmap): Memory map of the file.
+        perms (list of list of int): Symmetries of the board.
+        inverse (list of list of int): Inverse of every symmetry.
+    """
+
+    def __init__(self, path):
+        """
+        Open a tablebase.
+
+        Args:
+            path (str): Path of the tablebase.
+
+        Raises:
+            ValueError: If the file is not a tablebase.
+        """
+        with open(path, "rb") as f:
+            self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.__rows, self.__cols, self.__k, self.__count = HEADER.unpack_from(self.__data, 0)
+        if magic != MAGIC:
+            self.__data.close()
+            raise ValueError(f"[TABLEBASE]: {path} is not a tablebase")
+        self.__data.madvise(mmap.MADV_RANDOM)
+        self.__perms = symmetries(self.__rows, self.__cols)
+        self.__inverse = [[0] * len(perm) for perm in self.__perms]
+        for perm, inverse in zip(self.__perms, self.__inverse):
+            for box, image in enumerate(perm):
+                inverse[image] = box
+
+
+    @property
+    def rows(self):
+        """
+        Getter for rows attribute.
+
+        Returns:
+            int: Number of rows of the board.
+        """
+        return self.__rows
+
+
+    @property
+    def cols(self):
+        """
+        Getter for cols attribute.
+
+        Returns:
+            int: Number of columns of the board.
+        """
+        return self.__cols
+
+
+    @property
+    def k(self):
+        """
+        Getter for k attribute.
+
+        Returns:
+            int: Pieces in a row needed to win.
+        """
+        return self.__k
+
+
+    @property
+    def count(self):
+        """
+        Getter for count attribute.
+
+        Returns:
+            int: Positions in the tablebase.
+        """
+        return self.__count
+
+
+    def covers(self, rows, cols, k):
+        """
+        Whether the tablebase was generated for a board.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+
+        Returns:
+            bool: True if it was; False otherwise.
+        """
+        return (rows, cols, k) == (self.__rows, self.__cols, self.__k)
+
+
+    def probe(self, first, second):
+        """
+        Look a position up.
+
+        Args:
+            first (int): Boxes of the player who moved first, as a bit mask
+                         of x * cols + y.
+            second (int): Boxes of the other player.
+
+        Returns:
+            tuple(int, tuple(int, int), int): Value for the player to move
+                                              (WIN, DRAW or LOSS), best box
+                                              and plies left with perfect
+                                              play; None if the game is
+                                              over or the position can not
+                                              be reached.
+        """
+        cells = self.__rows * self.__cols
+        key, sym = canonical(first, second, cells, self.__perms)
+        data = self.__data
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = KEY.unpack_from(data, HEADER.size + mid * RECORD.size)[0]
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                _, value, box, plies = RECORD.unpack_from(data, HEADER.size + mid * RECORD.size)
+                return value, divmod(self.__inverse[sym][box], self.__cols), plies
+        return None
+
+
+    def close(self):
+        """
+        Unmap the tablebase.
+        """
+        self.__data.close()
+
+
+def masks(moves, first_piece, cols):
+    """
+    Bit masks of both players from the moves of a game.
+
+    Args:
+        moves (list of tuple(char, int, int)): Pieces placed, as (piece,
+                                               x, y).
+        first_piece (char): Piece of the player who moved first.
+        cols (int): Number of columns.
+
+    Returns:
+        tuple(int, int): Boxes of the player who moved first and of the
+                         other one.
+    """
+    first = second = 0
+    for piece, x, y in moves:
+        if piece == first_piece:
+            first |= 1 << (x * cols + y)
+        else:
+            second |= 1 << (x * cols + y)
+    return first, second
+
+
+def main():
+    """
+    Main program. Generate the tablebase of a board and report its size
+    and the time taken.
+    """
+    parser = argparse.ArgumentParser(description="Generator of perfect-play tablebases")
+    parser.add_argument("path", help="tablebase written")
+    parser.add_argument("--rows", type=int, default=3, help="number of rows")
+    parser.add_argument("--cols", type=int, default=3, help="number of columns")
+    parser.add_argument("--k", type=int, help="pieces in a row needed to win (default: shortest side)")
+    parser.add_argument("--workers", type=int, help="processes of the pool (default: one per core)")
+    args = parser.parse_args()
+
+    k = args.k if args.k is not None else min(args.rows, args.cols)
+    start = time.perf_counter()
+    count = generate(args.path, args.rows, args.cols, k, args.workers)
+    elapsed = time.perf_counter() - start
+
+    table = Tablebase(args.path)
+    value, box, plies = table.probe(0, 0)
+    table.close()
+    print(f"{count} positions, {os.path.getsize(args.path)} bytes in {elapsed:.2f} s")
+    print(f"Empty board: {VALUES[value]} for the first player in {plies} plies, best box {list(box)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import time
+
+# Slots of every level of the wheel, and the ticks a slot of each level
+# spans: 256 ticks at the first level, then 64 slots of 256 ticks, 64 of
+# 16384 and 64 of 1048576. With 10 ms ticks, the last level reaches 7 days.
+LEVEL_BITS = (8, 6, 6, 6)
+SHIFTS = (0, 8, 14, 20)
+HORIZON = 1 << 26
+TICK = 0.01
+
+
+class Timer:
+    """
+    Callback due at a tick of a TimerWheel. It is kept in the slot of the
+    wheel that fires it, so the wheel cancels it in constant time.
+
+    Attributes:
+        deadline (int): Tick at which the callback is due.
+        callback (callable): Function called when the timer fires.
+        args (tuple): Arguments of the callback.
+        slot (dict): Slot of the wheel holding the timer, None once fired
+                     or cancelled.
+    """
+
+    __slots__ = ("deadline", "callback", "args", "slot")
+
+    def __init__(self, deadline, callback, args):
+        """
+        Initialize a timer not scheduled yet.
+
+        Args:
+            deadline (int): Tick at which the callback is due.
+            callback (callable): Function called when the timer fires.
+            args (tuple): Arguments of the callback.
+        """
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel: timers are kept in the slot of the tick they
+    are due at, so scheduling and cancelling one take constant time however
+    many are pending. Timers further than the first level are kept in
+    coarser slots of the upper levels, and moved down a level whenever the
+    first one completes a turn. Nothing runs on its own: the owner advances
+    the wheel from its event loop, and the callbacks due run there.
+
+    Parameters:
+        tick (float): Seconds per tick, the resolution of the deadlines.
+        clock (callable): Function returning the current time in seconds.
+
+    Attributes:
+        levels (list of list of dict): Slots of every level, each one a dict
+                                       of timers used as an ordered set.
+        tick (float): Seconds per tick.
+        current (int): Last tick the wheel was advanced to.
+        pending (int): Timers scheduled and neither fired nor cancelled.
+    """
+
+    def __init__(self, tick=TICK, clock=time.monotonic):
+        """
+        Initialize an empty wheel at the current time.
+
+        Args:
+            tick (float): Seconds per tick.
+            clock (callable): Function returning the current time.
+        """
+        self.__tick = tick
+        self.__clock = clock
+        self.__levels = [[{} for slot in range(1 << bits)] for bits in LEVEL_BITS]
+        self.__current = int(clock() / tick)
+        self.__pending = 0
+
+
+    @property
+    def pending(self):
+        """
+        Getter for pending attribute.
+
+        Returns:
+            int: Timers scheduled and neither fired nor cancelled.
+        """
+        return self.__pending
+
+
+    @property
+    def tick(self):
+        """
+        Getter for tick attribute.
+
+        Returns:
+            float: Seconds per tick.
+        """
+        return self.__tick
+
+
+    @property
+    def current(self):
+        """
+        Getter for current attribute.
+
+        Returns:
+            int: Last tick the wheel was advanced to.
+        """
+        return self.__current
+
+
+    def schedule(self, delay, callback, *args):
+        """
+        Call a function once some time has passed.
+
+        Args:
+            delay (float): Seconds from now, at least; the timer fires at
+                           the first tick boundary after them.
+            callback (callable): Function to call.
+            *args: Arguments of the function.
+
+        Returns:
+            Timer: Handle to cancel the call.
+        """
+        # The current tick began up to a tick ago, hence the extra one
+        ticks = max(1, -int(-delay // self.__tick) + 1)
+        timer = Timer(self.__current + ticks, callback, args)
+        self.__insert(timer)
+        self.__pending += 1
+        return timer
+
+
+    def cancel(self, timer):
+        """
+        Keep a timer from firing. Cancelling it again, or once fired, has no
+        effect.
+
+        Args:
+            timer (Timer): Timer to cancel.
+        """
+        if timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self.__pending -= 1
+
+
+    def __insert(self, timer):
+        """
+        Put a timer in the slot of the finest level that reaches its
+        deadline. Deadlines past the last level wait in its furthest slot
+        and are placed again when it is reached.
+
+        Args:
+            timer (Timer): Timer to place.
+        """
+        deadline = min(timer.deadline, self.__current + HORIZON - 1)
+        delta = deadline - self.__current
+        level = 0
+        while level < len(SHIFTS) - 1 and delta >= 1 << SHIFTS[level] + LEVEL_BITS[level]:
+            level += 1
+        slot = self.__levels[level][(deadline >> SHIFTS[level]) & ((1 << LEVEL_BITS[level]) - 1)]
+        slot[timer] = None
+        timer.slot = slot
+
+
+    def timeout(self):
+        """
+        Seconds until the next tick, for the timeout of a select call.
+
+        Returns:
+            float: Seconds to wait at most, None if no timer is pending.
+        """
+        if not self.__pending:
+            return None
+        return max(0.0, (self.__current + 1) * self.__tick - self.__clock())
+
+
+    def advance(self):
+        """
+        Bring the wheel to the current time and fire the timers due meanwhile,
+        in the order of their deadlines. Callbacks may schedule or cancel
+        other timers.
+
+        Returns:
+            int: Timers fired.
+        """
+        target = int(self.__clock() / self.__tick)
+        fired = 0
+        first = self.__levels[0]
+        mask = len(first) - 1
+        while self.__current < target:
+            # An empty wheel skips the ticks it slept through at once
+            if not self.__pending:
+                self.__current = target
+                break
+            self.__current += 1
+            index = self.__current & mask
+            if index == 0:
+                self.__cascade(1)
+
+            slot = first[index]
+            if not slot:
+                continue
+            first[index] = {}
+
+            # A callback may cancel a timer of the same slot
+            for timer in list(slot):
+                if timer.slot is not slot:
+                    continue
+                timer.slot = None
+                self.__pending -= 1
+                fired += 1
+                timer.callback(*timer.args)
+        return fired
+
+
+    def __cascade(self, level):
+        """
+        Move the timers of the slot of a level the wheel has just reached
+        down to finer levels, after doing the same with the next level when
+        this one completes a turn.
+
+        Args:
+            level (int): Level whose slot is reached.
+        """
+        slots = self.__levels[level]
+        index = (self.__current >> SHIFTS[level]) & (len(slots) - 1)
+        if index == 0 and level + 1 < len(SHIFTS):
+            self.__cascade(level + 1)
+        slot = slots[index]
+        if not slot:
+            return
+        slots[index] = {}
+        for timer in slot:
+            self.__insert(timer)
@@ -0,0 +1,114 @@
+from protocol import ANY_MATCH, ANY_PIECE
+
+
+class TopicRegistry:
+    """
+    Subscribers of the topics of the broker's matches. A topic is a match
+    and a piece, and subscriptions may use wildcards for either of them, so
+    an event on match 3 and piece O reaches the subscribers of '3/O', '3/*',
+    '*/O' and '*'. Any number of connections may subscribe to a topic.
+
+    Attributes:
+        subscribers (dict {tuple(int, char): dict}): Connections subscribed
+                                                     to every topic, kept as
+                                                     the keys of a dict to
+                                                     preserve their order.
+    """
+
+    def __init__(self):
+        """
+        Initialize the registry with no topics.
+        """
+        self.__subscribers = {}
+
+
+    def __len__(self):
+        """
+        Number of subscriptions.
+
+        Returns:
+            int: Sum of the subscribers of every topic.
+        """
+        return sum(len(subscribers) for subscribers in self.__subscribers.values())
+
+
+    def subscribe(self, match, piece, conn):
+        """
+        Subscribe a connection to a topic. Subscribing twice has no effect.
+
+        Args:
+            match (int): Match identifier, or ANY_MATCH.
+            piece (char): Piece symbol, or ANY_PIECE.
+            conn (Connection): Subscriber.
+        """
+        self.__subscribers.setdefault((match, piece), {})[conn] = None
+
+
+    def unsubscribe(self, match, piece, conn):
+        """
+        Remove the subscription of a connection to a topic, if it exists.
+
+        Args:
+            match (int): Match identifier, or ANY_MATCH.
+            piece (char): Piece symbol, or ANY_PIECE.
+            conn (Connection): Subscriber.
+        """
+        subscribers = self.__subscribers.get((match, piece))
+        if subscribers is None:
+            return
+        subscribers.pop(conn, None)
+        if not subscribers:
+            del self.__subscribers[(match, piece)]
+
+
+    def subscribers(self, match, piece):
+        """
+        Connections that receive the events of a match and piece, whatever
+        the topic through which they subscribed.
+
+        Args:
+            match (int): Match identifier.
+            piece (char): Piece symbol.
+
+        Returns:
+            list of Connection: Subscribers, each one once.
+        """
+        get = self.__subscribers.get
+        groups = [group for group in (get((match, piece)), get((match, ANY_PIECE)),
+                                      get((ANY_MATCH, piece)), get((ANY_MATCH, ANY_PIECE)))
+                  if group]
+        if len(groups) == 1:
+            return list(groups[0])
+
+        # A connection may be subscribed through several topics
+        recipients = {}
+        for group in groups:
+            recipients.update(group)
+        return list(recipients)
+
+
+    def publish(self, match, piece, encode, send):
+        """
+        Deliver an event to every subscriber. The message is encoded once
+        per protocol, and the same bytes object is handed to every
+        recipient that speaks it.
+
+        Args:
+            match (int): Match identifier.
+            piece (char): Piece the event concerns.
+            encode (callable): Function that takes a codec and returns the
+                               encoded message.
+            send (callable): Function that takes a connection and the bytes
+                             to send it.
+
+        Returns:
+            int: Number of recipients.
+        """
+        recipients = self.subscribers(match, piece)
+        encoded = {}
+        for conn in recipients:
+            data = encoded.get(conn.codec)
+            if data is None:
+                data = encoded[conn.codec] = encode(conn.codec)
+            send(conn, data)
+        return len(recipients)
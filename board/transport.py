@@ -0,0 +1,1038 @@
+import os
+import stat
+import errno
+import itertools
+import socket
+import queue
+import selectors
+from collections import deque
+
+TRANSPORTS = ("tcp", "unix", "socketpair", "memory")
+
+
+def default_transport():
+    """
+    Transport given by the environment, as in the containers: a Unix domain
+    socket at the SERVER_SOCKET path if it is set, TCP at SERVER_NAME and
+    SERVER_PORT otherwise.
+
+    Returns:
+        TcpTransport | UnixTransport: Transport to the board.
+    """
+    path = os.getenv("SERVER_SOCKET")
+    if path:
+        return UnixTransport(path)
+    return TcpTransport()
+
+
+class Transport:
+    """
+    Way the board and the players reach each other. The board listens and
+    accepts connections, polling them with the transport's selector, and
+    the players connect; connections have the interface of a socket,
+    whatever carries their bytes.
+    """
+
+    def listen(self, backlog, shared=False):
+        """
+        Open the listening end of the board.
+
+        Args:
+            backlog (int): Size of the queue of pending connections.
+            shared (bool): Whether other processes listen on the same
+                           address.
+
+        Returns:
+            object: Listening end.
+        """
+        raise NotImplementedError
+
+
+    def accept(self, listener):
+        """
+        Take a connection of the listen queue.
+
+        Args:
+            listener (object): Listening end.
+
+        Returns:
+            tuple(object, object): Connection and name of the peer.
+        """
+        raise NotImplementedError
+
+
+    def connect(self):
+        """
+        Open a blocking connection to the board.
+
+        Returns:
+            object: Connection of the player.
+        """
+        raise NotImplementedError
+
+
+    def keepalive(self, sock, idle, probes):
+        """
+        Have a silent peer probed, so one that vanished without closing the
+        connection is detected. Nothing to do by default, as only a peer on
+        another host can vanish that way.
+
+        Args:
+            sock (object): Connection to watch.
+            idle (int): Seconds of silence before probing, and over which
+                        the probes are spread.
+            probes (int): Unanswered probes before the connection drops.
+        """
+
+
+    def selector(self):
+        """
+        Readiness notifier able to poll the connections of the transport.
+
+        Returns:
+            selectors.BaseSelector: New selector.
+        """
+        return selectors.DefaultSelector()
+
+
+class TcpTransport(Transport):
+    """
+    Connections over TCP, the only transport that reaches another host or
+    container, and the only one whose port several broker workers share.
+
+    Parameters:
+        host (str): Address of the board; the SERVER_NAME environment
+                    variable by default.
+        port (int): Port of the board; the SERVER_PORT environment variable
+                    by default, 0 to listen on any free one.
+
+    Attributes:
+        address (tuple(str, int)): Address of the board, the one actually
+                                   bound once listening.
+    """
+
+    def __init__(self, host=None, port=None):
+        """
+        Initialize the transport.
+
+        Args:
+            host (str): Address of the board.
+            port (int): Port of the board.
+        """
+        self.__address = (host or os.getenv("SERVER_NAME"),
+                          int(port if port is not None else os.getenv("SERVER_PORT")))
+
+
+    @property
+    def address(self):
+        """
+        Getter for address attribute.
+
+        Returns:
+            tuple(str, int): Address of the board.
+        """
+        return self.__address
+
+
+    def listen(self, backlog, shared=False):
+        """
+        Open the listening socket of the board.
+
+        Args:
+            backlog (int): Size of the queue of pending connections.
+            shared (bool): Whether other processes listen on the same port.
+
+        Returns:
+            socket.socket: Listening socket.
+        """
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if shared:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        listener.bind(self.__address)
+        listener.listen(backlog)
+        self.__address = listener.getsockname()
+        return listener
+
+
+    def accept(self, listener):
+        """
+        Take a connection of the listen queue. Small messages are sent at
+        once instead of waiting to be merged.
+
+        Args:
+            listener (socket.socket): Listening socket.
+
+        Raises:
+            BlockingIOError: If the listener does not block and no
+                             connection is pending.
+            OSError: If the process runs out of descriptors or buffers, or
+                     the peer reset the connection before it was set up,
+                     which is then closed.
+
+        Returns:
+            tuple(socket.socket, tuple(str, int)): Connection and address of
+                                                   the peer.
+        """
+        sock, addr = listener.accept()
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            sock.close()
+            raise
+        return sock, addr
+
+
+    def connect(self):
+        """
+        Open a blocking connection to the board.
+
+        Raises:
+            OSError: If the board can not be reached.
+
+        Returns:
+            socket.socket: Connected socket.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.__address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+    def keepalive(self, sock, idle, probes):
+        """
+        Have the kernel probe a silent peer, so one that vanished without
+        closing the connection is detected.
+
+        Args:
+            sock (socket.socket): Connection to watch.
+            idle (int): Seconds of silence before probing, and over which
+                        the probes are spread.
+            probes (int): Unanswered probes before the connection drops.
+        """
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle // probes))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, probes)
+
+
+class UnixTransport(Transport):
+    """
+    Connections over a Unix domain socket, for a board and players on the
+    same host: no TCP stack, checksums nor acknowledgements on the way.
+
+    Parameters:
+        path (str): Path of the socket; the SERVER_SOCKET environment
+                    variable by default.
+
+    Attributes:
+        path (str): Path of the socket.
+    """
+
+    def __init__(self, path=None):
+        """
+        Initialize the transport.
+
+        Args:
+            path (str): Path of the socket.
+        """
+        self.__path = path or os.getenv("SERVER_SOCKET")
+        self.__accepted = 0
+
+
+    @property
+    def path(self):
+        """
+        Getter for path attribute.
+
+        Returns:
+            str: Path of the socket.
+        """
+        return self.__path
+
+
+    @property
+    def address(self):
+        """
+        Getter for address attribute.
+
+        Returns:
+            str: Path of the socket.
+        """
+        return self.__path
+
+
+    def listen(self, backlog, shared=False):
+        """
+        Open the listening socket of the board, replacing the socket file
+        left by a previous board.
+
+        Args:
+            backlog (int): Size of the queue of pending connections.
+            shared (bool): Whether other processes listen on the same path.
+
+        Raises:
+            ValueError: If the socket is to be shared, which a path can not.
+
+        Returns:
+            socket.socket: Listening socket.
+        """
+        if shared:
+            raise ValueError("A Unix domain socket can not be shared by several listeners")
+        try:
+            if stat.S_ISSOCK(os.stat(self.__path).st_mode):
+                os.unlink(self.__path)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.__path)
+        listener.listen(backlog)
+        return listener
+
+
+    def accept(self, listener):
+        """
+        Take a connection of the listen queue. Peers of a Unix domain
+        socket have no address, so they are told apart by a number.
+
+        Args:
+            listener (socket.socket): Listening socket.
+
+        Raises:
+            BlockingIOError: If the listener does not block and no
+                             connection is pending.
+
+        Returns:
+            tuple(socket.socket, tuple(str, int)): Connection and name of
+                                                   the peer.
+        """
+        sock, _ = listener.accept()
+        self.__accepted += 1
+        return sock, (self.__path, self.__accepted)
+
+
+    def connect(self):
+        """
+        Open a blocking connection to the board.
+
+        Raises:
+            OSError: If the board can not be reached.
+
+        Returns:
+            socket.socket: Connected socket.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.__path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class PairListener:
+    """
+    Listening end of a PairTransport: connections are queued by the
+    players' threads, and a byte written to an internal socket pair per
+    connection makes the listener readable for a selector.
+
+    Attributes:
+        inbound (socket.socket): End of the internal pair polled for
+                                 pending connections.
+        wakeup (socket.socket): End of the internal pair written to.
+        pending (deque): Board ends of the connections not accepted yet,
+                         with their names.
+        closed (bool): Whether the listener is closed or not.
+    """
+
+    def __init__(self):
+        """
+        Initialize a listener with no pending connection.
+        """
+        self.__inbound, self.__wakeup = socket.socketpair()
+        self.__pending = deque()
+        self.__closed = False
+
+
+    @property
+    def closed(self):
+        """
+        Getter for closed attribute.
+
+        Returns:
+            bool: True if the listener is closed; False otherwise.
+        """
+        return self.__closed
+
+
+    def fileno(self):
+        """
+        File descriptor to poll for pending connections.
+
+        Returns:
+            int: Descriptor of the inbound end of the internal pair.
+        """
+        return self.__inbound.fileno()
+
+
+    def setblocking(self, flag):
+        """
+        Set whether accepting waits for a connection or not.
+
+        Args:
+            flag (bool): True to wait; False to raise BlockingIOError.
+        """
+        self.__inbound.setblocking(flag)
+
+
+    def queue(self, sock, name):
+        """
+        Add a connection to the listen queue.
+
+        Args:
+            sock (socket.socket): Board end of the connection.
+            name (tuple(str, int)): Name of the peer.
+        """
+        self.__pending.append((sock, name))
+        self.__wakeup.send(b"\0")
+
+
+    def accept(self):
+        """
+        Take a pending connection.
+
+        Raises:
+            BlockingIOError: If the listener does not block and no
+                             connection is pending.
+
+        Returns:
+            tuple(socket.socket, tuple(str, int)): Connection and name of
+                                                   the peer.
+        """
+        self.__inbound.recv(1)
+        return self.__pending.popleft()
+
+
+    def close(self):
+        """
+        Close the listener and the connections it did not accept.
+        """
+        self.__closed = True
+        while self.__pending:
+            self.__pending.popleft()[0].close()
+        self.__inbound.close()
+        self.__wakeup.close()
+
+
+class PairTransport(Transport):
+    """
+    Connections over socket pairs, for a board and players in the same
+    process: real sockets polled by the same selector as TCP ones, without
+    any address nor listen queue in the kernel.
+
+    Attributes:
+        listener (PairListener): Listening end, None until listening.
+        connected (int): Connections opened.
+    """
+
+    def __init__(self):
+        """
+        Initialize the transport, not listening yet.
+        """
+        self.__listener = None
+        self.__connected = 0
+
+
+    @property
+    def address(self):
+        """
+        Getter for address attribute.
+
+        Returns:
+            str: Name of the transport, as it has no address.
+        """
+        return "socketpair"
+
+
+    def listen(self, backlog, shared=False):
+        """
+        Open the listening end of the board.
+
+        Args:
+            backlog (int): Unused, the queue is not bounded.
+            shared (bool): Whether other processes listen too, which they
+                           can not.
+
+        Raises:
+            ValueError: If the listener is to be shared.
+
+        Returns:
+            PairListener: Listening end.
+        """
+        if shared:
+            raise ValueError("Socket pairs can not be shared by several listeners")
+        self.__listener = PairListener()
+        return self.__listener
+
+
+    def accept(self, listener):
+        """
+        Take a connection of the listen queue.
+
+        Args:
+            listener (PairListener): Listening end.
+
+        Raises:
+            BlockingIOError: If the listener does not block and no
+                             connection is pending.
+
+        Returns:
+            tuple(socket.socket, tuple(str, int)): Connection and name of
+                                                   the peer.
+        """
+        return listener.accept()
+
+
+    def connect(self):
+        """
+        Open a blocking connection to the board of this process.
+
+        Raises:
+            ConnectionRefusedError: If the board is not listening.
+
+        Returns:
+            socket.socket: Player end of the connection.
+        """
+        listener = self.__listener
+        if listener is None or listener.closed:
+            raise ConnectionRefusedError(errno.ECONNREFUSED, "No board listening on the socket pairs")
+        player, board = socket.socketpair()
+        self.__connected += 1
+        listener.queue(board, ("socketpair", self.__connected))
+        return player
+
+
+class MemoryEndpoint:
+    """
+    End of an in-memory connection or listener, with the blocking, timeout
+    and non-blocking behaviours of a socket. What arrives at an endpoint is
+    put in a queue whose blocking get is implemented in C, so a reader
+    waits without any lock of Python code, and the selector the endpoint
+    is registered in is told about it.
+
+    Attributes:
+        queue (queue.SimpleQueue): Items arrived and not taken yet.
+        timeout (float): Seconds a read waits at most, None to wait forever
+                         and 0 not to wait.
+        selector (MemorySelector): Selector the endpoint is registered in,
+                                   None if it is not.
+        closed (bool): Whether the endpoint is closed or not.
+    """
+
+    def __init__(self):
+        """
+        Initialize an open, blocking endpoint.
+        """
+        self.queue = queue.SimpleQueue()
+        self.timeout = None
+        self.selector = None
+        self.closed = False
+
+
+    def setblocking(self, flag):
+        """
+        Set whether reads wait or raise BlockingIOError.
+
+        Args:
+            flag (bool): True to wait; False not to.
+        """
+        self.timeout = None if flag else 0.0
+
+
+    def settimeout(self, value):
+        """
+        Set the time a read waits at most.
+
+        Args:
+            value (float): Seconds, None to wait forever and 0 not to wait.
+        """
+        self.timeout = value
+
+
+    def ready(self):
+        """
+        Whether a read would not wait.
+
+        Returns:
+            bool: True if there is something to read; False otherwise.
+        """
+        return not self.queue.empty() or self.closed
+
+
+    def put(self, item):
+        """
+        Deliver an item to the endpoint, from any thread, and wake its
+        reader or its selector.
+
+        Args:
+            item (object): Item to deliver.
+        """
+        self.queue.put(item)
+        selector = self.selector
+        if selector is not None:
+            selector.wake(self)
+
+
+    def take(self):
+        """
+        Take the next item, waiting as long as the timeout allows.
+
+        Raises:
+            BlockingIOError: If there is none and the endpoint does not
+                             block.
+            TimeoutError: If none arrives before the timeout.
+
+        Returns:
+            object: Item taken.
+        """
+        try:
+            return self.queue.get(self.timeout != 0, self.timeout)
+        except queue.Empty:
+            if self.timeout == 0:
+                raise BlockingIOError(errno.EAGAIN, "Resource temporarily unavailable") from None
+            raise TimeoutError("timed out") from None
+
+
+class MemorySocket(MemoryEndpoint):
+    """
+    End of an in-memory connection: what is sent is put in the queue of
+    the other end as it is, without any copy to the kernel nor system call,
+    and reads merge the chunks queued like a stream socket does. Sends
+    never block, as the queues are not bounded. An empty chunk marks the
+    end of the stream.
+
+    Attributes:
+        peer (MemorySocket): Other end of the connection.
+        buffer (bytearray): Bytes taken from the queue and not read yet.
+        eof (bool): Whether the end of the stream was read or not.
+    """
+
+    def __init__(self):
+        """
+        Initialize an end with nothing to read.
+        """
+        super().__init__()
+        self.peer = None
+        self.buffer = bytearray()
+        self.eof = False
+
+
+    def ready(self):
+        """
+        Whether a read would not wait.
+
+        Returns:
+            bool: True if there are bytes to read, the stream is over or
+                  the end is closed; False otherwise.
+        """
+        return bool(self.buffer) or self.eof or not self.queue.empty() or self.closed
+
+
+    def recv(self, size):
+        """
+        Read the bytes received, waiting for them if there are none.
+
+        Args:
+            size (int): Bytes to read at most.
+
+        Raises:
+            BlockingIOError: If there are none and the end does not block.
+            TimeoutError: If none arrive before the timeout.
+            OSError: If the end is closed.
+
+        Returns:
+            bytes: Bytes read, empty once the other end is closed.
+        """
+        if self.closed:
+            raise OSError(errno.EBADF, "Bad file descriptor")
+        buffer = self.buffer
+        if not buffer:
+            if self.eof:
+                return b""
+            chunk = self.take()
+            if not chunk:
+                self.eof = True
+                return b""
+            # A lone chunk that fits is handed over without any copy
+            if len(chunk) <= size and self.queue.empty():
+                return chunk
+            buffer += chunk
+
+        while len(buffer) < size and not self.queue.empty():
+            chunk = self.queue.get_nowait()
+            if not chunk:
+                self.eof = True
+                break
+            buffer += chunk
+        data = bytes(buffer[:size])
+        del buffer[:size]
+        return data
+
+
+    def send(self, data):
+        """
+        Put bytes in the queue of the other end.
+
+        Args:
+            data (bytes): Bytes to send.
+
+        Raises:
+            BrokenPipeError: If the other end is closed.
+            OSError: If this end is closed.
+
+        Returns:
+            int: Bytes sent, all of them.
+        """
+        if self.closed:
+            raise OSError(errno.EBADF, "Bad file descriptor")
+        if self.peer.closed:
+            raise BrokenPipeError(errno.EPIPE, "Broken pipe")
+        if data:
+            self.peer.put(bytes(data))
+        return len(data)
+
+
+    def sendall(self, data):
+        """
+        Put bytes in the queue of the other end.
+
+        Args:
+            data (bytes): Bytes to send.
+        """
+        self.send(data)
+
+
+    def sendmsg(self, buffers):
+        """
+        Put several buffers in the queue of the other end, as one chunk,
+        like a vectored write.
+
+        Args:
+            buffers (iterable of bytes): Buffers to send, in order.
+
+        Returns:
+            int: Bytes sent, all of them.
+        """
+        return self.send(b"".join(buffers))
+
+
+    def close(self):
+        """
+        Close the end; the other one reads an end of file.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.buffer.clear()
+        self.peer.put(b"")
+
+
+class MemoryListener(MemoryEndpoint):
+    """
+    Listening end of a MemoryTransport, whose queue holds the board ends
+    of the connections not accepted yet, with their names.
+    """
+
+    def accept(self):
+        """
+        Take a pending connection, waiting for one if there is none.
+
+        Raises:
+            BlockingIOError: If none is pending and the listener does not
+                             block.
+            OSError: If the listener is closed.
+
+        Returns:
+            tuple(MemorySocket, tuple(str, int)): Connection and name of
+                                                  the peer.
+        """
+        if self.closed:
+            raise OSError(errno.EBADF, "Bad file descriptor")
+        return self.take()
+
+
+    def close(self):
+        """
+        Close the listener and the connections it did not accept.
+        """
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()[0].close()
+
+
+class MemorySelector(selectors.BaseSelector):
+    """
+    Selector of in-memory endpoints, with the interface of the selectors
+    module. Endpoints put themselves in a queue of the selector when
+    something arrives, so a call costs as many checks as endpoints woken
+    meanwhile, not as many as registered, and a selector with nothing to
+    report waits on that queue. Writes never block, so an endpoint waiting
+    to write is always reported.
+
+    Attributes:
+        keys (dict {MemoryEndpoint: selectors.SelectorKey}): Registered
+                                                             endpoints.
+        woken (queue.SimpleQueue): Endpoints that received something.
+        ready (set): Endpoints that may be readable.
+        writers (set): Endpoints waiting to write.
+    """
+
+    def __init__(self):
+        """
+        Initialize a selector with no endpoint.
+        """
+        self.__keys = {}
+        self.__woken = queue.SimpleQueue()
+        self.__ready = set()
+        self.__writers = set()
+
+
+    def register(self, fileobj, events, data=None):
+        """
+        Start polling an endpoint.
+
+        Args:
+            fileobj (MemoryEndpoint): Endpoint to poll.
+            events (int): Mask of EVENT_READ and EVENT_WRITE.
+            data (object): Data attached to the endpoint.
+
+        Raises:
+            ValueError: If the object is not an in-memory endpoint.
+            KeyError: If the endpoint is already registered.
+
+        Returns:
+            selectors.SelectorKey: Key of the endpoint.
+        """
+        if not isinstance(fileobj, MemoryEndpoint):
+            raise ValueError(f"{fileobj!r} is not an in-memory endpoint")
+        if fileobj in self.__keys:
+            raise KeyError(f"{fileobj!r} is already registered")
+        key = selectors.SelectorKey(fileobj, id(fileobj), events, data)
+        self.__keys[fileobj] = key
+        if events & selectors.EVENT_WRITE:
+            self.__writers.add(fileobj)
+        fileobj.selector = self
+        self.__ready.add(fileobj)
+        return key
+
+
+    def unregister(self, fileobj):
+        """
+        Stop polling an endpoint.
+
+        Args:
+            fileobj (MemoryEndpoint): Registered endpoint.
+
+        Raises:
+            KeyError: If the endpoint is not registered.
+
+        Returns:
+            selectors.SelectorKey: Key the endpoint had.
+        """
+        key = self.__keys.pop(fileobj)
+        fileobj.selector = None
+        self.__ready.discard(fileobj)
+        self.__writers.discard(fileobj)
+        return key
+
+
+    def modify(self, fileobj, events, data=None):
+        """
+        Change the events polled for an endpoint or its data.
+
+        Args:
+            fileobj (MemoryEndpoint): Registered endpoint.
+            events (int): Mask of EVENT_READ and EVENT_WRITE.
+            data (object): Data attached to the endpoint.
+
+        Raises:
+            KeyError: If the endpoint is not registered.
+
+        Returns:
+            selectors.SelectorKey: New key of the endpoint.
+        """
+        key = self.__keys[fileobj]._replace(events=events, data=data)
+        self.__keys[fileobj] = key
+        if events & selectors.EVENT_WRITE:
+            self.__writers.add(fileobj)
+        else:
+            self.__writers.discard(fileobj)
+        return key
+
+
+    def wake(self, endpoint):
+        """
+        Note that an endpoint received something, from any thread.
+
+        Args:
+            endpoint (MemoryEndpoint): Endpoint that may be readable.
+        """
+        self.__woken.put(endpoint)
+
+
+    def select(self, timeout=None):
+        """
+        Wait until an endpoint is ready or the timeout runs out.
+
+        Args:
+            timeout (float): Seconds to wait at most, None to wait forever.
+
+        Returns:
+            list of tuple(selectors.SelectorKey, int): Ready endpoints and
+                                                       their events.
+        """
+        ready = self.__ready
+        woken = self.__woken
+        if not ready and not self.__writers and (timeout is None or timeout > 0):
+            try:
+                ready.add(woken.get(True, timeout))
+            except queue.Empty:
+                return []
+        while not woken.empty():
+            ready.add(woken.get_nowait())
+
+        keys = self.__keys
+        events = []
+        for endpoint in list(ready):
+            key = keys.get(endpoint)
+            if key is None or not endpoint.ready():
+                ready.discard(endpoint)
+                continue
+            mask = key.events & (selectors.EVENT_READ | (selectors.EVENT_WRITE if endpoint in self.__writers else 0))
+            if mask:
+                events.append((key, mask))
+        for endpoint in self.__writers:
+            if endpoint not in ready:
+                events.append((keys[endpoint], selectors.EVENT_WRITE))
+        return events
+
+
+    def get_map(self):
+        """
+        Registered endpoints and their keys.
+
+        Returns:
+            dict {MemoryEndpoint: selectors.SelectorKey}: Keys.
+        """
+        return self.__keys
+
+
+    def close(self):
+        """
+        Forget every endpoint.
+        """
+        for fileobj in list(self.__keys):
+            self.unregister(fileobj)
+
+
+class MemoryTransport(Transport):
+    """
+    Connections made of in-memory queues, for a board and players in the
+    same process: no socket, file descriptor nor system call at all, so
+    simulations are bound by the game logic alone. The board must be
+    polled with the transport's own selector, and players run in threads.
+
+    Attributes:
+        listener (MemoryListener): Listening end, None until listening.
+        connected (int): Connections opened.
+    """
+
+    def __init__(self):
+        """
+        Initialize the transport, not listening yet.
+        """
+        self.__listener = None
+        self.__connected = itertools.count(1)
+
+
+    @property
+    def address(self):
+        """
+        Getter for address attribute.
+
+        Returns:
+            str: Name of the transport, as it has no address.
+        """
+        return "memory"
+
+
+    def listen(self, backlog, shared=False):
+        """
+        Open the listening end of the board.
+
+        Args:
+            backlog (int): Unused, the queue is not bounded.
+            shared (bool): Whether other processes listen too, which they
+                           can not.
+
+        Raises:
+            ValueError: If the listener is to be shared.
+
+        Returns:
+            MemoryListener: Listening end.
+        """
+        if shared:
+            raise ValueError("In-memory connections can not be shared by several listeners")
+        self.__listener = MemoryListener()
+        return self.__listener
+
+
+    def accept(self, listener):
+        """
+        Take a connection of the listen queue.
+
+        Args:
+            listener (MemoryListener): Listening end.
+
+        Raises:
+            BlockingIOError: If the listener does not block and no
+                             connection is pending.
+
+        Returns:
+            tuple(MemorySocket, tuple(str, int)): Connection and name of
+                                                  the peer.
+        """
+        return listener.accept()
+
+
+    def connect(self):
+        """
+        Open a blocking connection to the board of this process.
+
+        Raises:
+            ConnectionRefusedError: If the board is not listening.
+
+        Returns:
+            MemorySocket: Player end of the connection.
+        """
+        listener = self.__listener
+        if listener is None or listener.closed:
+            raise ConnectionRefusedError(errno.ECONNREFUSED, "No board listening in memory")
+        player, board = MemorySocket(), MemorySocket()
+        player.peer, board.peer = board, player
+        listener.put((board, ("memory", next(self.__connected))))
+        return player
+
+
+    def selector(self):
+        """
+        Readiness notifier of the endpoints of the transport.
+
+        Returns:
+            MemorySelector: New selector.
+        """
+        return MemorySelector()
@@ -0,0 +1,82 @@
+from protocol import UNBOUNDED
+
+WINDOW = 15     # Rows and columns drawn at most by default
+
+
+def viewport(rows, cols, x, y, size):
+    """
+    Window of at most size x size boxes around a box, kept inside the board
+    along the dimensions that have edges.
+
+    Args:
+        rows (int): Number of rows of the board, UNBOUNDED if it has none.
+        cols (int): Number of columns of the board, UNBOUNDED if it has none.
+        x (int): Row of the box to show.
+        y (int): Column of the box to show.
+        size (int): Rows and columns of the window at most.
+
+    Returns:
+        tuple(int, int, int, int): First row, first column, rows and columns
+                                   of the window.
+    """
+    height = min(size, rows)
+    width = min(size, cols)
+    top = x - height // 2
+    left = y - width // 2
+    if rows != UNBOUNDED:
+        top = min(max(0, top), rows - height)
+    if cols != UNBOUNDED:
+        left = min(max(0, left), cols - width)
+    return top, left, height, width
+
+
+class ConsoleView:
+    """
+    Incremental view of a board on the console. Every move is printed as a
+    one-line delta, and every few moves the board is drawn, only within a
+    window around the last move, so showing a move costs the same on any
+    board size.
+
+    Parameters:
+        board (Board): Board shown.
+        snapshot_every (int): Moves between two drawings; 0 never draws.
+        window (int): Rows and columns of the drawings at most.
+
+    Attributes:
+        moves (int): Moves shown so far.
+    """
+
+    def __init__(self, board, snapshot_every=1, window=WINDOW):
+        """
+        Initialize the view of an empty board.
+
+        Args:
+            board (Board): Board shown.
+            snapshot_every (int): Moves between two drawings.
+            window (int): Rows and columns of the drawings at most.
+        """
+        self.__board = board
+        self.__snapshot_every = snapshot_every
+        self.__window = window
+        self.__moves = 0
+
+
+    def placed(self, x, y, piece):
+        """
+        Show a piece placed on the board.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            piece (char): Piece symbol.
+        """
+        self.__moves += 1
+        if not self.__snapshot_every or self.__moves % self.__snapshot_every:
+            print(f"{piece} -> [{x}, {y}]")
+            return
+
+        board = self.__board
+        top, left, height, width = viewport(board.rows, board.cols, x, y, self.__window)
+        if height < board.rows or width < board.cols:
+            print(f"Rows {top}-{top + height - 1}, columns {left}-{left + width - 1}:")
+        print(board.render(top, left, height, width))
@@ -0,0 +1,531 @@
+import time
+import asyncio
+import protocol
+from collections import deque
+from player import PIECES, clog, flog
+from transport import default_transport, UnixTransport, PairTransport, MemoryTransport
+
+RECV_SIZE = 4096
+CONNECT_ATTEMPTS = 10   # Connections tried before giving up
+CONNECT_DELAY = 0.1     # Seconds before the second one, doubled each time
+CONNECT_MAX_DELAY = 2.0
+RESUME_ATTEMPTS = 3     # Connections that may fail to resume a match
+
+
+class Link:
+    """
+    Connection to the board, used by one session at a time. Binary
+    connections outlive their match, so a pool hands them to the next
+    session instead of opening a new one.
+
+    Parameters:
+        reader (asyncio.StreamReader): Incoming side of the connection.
+        writer (asyncio.StreamWriter): Outgoing side of the connection.
+
+    Attributes:
+        decoder (BinaryDecoder): Incremental decoder of the board's messages.
+        inbox (deque): Decoded messages not handled yet.
+    """
+
+    __slots__ = ("reader", "writer", "decoder", "inbox")
+
+    def __init__(self, reader, writer):
+        """
+        Initialize a fresh connection.
+
+        Args:
+            reader (asyncio.StreamReader): Incoming side of the connection.
+            writer (asyncio.StreamWriter): Outgoing side of the connection.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.decoder = protocol.BINARY.client_decoder()
+        self.inbox = deque()
+
+
+    async def receive(self):
+        """
+        Wait for the next message of the board.
+
+        Raises:
+            ConnectionError: If the board closes the connection.
+
+        Returns:
+            tuple: Decoded message, opcode first.
+        """
+        while not self.inbox:
+            data = await self.reader.read(RECV_SIZE)
+            if not data:
+                raise ConnectionError("[PLAYER]: Connection closed by the board")
+            self.inbox.extend(self.decoder.feed(data))
+        return self.inbox.popleft()
+
+
+    def send(self, data):
+        """
+        Queue a message for the board, without waiting for it to be sent.
+
+        Args:
+            data (bytes): Encoded message.
+        """
+        self.writer.write(data)
+
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self.writer.close()
+
+
+class ConnectionPool:
+    """
+    Connections to the board shared by the sessions of a process. A session
+    takes an idle connection left by a finished one if there is any, and
+    connections are opened with increasing delays between failed attempts,
+    so a fleet survives a board that restarts.
+
+    Parameters:
+        transport (Transport): Way to reach the board; the one of the
+                               environment by default. In-memory
+                               connections have nothing for the event loop
+                               to poll, so they are not supported.
+
+    Attributes:
+        idle (list of Link): Connections waiting for a session.
+        opened (int): Connections opened.
+        reused (int): Sessions served by an idle connection.
+    """
+
+    def __init__(self, transport=None):
+        """
+        Initialize a pool with no connection.
+
+        Args:
+            transport (Transport): Way to reach the board.
+
+        Raises:
+            ValueError: If the transport is in memory.
+        """
+        if isinstance(transport, MemoryTransport):
+            raise ValueError("In-memory connections can not be polled by an event loop")
+        self.__transport = transport if transport is not None else default_transport()
+        self.__idle = []
+        self.__opened = 0
+        self.__reused = 0
+
+
+    @property
+    def opened(self):
+        """
+        Getter for opened attribute.
+
+        Returns:
+            int: Connections opened.
+        """
+        return self.__opened
+
+
+    @property
+    def reused(self):
+        """
+        Getter for reused attribute.
+
+        Returns:
+            int: Sessions served by an idle connection.
+        """
+        return self.__reused
+
+
+    async def connect(self):
+        """
+        Open a new connection, waiting longer after every failed attempt.
+
+        Raises:
+            ConnectionError: If every attempt failed.
+
+        Returns:
+            Link: Connection opened.
+        """
+        delay = CONNECT_DELAY
+        for attempt in range(CONNECT_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay = min(2 * delay, CONNECT_MAX_DELAY)
+            try:
+                reader, writer = await self.__open()
+            except OSError as e:
+                flog.info("Connection attempt %s failed: %s", attempt + 1, e)
+                continue
+            self.__opened += 1
+            return Link(reader, writer)
+        raise ConnectionError(f"[PLAYER]: Could not connect to {self.__transport.address}")
+
+
+    async def __open(self):
+        """
+        Open the streams of a connection over the transport of the pool.
+
+        Returns:
+            tuple(asyncio.StreamReader, asyncio.StreamWriter): Both sides of
+                                                               the connection.
+        """
+        transport = self.__transport
+        if isinstance(transport, UnixTransport):
+            return await asyncio.open_unix_connection(transport.path)
+        if isinstance(transport, PairTransport):
+            return await asyncio.open_connection(sock=transport.connect())
+        return await asyncio.open_connection(*transport.address)
+
+
+    async def acquire(self):
+        """
+        Take an idle connection, or open one if there is none.
+
+        Raises:
+            ConnectionError: If no connection could be opened.
+
+        Returns:
+            Link: Connection for a session.
+        """
+        while self.__idle:
+            link = self.__idle.pop()
+            if not link.writer.is_closing() and not link.reader.at_eof():
+                self.__reused += 1
+                return link
+            link.close()
+        return await self.connect()
+
+
+    def release(self, link):
+        """
+        Give back the connection of a finished session, to be reused.
+
+        Args:
+            link (Link): Connection whose match is over.
+        """
+        if link.inbox or link.writer.is_closing():
+            link.close()
+            return
+        self.__idle.append(link)
+
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+        for link in self.__idle:
+            link.close()
+        self.__idle.clear()
+
+
+class AsyncPlayer:
+    """
+    Player of one game, like Player, driven by an asyncio event loop so
+    that one process runs any number of them at once. Its connection comes
+    from a pool and goes back to it when the game is over. If the
+    connection is lost in the middle of a match, the match is resumed on a
+    new one. Only the binary protocol is spoken.
+
+    Moves are chosen by a strategy, on the event loop: a search blocks the
+    other sessions of the loop for its time budget.
+
+    Parameters:
+        pool (ConnectionPool): Connections to the board.
+        strategy (RandomStrategy | ScriptStrategy | AlphaBetaStrategy):
+            Strategy that chooses the moves.
+        latencies (list): List where the round-trip time of every move, in
+                          nanoseconds, is appended; None not to measure it.
+        name (str): Name the player is rated under by the board, '' to play
+                    anonymously.
+
+    Attributes:
+        link (Link): Connection of the session, None until subscribed.
+        match (int): Identifier of the match, None until it starts.
+        token (int): Token of the player's seat, to resume the match.
+        seen (int): Moves of the match the player knows of.
+        piece (char): Piece used by the player.
+        is_first (bool): Whether the player is first to play or not.
+        finished (bool): Whether the player has finished the game or not.
+    """
+
+    def __init__(self, pool, strategy, latencies=None, name=""):
+        """
+        Initialize the player.
+
+        Args:
+            pool (ConnectionPool): Connections to the board.
+            strategy (RandomStrategy | ScriptStrategy | AlphaBetaStrategy):
+                Strategy of the player.
+            latencies (list): List to append round-trip times to.
+            name (str): Name the player is rated under.
+        """
+        self.__pool = pool
+        self.__name = name
+        self.__strategy = strategy
+        self.__latencies = latencies
+        self.__codec = protocol.BINARY
+        self.__link = None
+        self.__match = None
+        self.__token = None
+        self.__seen = 0
+        self.__piece = None
+        self.__is_first = None
+        self.__finished = False
+
+
+    @property
+    def is_first(self):
+        """
+        Getter for is_first attribute.
+
+        Returns:
+            bool: True if player is first to play; False otherwise.
+        """
+        return self.__is_first
+
+
+    @property
+    def finished(self):
+        """
+        Getter for finished attribute.
+
+        Returns:
+            bool: True if player has finished the game; False otherwise.
+        """
+        return self.__finished
+
+
+    @property
+    def piece(self):
+        """
+        Getter for piece attribute.
+
+        Returns:
+            char: Piece used by the player.
+        """
+        return self.__piece
+
+
+    @piece.setter
+    def piece(self, value):
+        """Setter for piece attribute.
+
+        Args:
+            value (char): New value for the piece attribute.
+        """
+        self.__piece = value
+
+
+    async def __receive(self, retry=None):
+        """
+        Wait for the next message of the board, resuming the match on a new
+        connection if this one is lost.
+
+        Args:
+            retry (bytes): Move to publish again if the board lost it.
+
+        Raises:
+            ConnectionError: If the connection is lost and the match can not
+                             be resumed.
+
+        Returns:
+            tuple: Decoded message, opcode first.
+        """
+        while True:
+            try:
+                message = await self.__link.receive()
+                break
+            except OSError:
+                resp = await self.__resume(retry) if self.__match is not None else None
+                if resp is None:
+                    raise ConnectionError("[PLAYER]: Connection closed by the board")
+                if resp[0] == protocol.OP_GAME_OVER:
+                    message = resp
+                    break
+
+        if message[0] in (protocol.OP_ACK, protocol.OP_ADVERSARY_MOVE, protocol.OP_PASSED):
+            self.__seen += 1
+        return message
+
+
+    async def __resume(self, retry):
+        """
+        Take the player's place back in its match on a new connection.
+
+        Args:
+            retry (bytes): Move to publish again if the board lost it.
+
+        Returns:
+            tuple: Answer of the board, RESUMED or the end of the match if
+                   the adversary never came back; None if the match could
+                   not be resumed.
+        """
+        self.__link.close()
+        for attempt in range(RESUME_ATTEMPTS):
+            try:
+                self.__link = await self.__pool.connect()
+                self.__link.send(self.__codec.resume(self.__piece, self.__match, self.__seen,
+                                                     self.__token))
+                resp = await self.__link.receive()
+            except OSError as e:
+                flog.info("Resume attempt %s failed: %s", attempt + 1, e)
+                self.__link.close()
+                continue
+            if resp[0] == protocol.OP_GAME_OVER:
+                return resp
+            if resp[0] != protocol.OP_RESUMED:
+                return None
+            flog.info("%s", protocol.Description(resp))
+
+            # A move the board never recorded leaves the turn to the player
+            _, turn, match, moves = resp
+            if retry is not None and turn == 0 and moves == self.__seen:
+                self.__link.send(retry)
+            return resp
+        return None
+
+
+    def choose(self):
+        """
+        Ask the strategy for the box of the next move.
+
+        Returns:
+            tuple(int, int): Coordinates of the box.
+        """
+        return self.__strategy.choose()
+
+
+    async def publish(self, x, y):
+        """
+        Publish a move to the topic labeled with the player's piece, and
+        choose another box while the board rejects it.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        while True:
+            move = self.__codec.move(self.__piece, x, y)
+            sent = time.perf_counter_ns()
+            self.__link.send(move)
+            resp = await self.__receive(retry=move)
+            if self.__latencies is not None:
+                self.__latencies.append(time.perf_counter_ns() - sent)
+            flog.debug("%s", protocol.Description(resp))
+
+            if resp[0] == protocol.OP_GAME_OVER:
+                self.__finished = True
+                return
+            if resp[0] == protocol.OP_ACK:
+                self.__strategy.placed(resp[1], resp[2])
+            if resp[0] != protocol.OP_REJECT:
+                return
+            x, y = self.choose()
+
+
+    async def subscribe(self, piece):
+        """
+        Subscribe to the topic labeled with a given piece (ideally the
+        adversary's piece), on a connection of the pool, and wait for the
+        match to start.
+
+        Args:
+            piece (char): Label of the topic to be subscribed to.
+
+        Raises:
+            ConnectionError: If the board can not be reached.
+        """
+        self.__link = await self.__pool.acquire()
+        self.__link.send(self.__codec.subscribe(piece, self.__name))
+        try:
+            resp = await self.__link.receive()
+        except OSError:
+            # An idle connection may have been closed by the board meanwhile
+            self.__link.close()
+            self.__link = await self.__pool.connect()
+            self.__link.send(self.__codec.subscribe(piece, self.__name))
+            resp = await self.__link.receive()
+
+        flog.info("%s", protocol.Description(resp))
+        _, _, turn, rows, cols, k, self.__match, self.__token = resp
+        self.__is_first = turn == 0
+        self.__strategy.start(rows, cols, k, self.__piece)
+
+
+    async def wait(self):
+        """
+        Wait for the adversary to make its move.
+        """
+        resp = await self.__receive()
+        flog.debug("%s", protocol.Description(resp))
+        if resp[0] == protocol.OP_ADVERSARY_MOVE:
+            self.__strategy.observe(resp[2], resp[3])
+        if resp[0] == protocol.OP_GAME_OVER:
+            self.__finished = True
+
+
+    async def play(self, piece):
+        """
+        Play a whole game with a piece, against whoever subscribes to it.
+
+        Args:
+            piece (char): Piece of the player.
+
+        Raises:
+            ConnectionError: If the connection is lost for good.
+        """
+        self.__piece = piece
+        await self.subscribe([p for p in PIECES if p != piece][0])
+        if self.__is_first:
+            await self.publish(*self.choose())
+        while not self.__finished:
+            await self.wait()
+            if self.__finished:
+                break
+            await self.publish(*self.choose())
+
+
+    def close(self):
+        """
+        Give the connection back to the pool if the game is over, or close
+        it otherwise.
+        """
+        if self.__link is None:
+            return
+        if self.__finished:
+            self.__pool.release(self.__link)
+        else:
+            self.__link.close()
+        self.__link = None
+
+
+async def session(pool, piece, strategy, games, latencies=None, name=""):
+    """
+    Play a number of games in a row with the same piece.
+
+    Args:
+        pool (ConnectionPool): Connections to the board.
+        piece (char): Piece of the player.
+        strategy (RandomStrategy | ScriptStrategy | AlphaBetaStrategy):
+            Strategy of the player.
+        games (int): Games to play.
+        latencies (list): List to append round-trip times to.
+        name (str): Name the player is rated under.
+
+    Returns:
+        tuple(int, int): Games finished and games aborted by a connection
+                         error.
+    """
+    played = errors = 0
+    for i in range(games):
+        player = AsyncPlayer(pool, strategy, latencies, name)
+        try:
+            await player.play(piece)
+            played += 1
+        except OSError as e:
+            clog.debug("Game aborted: %s", e)
+            errors += 1
+        finally:
+            player.close()
+    return played, errors
@@ -0,0 +1,62 @@
+import argparse
+from search import AlphaBeta
+
+# Positions searched: (rows, cols, k, boxes taken by turns from side 0)
+POSITIONS = [
+    (3, 3, 3, []),
+    (4, 4, 3, []),
+    (4, 4, 4, [(1, 1), (2, 2)]),
+    (7, 7, 4, [(3, 3), (3, 4), (4, 4)]),
+    (15, 15, 5, [(7, 7), (7, 8), (8, 8), (6, 6)]),
+]
+
+
+def measure(rows, cols, k, placed, budget, table_size, symmetry):
+    """
+    Search the move of a position within a time budget.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        placed (list of tuple(int, int)): Boxes already taken, by turns
+                                          from side 0.
+        budget (float): Seconds of search.
+        table_size (int): Positions kept in the transposition table.
+        symmetry (bool): Whether to merge symmetric positions.
+
+    Returns:
+        tuple(tuple(int, int), SearchStats): Box chosen and counters.
+    """
+    search = AlphaBeta(rows, cols, k, table_size, symmetry)
+    side = len(placed) % 2
+    for n, (x, y) in enumerate(placed):
+        search.place(x, y, n % 2)
+    move = search.search(side, budget)
+    return move, search.stats
+
+
+def main():
+    """
+    Main program. Report the depth reached, the nodes per second and the
+    transposition table hit rate of the search on boards of several sizes,
+    with and without merging symmetric positions.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the alpha-beta search")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds of search per position")
+    parser.add_argument("--table-size", type=int, default=1 << 18,
+                        help="positions kept in the transposition table")
+    args = parser.parse_args()
+
+    print(f"{'size':>12} {'placed':>6} {'symmetry':>8} {'move':>8} {'depth':>5} "
+          f"{'nodes':>9} {'nodes/s':>9} {'hit rate':>8}")
+    for rows, cols, k, placed in POSITIONS:
+        for symmetry in (True, False):
+            move, stats = measure(rows, cols, k, placed, args.budget, args.table_size, symmetry)
+            print(f"{f'{rows}x{cols} k={k}':>12} {len(placed):>6} {str(symmetry):>8} "
+                  f"{str(move):>8} {stats.depth:>5} {stats.nodes:>9} "
+                  f"{stats.nodes_per_second:>9.0f} {stats.hit_rate:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
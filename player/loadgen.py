@@ -0,0 +1,154 @@
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from player import Player, PIECES, clog, flog
+from strategies import RandomStrategy
+from aioplayer import ConnectionPool, session
+
+
+def percentile(values, fraction):
+    """
+    Value below which a fraction of the sorted values fall.
+
+    Args:
+        values (list): Sorted values.
+        fraction (float): Fraction between 0 and 1.
+
+    Returns:
+        float: Nearest-rank percentile, 0 if there are no values.
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Bot(threading.Thread):
+    """
+    Headless player that plays a number of games in a row against the
+    broker, one connection per game, with random legal moves. Every bot is
+    named after its seed, so the board rates it game after game.
+
+    Parameters:
+        piece (char): Piece of the bot.
+        games (int): Number of games to play.
+        seed (int): Seed of the random strategy.
+
+    Attributes:
+        latencies (list of int): Round-trip time of every move, in ns.
+        games_played (int): Games finished.
+        errors (int): Games aborted by a connection error.
+    """
+
+    def __init__(self, piece, games, seed):
+        """
+        Initialize the bot.
+
+        Args:
+            piece (char): Piece of the bot.
+            games (int): Number of games to play.
+            seed (int): Seed of the random strategy.
+        """
+        super().__init__(daemon=True)
+        self.piece = piece
+        self.games = games
+        self.seed = seed
+        self.strategy = RandomStrategy(seed=seed)
+        self.latencies = []
+        self.games_played = 0
+        self.errors = 0
+
+
+    def run(self):
+        """
+        Play the games, following the same steps as a human player.
+        """
+        ad_piece = [p for p in PIECES if p != self.piece][0]
+        for i in range(self.games):
+            player = Player(strategy=self.strategy, latencies=self.latencies, name=f"bot{self.seed}")
+            player.piece = self.piece
+            try:
+                player.subscribe(ad_piece)
+                if player.is_first:
+                    player.publish(player.choose())
+                while not player.finished:
+                    player.wait()
+                    if player.finished:
+                        break
+                    player.publish(player.choose())
+                self.games_played += 1
+            except (ConnectionError, OSError):
+                self.errors += 1
+            finally:
+                player.close()
+
+
+async def fleet(pairs, games, latencies):
+    """
+    Play the games of every bot pair as sessions of one event loop, over
+    connections reused from game to game.
+
+    Args:
+        pairs (int): Concurrent bot pairs.
+        games (int): Games played by every bot.
+        latencies (list): List to append round-trip times to.
+
+    Returns:
+        tuple(int, int, ConnectionPool): Games finished by a bot, games
+                                         aborted, and the pool used.
+    """
+    pool = ConnectionPool()
+    results = await asyncio.gather(*(
+        session(pool, PIECES[i % 2], RandomStrategy(seed=i), games, latencies, f"bot{i}")
+        for i in range(2 * pairs)))
+    pool.close()
+    return sum(played for played, _ in results), sum(errors for _, errors in results), pool
+
+
+def main():
+    """
+    Main program. Launch bot pairs against the broker of the SERVER_NAME and
+    SERVER_PORT environment variables and report throughput and move
+    round-trip latency.
+    """
+    parser = argparse.ArgumentParser(description="Load generator for the board broker")
+    parser.add_argument("--pairs", type=int, default=50, help="concurrent bot pairs")
+    parser.add_argument("--games", type=int, default=20, help="games played by every bot")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="run every bot in one event loop, reusing connections")
+    args = parser.parse_args()
+
+    # Per-move logging of hundreds of bots would measure the terminal
+    clog.setLevel(logging.WARNING)
+    flog.setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    if args.asyncio:
+        latencies = []
+        played, errors, pool = asyncio.run(fleet(args.pairs, args.games, latencies))
+    else:
+        bots = [Bot(PIECES[i % 2], args.games, i) for i in range(2 * args.pairs)]
+        for bot in bots:
+            bot.start()
+        for bot in bots:
+            bot.join()
+        played = sum(bot.games_played for bot in bots)
+        errors = sum(bot.errors for bot in bots)
+        latencies = [rtt for bot in bots for rtt in bot.latencies]
+    elapsed = time.perf_counter() - start
+
+    # Each game is played by two bots
+    games = played / 2
+    latencies.sort()
+    print(f"games: {games:.0f} in {elapsed:.2f} s ({errors} aborted)")
+    print(f"games/s: {games / elapsed:.1f}")
+    print(f"moves/s: {len(latencies) / elapsed:.1f}")
+    for label, fraction in (("p50", 0.5), ("p99", 0.99), ("p999", 0.999)):
+        print(f"{label} move RTT: {percentile(latencies, fraction) / 1e6:.3f} ms")
+    if args.asyncio:
+        print(f"connections: {pool.opened} opened, {pool.reused} reused")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,243 @@
+import os
+import queue
+import atexit
 import logging
+import threading
+import logging.handlers
 
 
-def get_file_logger(file_path: str, level=logging.INFO):
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that enqueues records untouched. The standard one formats
+    the message in the calling thread; here formatting is left to the
+    writer thread, so the game thread only pays for the enqueue. Arguments
+    of a log call must therefore not be mutated afterwards.
+    """
+
+    def prepare(self, record):
+        """
+        Keep the record as it is.
+
+        Args:
+            record (logging.LogRecord): Record to enqueue.
+
+        Returns:
+            logging.LogRecord: The same record.
+        """
+        return record
+
+
+class BatchWriter(threading.Thread):
+    """
+    Background thread that takes records from a queue and writes them to a
+    stream handler in batches: every record waiting in the queue is
+    formatted and written to the buffered stream, which is flushed once per
+    batch instead of once per record.
+
+    Parameters:
+        records (queue.SimpleQueue): Queue filled by a DeferredQueueHandler.
+        handler (logging.StreamHandler): Handler that owns the stream,
+                                         possibly a rotating one.
+        batch_size (int): Maximum records written between flushes.
+    """
+
+    STOP = None
+
+    def __init__(self, records, handler, batch_size=512):
+        """
+        Initialize the writer thread.
+
+        Args:
+            records (queue.SimpleQueue): Queue of records.
+            handler (logging.StreamHandler): Destination handler.
+            batch_size (int): Maximum records written between flushes.
+        """
+        super().__init__(name=f"log-writer-{handler.get_name()}", daemon=True)
+        self.__records = records
+        self.__handler = handler
+        self.__batch_size = batch_size
+
+
+    def run(self):
+        """
+        Write batches until the stop mark is taken from the queue.
+        """
+        while True:
+            # Block for the first record, then take whatever is waiting
+            batch = [self.__records.get()]
+            while len(batch) < self.__batch_size:
+                try:
+                    batch.append(self.__records.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = self.STOP in batch
+            self.__write([record for record in batch if record is not self.STOP])
+            if stop:
+                return
+
+
+    def __write(self, batch):
+        """
+        Format and write a batch of records, rotating the file when the
+        handler asks for it, and flush the stream once.
+
+        Args:
+            batch (list of logging.LogRecord): Records to write.
+        """
+        handler = self.__handler
+        rotating = isinstance(handler, logging.handlers.BaseRotatingHandler)
+        with handler.lock:
+            for record in batch:
+                try:
+                    if rotating and handler.shouldRollover(record):
+                        handler.doRollover()
+                    handler.stream.write(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            handler.flush()
+
+
+    def stop(self):
+        """
+        Write the records still queued and end the thread.
+        """
+        self.__records.put(self.STOP)
+        self.join()
+
+
+def attach(logger, handler, asynchronous):
+    """
+    Attach a handler to a logger, directly or through a queue drained by a
+    BatchWriter thread. The writer is stopped at exit, after writing every
+    record left. Forked processes start a writer of their own, since
+    threads do not survive a fork.
+
+    Args:
+        logger (logging.Logger): Logger to configure.
+        handler (logging.StreamHandler): Handler that writes the records.
+        asynchronous (bool): Whether to write from a background thread.
+    """
+    if not asynchronous:
+        logger.addHandler(handler)
+        return
+
+    records = queue.SimpleQueue()
+
+    def start():
+        writer = BatchWriter(records, handler)
+        writer.start()
+        atexit.register(writer.stop)
+
+    start()
+    os.register_at_fork(after_in_child=start)
+    logger.addHandler(DeferredQueueHandler(records))
+
+
+def get_file_logger(file_path: str, level=logging.INFO, max_bytes=10 * 1024 * 1024,
+                    backup_count=5, when=None, asynchronous=True):
     """
     Creates and returns a logger that logs messages to a specified file.
+    The file is rotated by size, or by time if `when` is given, keeping
+    `backup_count` old files. By default, records are formatted and written
+    in batches by a background thread.
 
     Args:
         file_path (str): The path to the log file.
+        level (int): Lowest level of the records written.
+        max_bytes (int): Size at which the file is rotated.
+        backup_count (int): Number of rotated files kept.
+        when (str): Interval of time-based rotation, as understood by
+                    logging.handlers.TimedRotatingFileHandler ('midnight',
+                    'H', ...); None to rotate by size.
+        asynchronous (bool): Whether to write from a background thread.
 
     Returns:
         logging.Logger: A logger instance to write logs to the designated file.
     """
 
+    # Loggers are process-wide, so modules sharing them must not stack
+    # duplicated handlers on every import
+    logger = logging.getLogger("file")
+    if logger.handlers:
+        return logger
+
     # Definition of the log message format for file logging
     file_log_format = logging.Formatter(
         fmt="%(asctime)s.%(msecs)03d | %(levelname)s : %(message)s",
         datefmt="%H:%M:%S",
     )
 
-    # Creation of a file handler, in append mode
-    handler = logging.FileHandler(file_path, mode="a")
+    # Creation of a rotating file handler, in append mode
+    if when is not None:
+        handler = logging.handlers.TimedRotatingFileHandler(file_path, when=when,
+                                                            backupCount=backup_count)
+    else:
+        handler = logging.handlers.RotatingFileHandler(file_path, mode="a", maxBytes=max_bytes,
+                                                       backupCount=backup_count)
+    handler.set_name("file")
     handler.setFormatter(file_log_format)
 
     # Logger configuration, with INFO level logging
-    logger = logging.getLogger("file")
     logger.setLevel(level)
-    logger.addHandler(handler)
+    attach(logger, handler, asynchronous)
     logger.propagate = False  # Avoids crossing logs with other loggers
 
     return logger
 
 
-def get_console_logger(level=logging.INFO):
+def redirect(file_path, name="file"):
+    """
+    Point a file handler to another file, keeping its rotation policy. A
+    forked process calls it to stop sharing the file of its parent, as
+    several processes rotating one file race on every rename and lose
+    records.
+
+    Args:
+        file_path (str): The path of the new log file.
+        name (str): Name of the handler.
+    """
+    handler = logging.getHandlerByName(name)
+    handler.acquire()
+    try:
+        if handler.stream is not None:
+            handler.stream.close()
+            handler.stream = None
+        handler.baseFilename = os.path.abspath(file_path)
+    finally:
+        handler.release()
+
+
+def get_console_logger(level=logging.INFO, asynchronous=False):
     """
     Creates and returns a logger that logs messages to the console (stdout).
+    It writes synchronously by default, so that its output keeps its place
+    among prompts and prints.
+
+    Args:
+        level (int): Lowest level of the records written.
+        asynchronous (bool): Whether to write from a background thread.
 
     Returns:
         logging.Logger: A logger instance to print logs to the console.
     """
 
+    # Reuse the logger if it was already configured
+    logger = logging.getLogger("console")
+    if logger.handlers:
+        return logger
+
     # Definition of the log message format for console logging
     console_log_format = logging.Formatter(fmt="%(message)s")
 
     # Creation of a console handler
     handler = logging.StreamHandler()
+    handler.set_name("console")
     handler.setFormatter(console_log_format)
 
     # Logger configuration, with INFO level logging
-    logger = logging.getLogger("console")
     logger.setLevel(level)
-    logger.addHandler(handler)
+    attach(logger, handler, asynchronous)
     logger.propagate = False
 
     return logger
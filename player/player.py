@@ -1,11 +1,20 @@
-import socket
 import os
-import json
+import time
+import random
+import argparse
+import protocol
 import logger_config
-from datetime import datetime
+from collections import deque
+from tablebase import Tablebase
+from strategies import RandomStrategy, ScriptStrategy, AlphaBetaStrategy
+from transport import default_transport
 
 PIECES = ['O', 'X']
-LOG_FILE_PATH = f"/tmp/{os.getenv("PLAYER_NAME")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log" 
+RECV_SIZE = 4096
+RESUME_ATTEMPTS = 10    # Reconnections tried when the board goes away
+RESUME_DELAY = 0.1      # Seconds before the first one, doubled each time
+RESUME_MAX_DELAY = 2.0
+LOG_FILE_PATH = f"/tmp/{os.getenv("PLAYER_NAME")}.log"
 
 flog = logger_config.get_file_logger(LOG_FILE_PATH, logger_config.logging.INFO)
 clog = logger_config.get_console_logger(logger_config.logging.INFO)
@@ -16,20 +25,62 @@ class Player:
     publishes to the topic labeled with the piece it uses and is subscribed to
     the piece used by its adversary.
 
+    Parameters:
+        protocol_name (str): Wire protocol, 'binary' or 'text'. Defaults to
+                             the PLAYER_PROTOCOL environment variable, or
+                             'binary' if it is not set.
+        strategy (RandomStrategy | ScriptStrategy | AlphaBetaStrategy):
+            Strategy that chooses the moves of a headless bot; None to ask
+            the user.
+        latencies (list): List where the round-trip time of every move, in
+                          nanoseconds, is appended; None not to measure it.
+        transport (Transport): Way to reach the board; the one of the
+                               environment by default.
+        name (str): Name the player is rated under by the board; the
+                    PLAYER_NAME environment variable by default.
+
     Attributes:
-        name (str): Name of the player from the environment variables.
-        socket (socket.socket): Socket for communication with the board server.
+        name (str): Name of the player.
+        transport (Transport): Way to reach the board.
+        socket (socket.socket): Socket for communication with the board server,
+                                None until connected.
+        codec (BinaryCodec | TextCodec): Encoder of the wire protocol.
+        decoder (BinaryDecoder | TextClientDecoder): Incremental decoder of
+                                                     the board's messages.
+        inbox (deque): Decoded messages not handled yet.
+        strategy (RandomStrategy | ScriptStrategy | AlphaBetaStrategy): Strategy of a bot.
+        latencies (list): Round-trip times of the moves.
+        match (int): Identifier of the match, None if it can not be resumed.
+        token (int): Token of the player's seat, to resume the match.
+        seen (int): Moves of the match the player knows of.
         piece (char): Piece used by the player.
         is_first (bool): Whether the player if first to play or not.
         finished (bool): Whether the player has finished the game or not.
     """
 
-    def __init__(self):
+    def __init__(self, protocol_name=None, strategy=None, latencies=None, transport=None,
+                 name=None):
         """
         Initialize the Player.
+
+        Args:
+            protocol_name (str): Wire protocol, 'binary' or 'text'.
+            strategy (RandomStrategy | ScriptStrategy | AlphaBetaStrategy): Strategy of a bot.
+            latencies (list): List to append round-trip times to.
+            transport (Transport): Way to reach the board.
+            name (str): Name the player is rated under.
         """
-        self.__name = os.getenv("PLAYER_NAME")
-        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__name = name if name is not None else os.getenv("PLAYER_NAME")
+        self.__transport = transport if transport is not None else default_transport()
+        self.__socket = None
+        self.__codec = protocol.CODECS[protocol_name or os.getenv("PLAYER_PROTOCOL", "binary")]
+        self.__decoder = self.__codec.client_decoder()
+        self.__inbox = deque()
+        self.__strategy = strategy
+        self.__latencies = latencies
+        self.__match = None
+        self.__token = None
+        self.__seen = 0
         self.__piece = None
         self.__is_first = None
         self.__finished = False
@@ -89,6 +140,111 @@ class Player:
         self.__piece = value
 
 
+    def __receive(self, retry=None):
+        """
+        Wait for the next message of the board. Messages decoded together
+        with a previous one are served first, before reading the socket.
+        If the connection is lost in the middle of a match, the match is
+        resumed on a new one.
+
+        Args:
+            retry (bytes): Move to publish again if the board lost it.
+
+        Raises:
+            ConnectionError: If the board closes the connection and the
+                             match can not be resumed.
+
+        Returns:
+            tuple: Decoded message, opcode first.
+        """
+        while not self.__inbox:
+            try:
+                data = self.__socket.recv(RECV_SIZE)
+            except OSError:
+                data = b""
+            if not data:
+                if self.__match is None or not self.__resume(retry):
+                    raise ConnectionError("[PLAYER]: Connection closed by the board")
+                continue
+            self.__inbox.extend(self.__decoder.feed(data))
+
+        message = self.__inbox.popleft()
+        if message[0] in (protocol.OP_ACK, protocol.OP_ADVERSARY_MOVE, protocol.OP_PASSED):
+            self.__seen += 1
+        return message
+
+
+    def __resume(self, retry):
+        """
+        Reconnect to the board, waiting longer after every failed attempt,
+        and take the player's place back in its match. The board sends
+        afterwards the moves the player missed, or the end of the match if
+        the adversary never came back.
+
+        Args:
+            retry (bytes): Move to publish again if the board lost it.
+
+        Returns:
+            bool: True if the match was resumed or is over; False otherwise.
+        """
+        delay = RESUME_DELAY
+        for attempt in range(RESUME_ATTEMPTS):
+            time.sleep(delay)
+            delay = min(2 * delay, RESUME_MAX_DELAY)
+            self.__socket.close()
+            self.__decoder = self.__codec.client_decoder()
+            try:
+                self.__socket = self.__transport.connect()
+                self.__socket.sendall(self.__codec.resume(self.__piece, self.__match, self.__seen,
+                                                          self.__token))
+                messages = []
+                while not messages:
+                    data = self.__socket.recv(RECV_SIZE)
+                    if not data:
+                        raise ConnectionError("[PLAYER]: Connection closed by the board")
+                    messages = self.__decoder.feed(data)
+            except OSError as e:
+                flog.info("Resume attempt %s failed: %s", attempt + 1, e)
+                continue
+
+            resp = messages[0]
+            self.__inbox.extend(messages[1:])
+            if resp[0] == protocol.OP_GAME_OVER:
+                self.__inbox.appendleft(resp)
+                return True
+            if resp[0] != protocol.OP_RESUMED:
+                return False
+            clog.info("%s", protocol.Description(resp))
+            flog.info("%s", protocol.Description(resp))
+
+            # A move the board never recorded leaves the turn to the player
+            _, turn, match, moves = resp
+            if retry is not None and turn == 0 and moves == self.__seen:
+                self.__socket.sendall(retry)
+            return True
+        return False
+
+
+    def choose(self):
+        """
+        Ask for the box of the next move: the strategy chooses it for a bot,
+        the user is prompted otherwise.
+
+        Returns:
+            str: Coordinates of the box separated by a comma: X,Y.
+        """
+        if self.__strategy is None:
+            return input("Place your piece: ")
+        x, y = self.__strategy.choose()
+
+        # Searching bots report how the search went
+        stats = getattr(self.__strategy, "stats", None)
+        if stats is not None:
+            clog.debug("Search: %s", stats)
+            flog.info("Search: %s", stats)
+        return f"{x},{y}"
+
+
     def publish(self, box):
         """
         Publish a message to the topic labeled with the player's piece.
@@ -104,29 +260,40 @@ class Player:
         while True:
             # Format and send the message to the server
             x, y = box.split(',')
-            pub = {self.__piece: [int(x), int(y)]}
-            self.__socket.send(json.dumps(pub).encode('utf-8'))
-            clog.debug(f"Attempt to place piece at {[x, y]}")
-            flog.debug(f"Attempt to place piece at {[x, y]}")
+            move = self.__codec.move(self.__piece, int(x), int(y))
+            sent = time.perf_counter_ns()
+            try:
+                self.__socket.sendall(move)
+            except OSError:
+                # The board is gone: receiving resumes the match, if possible
+                pass
+            clog.debug("Attempt to place piece at %s", [x, y])
+            flog.debug("Attempt to place piece at %s", [x, y])
 
             # Await server response
-            resp = self.__socket.recv(1024).decode('utf-8')
-            clog.info(resp)
-            flog.info(resp)
+            resp = self.__receive(retry=move)
+            if self.__latencies is not None:
+                self.__latencies.append(time.perf_counter_ns() - sent)
+            clog.info("%s", protocol.Description(resp))
+            flog.info("%s", protocol.Description(resp))
 
             # Check if end game condition is achieved
-            if "WIN" in resp or "LOSE" in resp or "STALEMATE" in resp:
+            if resp[0] == protocol.OP_GAME_OVER:
                 self.__finished = True
                 clog.debug("[DEBUG]: Game end condition achieved")
                 flog.debug("[DEBUG]: Game end condition achieved")
                 break
             
+            # Let a bot know its piece was placed, as a late move is skipped
+            if resp[0] == protocol.OP_ACK and self.__strategy is not None:
+                self.__strategy.placed(resp[1], resp[2])
+
             # Check if box is available
-            if "OCCUPIED" not in resp and "OUT OF BOARD" not in resp:
+            if resp[0] != protocol.OP_REJECT:
                 break
 
             # Repeat if box was unavailable
-            box = input("Place your piece: ")
+            box = self.choose()
 
 
     def subscribe(self, piece):
@@ -139,21 +306,29 @@ class Player:
         """
 
         # Connect to the server
-        self.__socket.connect((os.getenv("SERVER_NAME"), int(os.getenv("SERVER_PORT"))))
+        self.__socket = self.__transport.connect()
 
-        # Send the piece to be subscribed to
-        self.__socket.send(piece.encode('utf-8'))
-        clog.debug(f"Attempt to subscribe to topic {piece}")
-        flog.debug(f"Attempt to subscribe to topic {piece}")
+        # Send the piece to be subscribed to, and the name to be rated under
+        self.__socket.sendall(self.__codec.subscribe(piece, self.__name or ""))
+        clog.debug("Attempt to subscribe to topic %s", piece)
+        flog.debug("Attempt to subscribe to topic %s", piece)
 
-        # Await server response
-        resp = self.__socket.recv(1024).decode('utf-8')
+        # Await server response, which carries the starting turn
+        resp = self.__receive()
+        clog.info("%s", protocol.Description(resp))
+        flog.info("%s", protocol.Description(resp))
+        _, _, turn, rows, cols, k, self.__match, self.__token = resp
+        self.__is_first = turn == 0
+        if self.__strategy is not None:
+            self.__strategy.start(rows, cols, k, self.__piece)
 
-        # Parse server response to get the starting turn
-        msg, turn = resp.split(',')
-        clog.info(msg)
-        flog.info(msg)
-        self.__is_first = int(turn) == 0
+
+    def close(self):
+        """
+        Close the connection with the board.
+        """
+        if self.__socket is not None:
+            self.__socket.close()
 
 
     def wait(self):
@@ -165,12 +340,16 @@ class Player:
         # Await server notification with the update caused by the adversary
         # move.
         clog.info("Waiting for adversary to play...")
-        resp = self.__socket.recv(1024).decode('utf-8')
-        clog.info(resp)
-        flog.info(resp)
+        resp = self.__receive()
+        clog.info("%s", protocol.Description(resp))
+        flog.info("%s", protocol.Description(resp))
+
+        # Let a bot know the box is taken
+        if resp[0] == protocol.OP_ADVERSARY_MOVE and self.__strategy is not None:
+            self.__strategy.observe(resp[2], resp[3])
 
         # Check jf end game condition is achieved
-        if "WIN" in resp or "LOSE" in resp or "STALEMATE" in resp:
+        if resp[0] == protocol.OP_GAME_OVER:
             self.__finished = True
             clog.debug("[DEBUG]: Game end condition achieved")
             flog.debug("[DEBUG]: Game end condition achieved")
@@ -179,35 +358,61 @@ class Player:
 def main():
     """
     Main program. Create the player and guide it through the game's stages
-    by prompting it.
+    by prompting it. With the --bot option the player runs headless, its
+    piece and moves chosen without any prompt.
     """
 
-    # Ask player to choose a piece
-    player = Player()
-    piece = input("Choose your piece: ['O' / 'X'] ")
-    clog.debug(f"[DEBUG]: Piece input: {piece}")
-    flog.debug(f"[DEBUG]: Piece input: {piece}")
+    parser = argparse.ArgumentParser(description="TicTacToe player")
+    parser.add_argument("--bot", choices=["random", "script", "alphabeta"],
+                        help="play without prompts, choosing moves with a strategy")
+    parser.add_argument("--script", help="file with one X,Y box per line, for --bot script")
+    parser.add_argument("--piece", choices=PIECES, help="piece of the player")
+    parser.add_argument("--seed", type=int, help="seed of the random bot")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="seconds of search per move, for --bot alphabeta")
+    parser.add_argument("--tablebase", help="tablebase of perfect moves, for --bot alphabeta")
+    args = parser.parse_args()
+
+    strategy = None
+    if args.bot == "random":
+        strategy = RandomStrategy(seed=args.seed)
+    elif args.bot == "script":
+        strategy = ScriptStrategy.from_file(args.script)
+    elif args.bot == "alphabeta":
+        tablebase = Tablebase(args.tablebase) if args.tablebase is not None else None
+        strategy = AlphaBetaStrategy(budget=args.budget, tablebase=tablebase)
+    player = Player(strategy=strategy)
+
+    # Ask player to choose a piece, unless it was given or a bot draws it
+    if args.piece is not None:
+        piece = args.piece
+    elif strategy is not None:
+        piece = random.choice(PIECES)
+    else:
+        piece = input("Choose your piece: ['O' / 'X'] ")
+    clog.debug("[DEBUG]: Piece input: %s", piece)
+    flog.debug("[DEBUG]: Piece input: %s", piece)
 
     # If the piece selected is incorrect, keep asking
     while piece not in PIECES:
         clog.info("Piece must be either 'O' or 'X'")
         piece = input()
-        clog.debug(f"[DEBUG]: Piece input: {piece}")
-        flog.debug(f"[DEBUG]: Piece input: {piece}")
+        clog.debug("[DEBUG]: Piece input: %s", piece)
+        flog.debug("[DEBUG]: Piece input: %s", piece)
 
-    clog.info(f"Chose piece: {piece}")
-    flog.info(f"Chose piece: {piece}")
+    clog.info("Chose piece: %s", piece)
+    flog.info("Chose piece: %s", piece)
 
     # Based on the piece selected, subscribe to adversary's piece
     player.piece = piece
     ad_piece = [p for p in PIECES if p != piece][0]
     player.subscribe(ad_piece)
-    clog.debug(f"[DEBUG]: Request sent for subscribe to topic: {ad_piece}")
-    flog.debug(f"[DEBUG]: Request sent for subscribe to topic: {ad_piece}")
+    clog.debug("[DEBUG]: Request sent for subscribe to topic: %s", ad_piece)
+    flog.debug("[DEBUG]: Request sent for subscribe to topic: %s", ad_piece)
 
     # The first player to connect to the server makes the first move
     if player.is_first:
-        box = input("Place your piece: ")
+        box = player.choose()
         player.publish(box)
 
     # Game loop: player waits for its turn to publish. After both the player's
@@ -217,7 +422,7 @@ def main():
         if player.finished:
             break
 
-        box = input("Place your piece: ")
+        box = player.choose()
         player.publish(box)
         if player.finished:
             break
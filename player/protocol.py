@@ -0,0 +1,808 @@
+import re
+import json
+import codecs
+import struct
+
+# Every binary frame is a 4-byte big-endian payload length followed by the
+# payload, whose first byte is the opcode. Payload layouts are fixed.
+HEADER = struct.Struct("!I")
+MAX_FRAME = 1 << 16
+NAME_SIZE = 16          # Bytes of the name of a player, UTF-8 and zero padded
+
+# Opcodes
+OP_SUBSCRIBE = 1        # Player -> board: topic, name
+OP_SUBSCRIBED = 2       # Board -> player: topic, turn, rows, cols, k, match, token
+OP_MOVE = 3             # Player -> board: piece, x, y
+OP_ACK = 4              # Board -> player: x, y
+OP_REJECT = 5           # Board -> player: reason, x, y
+OP_ADVERSARY_MOVE = 6   # Board -> player: piece, x, y
+OP_GAME_OVER = 7        # Board -> player: result, x, y of the last move
+OP_SPECTATE = 8         # Spectator -> board: piece, match
+OP_UPDATE = 9           # Board -> spectator: piece, match, event, x, y
+OP_RESUME = 10          # Player -> board: piece, match, moves seen, token
+OP_RESUMED = 11         # Board -> player: turn, match, moves played
+OP_PASSED = 12          # Board -> player: piece whose turn ran out of time
+
+# Reasons of a rejected move
+OCCUPIED = 1
+OUT_OF_BOARD = 2
+
+# Results of a game, from the point of view of the recipient
+WIN = 1
+LOSE = 2
+STALEMATE = 3
+ADVERSARY_LEFT = 4
+TIMED_OUT = 5
+ADVERSARY_TIMED_OUT = 6
+
+# Events of a match, published to its spectators. The piece of an update is
+# the one that started, moved, won, completed the board, left, ran out of
+# time and lost its turn, or ran out of time and lost the match.
+STARTED = 1
+PLACED = 2
+WON = 3
+DRAWN = 4
+LEFT = 5
+PASSED = 6
+FORFEITED = 7
+
+# Coordinates of a turn that ran out of time, among the moves of a match
+PASS = -(1 << 31)
+
+# Rows or columns of a board without edges along them, where coordinates
+# may be any other 32-bit signed integer
+UNBOUNDED = (1 << 32) - 1
+
+# Topics spectators subscribe to are a match and a piece, either of which
+# may be a wildcard: '3/O', '3/*', '*/X' or '*'
+ANY_MATCH = -1
+ANY_PIECE = '*'
+
+# Wording of every result
+RESULTS = {
+    WIN: "[BOARD]: YOU WIN!",
+    LOSE: "[BOARD]: YOU LOSE...",
+    STALEMATE: "[BOARD]: STALEMATE: END OF GAME",
+    ADVERSARY_LEFT: "[BOARD]: ADVERSARY LEFT: YOU WIN!",
+    TIMED_OUT: "[BOARD]: OUT OF TIME: YOU LOSE...",
+    ADVERSARY_TIMED_OUT: "[BOARD]: ADVERSARY OUT OF TIME: YOU WIN!",
+}
+
+# Payload layouts after the opcode. Pieces travel as their character code.
+LAYOUTS = {
+    OP_SUBSCRIBE: struct.Struct(f"!B{NAME_SIZE}s"),
+    OP_SUBSCRIBED: struct.Struct("!BBIIHIQ"),
+    OP_MOVE: struct.Struct("!Bii"),
+    OP_ACK: struct.Struct("!ii"),
+    OP_REJECT: struct.Struct("!Bii"),
+    OP_ADVERSARY_MOVE: struct.Struct("!Bii"),
+    OP_GAME_OVER: struct.Struct("!Bii"),
+    OP_SPECTATE: struct.Struct("!Bi"),
+    OP_UPDATE: struct.Struct("!BIBii"),
+    OP_RESUME: struct.Struct("!BIIQ"),
+    OP_RESUMED: struct.Struct("!BII"),
+    OP_PASSED: struct.Struct("!B"),
+}
+PIECE_OPS = {OP_SUBSCRIBE, OP_SUBSCRIBED, OP_MOVE, OP_ADVERSARY_MOVE, OP_SPECTATE, OP_UPDATE,
+             OP_RESUME, OP_PASSED}
+
+# Whole frames (header, opcode and payload) packed in a single call
+FRAMES = {op: struct.Struct("!IB" + layout.format[1:]) for op, layout in LAYOUTS.items()}
+SIZES = {op: layout.size + 1 for op, layout in LAYOUTS.items()}
+
+# Wording of every match event
+EVENTS = {
+    STARTED: "{piece} starts",
+    PLACED: "{piece} placed at [{x}, {y}]",
+    WON: "{piece} wins at [{x}, {y}]",
+    DRAWN: "{piece} draws at [{x}, {y}]",
+    LEFT: "{piece} left",
+    PASSED: "{piece} passes",
+    FORFEITED: "{piece} forfeits",
+}
+VERBS = {wording.split()[1]: event for event, wording in EVENTS.items()}
+
+# Size, layout and whether a piece comes first, for the decoders
+PAYLOADS = {op: (SIZES[op], layout, op in PIECE_OPS) for op, layout in LAYOUTS.items()}
+
+
+def player_name(field):
+    """
+    Name of a player from the field of its subscribe request.
+
+    Args:
+        field (bytes): Zero-padded UTF-8 name; empty for anonymous players.
+
+    Returns:
+        str: Name of the player, '' if it gave none.
+    """
+    return field.rstrip(b"\0").decode("utf-8", "ignore")
+
+
+class ProtocolError(ValueError):
+    """
+    Raised by the decoders when the peer sends something that is not a
+    message of the protocol.
+    """
+    pass
+
+
+def topic_name(match, piece):
+    """
+    Name of a spectator topic.
+
+    Args:
+        match (int): Match identifier, or ANY_MATCH.
+        piece (char): Piece symbol, or ANY_PIECE.
+
+    Returns:
+        str: Topic name, such as '3/O', '3/*', '*/X' or '*'.
+    """
+    if match == ANY_MATCH:
+        return ANY_PIECE if piece == ANY_PIECE else f"*/{piece}"
+    return f"{match}/{piece}"
+
+
+def parse_topic(name):
+    """
+    Match and piece of a spectator topic name.
+
+    Args:
+        name (str): Topic name, as built by topic_name().
+
+    Raises:
+        ProtocolError: If the name is not a topic.
+
+    Returns:
+        tuple(int, char): Match identifier or ANY_MATCH, and piece or
+                          ANY_PIECE.
+    """
+    match, _, piece = name.strip().partition('/')
+    piece = piece or ANY_PIECE
+    try:
+        match = ANY_MATCH if match == ANY_PIECE else int(match)
+    except ValueError:
+        raise ProtocolError(f"Malformed topic {name!r}")
+    if len(piece) != 1 or match < ANY_MATCH:
+        raise ProtocolError(f"Malformed topic {name!r}")
+    return match, piece
+
+
+def describe(message):
+    """
+    Human readable text of a decoded message, as the text protocol words it.
+
+    Args:
+        message (tuple): Opcode followed by the fields of the message.
+
+    Returns:
+        str: Description of the message.
+    """
+    op = message[0]
+    if op == OP_SUBSCRIBED:
+        return f"[BOARD]: Subscribed to piece {message[1]}"
+    if op == OP_ACK:
+        return f"[BOARD]: Piece placed at {[message[1], message[2]]}"
+    if op == OP_REJECT:
+        reason = "OCCUPIED" if message[1] == OCCUPIED else "OUT OF BOARD"
+        return f"[BOARD]: Position [{message[2]},{message[3]}]: {reason}"
+    if op == OP_ADVERSARY_MOVE:
+        return f"[BOARD]: Adversary move: {[message[2], message[3]]}"
+    if op == OP_GAME_OVER:
+        return RESULTS[message[1]]
+    if op == OP_UPDATE:
+        piece, match, event, x, y = message[1:]
+        return f"[BOARD]: Match {match}: " + EVENTS[event].format(piece=piece, x=x, y=y)
+    if op == OP_SUBSCRIBE:
+        name = player_name(message[2])
+        return f"Subscribe to topic {message[1]}" + (f" as {name}" if name else "")
+    if op == OP_SPECTATE:
+        return f"Spectate topic {topic_name(message[2], message[1])}"
+    if op == OP_RESUME:
+        return f"Resume match {message[2]} as {message[1]}"
+    if op == OP_RESUMED:
+        return f"[BOARD]: Resumed match {message[2]} after {message[3]} moves"
+    if op == OP_PASSED:
+        return f"[BOARD]: Turn of {message[1]} skipped: OUT OF TIME"
+    return f"Move {message[1]} to {[message[2], message[3]]}"
+
+
+class Description:
+    """
+    Lazy description of a message for the loggers: the text is only built
+    if the record is emitted, and then by the thread that writes it.
+
+    Attributes:
+        message (tuple): Decoded message.
+    """
+
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        """
+        Wrap a message.
+
+        Args:
+            message (tuple): Decoded message.
+        """
+        self.message = message
+
+
+    def __str__(self):
+        """
+        Describe the message.
+
+        Returns:
+            str: Text of describe().
+        """
+        return describe(self.message)
+
+
+class BinaryDecoder:
+    """
+    Incremental decoder of binary frames. Bytes may be fed in chunks of any
+    size: incomplete frames stay buffered until the rest arrives, and
+    several frames in one chunk are all returned.
+
+    Attributes:
+        buffer (bytearray): Bytes of the frame not yet complete.
+    """
+
+    def __init__(self):
+        """
+        Initialize the decoder with an empty buffer.
+        """
+        self.__buffer = bytearray()
+
+
+    def feed(self, data):
+        """
+        Decode the complete frames available after some received bytes.
+
+        Args:
+            data (bytes): Received bytes.
+
+        Raises:
+            ProtocolError: If a frame is too large, has an unknown opcode or
+                           a payload of the wrong size.
+
+        Returns:
+            list of tuple: Decoded messages, opcode first.
+        """
+        # Parse straight from the received bytes when nothing is pending,
+        # which is the usual case, and only buffer the incomplete tail
+        buffer = self.__buffer
+        if buffer:
+            buffer += data
+            data = buffer
+        messages = []
+        pos = 0
+        end = len(data)
+        while end - pos >= 4:
+            size, = HEADER.unpack_from(data, pos)
+            if size > MAX_FRAME:
+                raise ProtocolError(f"Frame of {size} bytes")
+            if end - pos - 4 < size:
+                break
+
+            op = data[pos + 4]
+            layout = PAYLOADS.get(op)
+            if layout is None or layout[0] != size:
+                raise ProtocolError(f"Opcode {op} with {size} bytes")
+            fields = layout[1].unpack_from(data, pos + 5)
+            if layout[2]:
+                messages.append((op, chr(fields[0])) + fields[1:])
+            else:
+                messages.append((op,) + fields)
+            pos += 4 + size
+
+        if data is buffer:
+            del buffer[:pos]
+        elif pos < end:
+            buffer += data[pos:]
+        return messages
+
+
+class BinaryCodec:
+    """
+    Encoder of the framed binary protocol.
+    """
+
+    name = "binary"
+
+    def subscribe(self, topic, name=""):
+        """
+        Encode a subscribe request.
+
+        Args:
+            topic (char): Piece to subscribe to.
+            name (str): Name the player is rated under, cut to NAME_SIZE
+                        bytes; '' to play anonymously.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_SUBSCRIBE].pack(SIZES[OP_SUBSCRIBE], OP_SUBSCRIBE, ord(topic),
+                                         name.encode("utf-8")[:NAME_SIZE])
+
+
+    def subscribed(self, topic, turn, rows, cols, k, match=0, token=0):
+        """
+        Encode the confirmation of a subscription, sent once the match starts.
+
+        Args:
+            topic (char): Piece subscribed to.
+            turn (int): 0 if the player moves first; 1 otherwise.
+            rows (int): Number of rows of the board.
+            cols (int): Number of columns of the board.
+            k (int): Pieces in a row needed to win.
+            match (int): Identifier of the match, to resume it.
+            token (int): Secret the player proves its seat with when it
+                         resumes the match.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_SUBSCRIBED].pack(SIZES[OP_SUBSCRIBED], OP_SUBSCRIBED,
+                                          ord(topic), turn, rows, cols, k, match, token)
+
+
+    def resume(self, piece, match, seen, token=0):
+        """
+        Encode the request of a player to take its place back in a match
+        after losing the connection.
+
+        Args:
+            piece (char): Piece of the player.
+            match (int): Identifier of the match.
+            seen (int): Moves of the match the player knows of, its own
+                        acknowledged ones, those of the adversary and the
+                        turns skipped.
+            token (int): Token of the seat, from the subscription.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_RESUME].pack(SIZES[OP_RESUME], OP_RESUME, ord(piece), match, seen,
+                                      token)
+
+
+    def resumed(self, turn, match, moves):
+        """
+        Encode the confirmation of a resumed match, which sums its state up.
+        Only the moves the player missed follow, as acknowledgements,
+        adversary moves and skipped turns.
+
+        Args:
+            turn (int): 0 if the player has the turn; 1 otherwise.
+            match (int): Identifier of the match.
+            moves (int): Moves played in the match.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_RESUMED].pack(SIZES[OP_RESUMED], OP_RESUMED, turn, match, moves)
+
+
+    def move(self, piece, x, y):
+        """
+        Encode a move published by a player.
+
+        Args:
+            piece (char): Piece symbol.
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_MOVE].pack(SIZES[OP_MOVE], OP_MOVE, ord(piece), x, y)
+
+
+    def ack(self, x, y):
+        """
+        Encode the confirmation of a placed piece.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_ACK].pack(SIZES[OP_ACK], OP_ACK, x, y)
+
+
+    def reject(self, reason, x, y):
+        """
+        Encode the rejection of a move.
+
+        Args:
+            reason (int): OCCUPIED or OUT_OF_BOARD.
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_REJECT].pack(SIZES[OP_REJECT], OP_REJECT, reason, x, y)
+
+
+    def adversary_move(self, piece, x, y):
+        """
+        Encode the move of the adversary for its subscriber.
+
+        Args:
+            piece (char): Piece symbol.
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_ADVERSARY_MOVE].pack(SIZES[OP_ADVERSARY_MOVE], OP_ADVERSARY_MOVE,
+                                              ord(piece), x, y)
+
+
+    def passed(self, piece):
+        """
+        Encode the loss of a turn that ran out of time, sent to both
+        players. The next move the late player sends is discarded, as the
+        answer to it is this message.
+
+        Args:
+            piece (char): Piece whose turn was skipped.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_PASSED].pack(SIZES[OP_PASSED], OP_PASSED, ord(piece))
+
+
+    def game_over(self, result, x=0, y=0):
+        """
+        Encode the end of the game.
+
+        Args:
+            result (int): WIN, LOSE, STALEMATE, ADVERSARY_LEFT, TIMED_OUT or
+                          ADVERSARY_TIMED_OUT.
+            x (int): Horizontal coordinate of the last move.
+            y (int): Vertical coordinate of the last move.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_GAME_OVER].pack(SIZES[OP_GAME_OVER], OP_GAME_OVER, result, x, y)
+
+
+    def spectate(self, match, piece):
+        """
+        Encode a request to follow the events of some matches.
+
+        Args:
+            match (int): Match identifier, or ANY_MATCH.
+            piece (char): Piece whose events are followed, or ANY_PIECE.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_SPECTATE].pack(SIZES[OP_SPECTATE], OP_SPECTATE, ord(piece), match)
+
+
+    def update(self, match, event, piece, x=0, y=0):
+        """
+        Encode an event of a match for its spectators.
+
+        Args:
+            match (int): Match identifier.
+            event (int): STARTED, PLACED, WON, DRAWN, LEFT, PASSED or
+                         FORFEITED.
+            piece (char): Piece the event concerns.
+            x (int): Horizontal coordinate of the move, if any.
+            y (int): Vertical coordinate of the move, if any.
+
+        Returns:
+            bytes: Encoded frame.
+        """
+        return FRAMES[OP_UPDATE].pack(SIZES[OP_UPDATE], OP_UPDATE, ord(piece), match, event, x, y)
+
+
+    def server_decoder(self):
+        """
+        Create a decoder for the messages of a player.
+
+        Returns:
+            BinaryDecoder: New decoder.
+        """
+        return BinaryDecoder()
+
+
+    def client_decoder(self):
+        """
+        Create a decoder for the messages of the board.
+
+        Returns:
+            BinaryDecoder: New decoder.
+        """
+        return BinaryDecoder()
+
+
+class TextServerDecoder:
+    """
+    Decoder of the text protocol on the board side: the subscribe request
+    is the bare piece symbol and moves are JSON objects {'piece': [x, y]}.
+    Objects split or merged by TCP are rebuilt from the buffer. Spectators
+    send instead '@' and a topic name ended by a newline, any number of
+    times.
+
+    Attributes:
+        buffer (bytearray): Bytes of the message not yet complete.
+        subscribed (bool): Whether the subscribe request was decoded.
+    """
+
+    MAX_PENDING = 1024
+    DECODER = json.JSONDecoder()
+    SPECTATE = ord('@')
+
+    def __init__(self):
+        """
+        Initialize the decoder expecting the subscribe request.
+        """
+        self.__buffer = bytearray()
+        self.__subscribed = False
+
+
+    def feed(self, data):
+        """
+        Decode the complete messages available after some received bytes.
+
+        Args:
+            data (bytes): Received bytes.
+
+        Raises:
+            ProtocolError: If a message is not a valid move or an incomplete
+                           one grows too large.
+
+        Returns:
+            list of tuple: Decoded messages, opcode first.
+        """
+        buffer = self.__buffer
+        buffer += data
+        messages = []
+        if not self.__subscribed and buffer and buffer[0] != self.SPECTATE:
+            messages.append((OP_SUBSCRIBE, chr(buffer[0]), b""))
+            del buffer[:1]
+            self.__subscribed = True
+
+        # The buffer is decoded once, and a character cut short waits for
+        # the rest of its bytes
+        try:
+            text, size = codecs.utf_8_decode(buffer, "strict", False)
+        except UnicodeDecodeError:
+            raise ProtocolError("Unreadable message")
+        pos = 0
+        while pos < len(text):
+            if ord(text[pos]) == self.SPECTATE:
+                end = text.find("\n", pos)
+                if end < 0:
+                    break
+                match, piece = parse_topic(text[pos + 1:end])
+                messages.append((OP_SPECTATE, piece, match))
+                pos = end + 1
+                continue
+
+            try:
+                obj, end = self.DECODER.raw_decode(text, pos)
+            except ValueError:
+                break
+            pos = end
+
+            try:
+                (piece, (x, y)), = obj.items()
+                messages.append((OP_MOVE, piece, int(x), int(y)))
+            except (AttributeError, TypeError, ValueError):
+                raise ProtocolError(f"Malformed move {obj}")
+
+        del buffer[:size if pos == len(text) else len(text[:pos].encode('utf-8'))]
+        if len(buffer) > self.MAX_PENDING:
+            raise ProtocolError("Unterminated topic" if buffer[0] == self.SPECTATE
+                                else "Unreadable message")
+        return messages
+
+
+class TextClientDecoder:
+    """
+    Decoder of the text protocol on the player side. Messages carry no
+    length, but all of them start with the board tag, so the text received
+    is split there and every message is classified by its wording. A
+    message is complete once the next tag arrives, and the last one when
+    its wording is whole; until then it waits in the buffer, as do the
+    bytes of a character cut short.
+
+    Attributes:
+        utf8 (codecs.IncrementalDecoder): Decoder of the bytes received.
+        pending (str): Text of the message not yet complete.
+    """
+
+    MAX_PENDING = 1024
+    TAG = "[BOARD]:"
+    UPDATE = re.compile(r" Match (\d+): (\S) (\S+)")
+    POSITION = re.compile(r"\[(-?\d+), ?(-?\d+)\]")
+    AT = r"\[-?\d+, -?\d+\]"
+    WHOLE = re.compile(
+        rf" (?:Subscribed to piece \S,\d|Piece placed at {AT}|Adversary move: {AT}"
+        r"|Position \[-?\d+,-?\d+\]: (?:OCCUPIED|OUT OF BOARD)|Turn of \S skipped: OUT OF TIME"
+        rf"|Match \d+: \S (?:starts|left|passes|forfeits|(?:placed|wins|draws) at {AT})"
+        + "".join("|" + re.escape(text.partition(": ")[2]) for text in RESULTS.values()) + ")")
+
+    def __init__(self):
+        """
+        Initialize the decoder with nothing received.
+        """
+        self.__utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.__pending = ""
+
+
+    def feed(self, data):
+        """
+        Decode the complete messages available after some received bytes.
+
+        Args:
+            data (bytes): Received bytes.
+
+        Raises:
+            ProtocolError: If the bytes are not UTF-8 or an incomplete
+                           message grows too large.
+
+        Returns:
+            list of tuple: Decoded messages, opcode first.
+        """
+        try:
+            text = self.__pending + self.__utf8.decode(data)
+        except UnicodeDecodeError:
+            raise ProtocolError("Unreadable message")
+        last = text.rfind(self.TAG)
+        if last < 0 or not self.WHOLE.fullmatch(text, last + len(self.TAG)):
+            # A message cut short, or a tag cut short after a whole message
+            last = max(last, 0)
+            self.__pending = text[last:]
+            text = text[:last]
+            if len(self.__pending) > self.MAX_PENDING:
+                raise ProtocolError("Unterminated message")
+        else:
+            self.__pending = ""
+        return [self.__classify(message) for message in text.split(self.TAG) if message]
+
+
+    def __classify(self, text):
+        """
+        Tell a message of the text protocol from its wording.
+
+        Args:
+            text (str): Message without the board tag.
+
+        Returns:
+            tuple: Decoded message, opcode first.
+        """
+        position = self.POSITION.search(text)
+        x, y = (int(position[1]), int(position[2])) if position else (0, 0)
+
+        # Updates name the match, and their wording is set by the event
+        update = self.UPDATE.match(text)
+        if update is not None:
+            return (OP_UPDATE, update[2], int(update[1]), VERBS[update[3]], x, y)
+
+        if "ADVERSARY LEFT" in text:
+            return (OP_GAME_OVER, ADVERSARY_LEFT, x, y)
+        if "ADVERSARY OUT OF TIME" in text:
+            return (OP_GAME_OVER, ADVERSARY_TIMED_OUT, x, y)
+        if "skipped" in text:
+            return (OP_PASSED, text.split()[2])
+        if "OUT OF TIME" in text:
+            return (OP_GAME_OVER, TIMED_OUT, x, y)
+        if "WIN" in text:
+            return (OP_GAME_OVER, WIN, x, y)
+        if "LOSE" in text:
+            return (OP_GAME_OVER, LOSE, x, y)
+        if "STALEMATE" in text:
+            return (OP_GAME_OVER, STALEMATE, x, y)
+        if "OCCUPIED" in text:
+            return (OP_REJECT, OCCUPIED, x, y)
+        if "OUT OF BOARD" in text:
+            return (OP_REJECT, OUT_OF_BOARD, x, y)
+        if "Subscribed" in text:
+            msg, turn = text.split(',')
+            return (OP_SUBSCRIBED, msg.strip()[-1], int(turn), 0, 0, 0, None, None)
+        if "Adversary" in text:
+            return (OP_ADVERSARY_MOVE, ' ', x, y)
+        return (OP_ACK, x, y)
+
+
+class TextCodec:
+    """
+    Encoder of the original text protocol, kept for compatibility with
+    players and boards that do not speak the binary one. Methods take the
+    same arguments as those of BinaryCodec. Its messages carry no match
+    identifier, so text players can not resume a match.
+    """
+
+    name = "text"
+
+    def subscribe(self, topic, name=""):
+        """Encode a subscribe request as the bare piece symbol: text players are anonymous."""
+        return topic.encode('utf-8')
+
+
+    def subscribed(self, topic, turn, rows, cols, k, match=0, token=0):
+        """Encode the confirmation of a subscription, followed by the turn."""
+        return f"[BOARD]: Subscribed to piece {topic},{turn}".encode('utf-8')
+
+
+    def move(self, piece, x, y):
+        """Encode a move as a JSON object."""
+        return json.dumps({piece: [x, y]}).encode('utf-8')
+
+
+    def ack(self, x, y):
+        """Encode the confirmation of a placed piece."""
+        return describe((OP_ACK, x, y)).encode('utf-8')
+
+
+    def reject(self, reason, x, y):
+        """Encode the rejection of a move."""
+        return describe((OP_REJECT, reason, x, y)).encode('utf-8')
+
+
+    def adversary_move(self, piece, x, y):
+        """Encode the move of the adversary."""
+        return describe((OP_ADVERSARY_MOVE, piece, x, y)).encode('utf-8')
+
+
+    def passed(self, piece):
+        """Encode the loss of a turn that ran out of time."""
+        return describe((OP_PASSED, piece)).encode('utf-8')
+
+
+    def game_over(self, result, x=0, y=0):
+        """Encode the end of the game."""
+        return RESULTS[result].encode('utf-8')
+
+
+    def spectate(self, match, piece):
+        """Encode a spectate request as '@' and the topic name."""
+        return f"@{topic_name(match, piece)}\n".encode('utf-8')
+
+
+    def update(self, match, event, piece, x=0, y=0):
+        """Encode an event of a match."""
+        return describe((OP_UPDATE, piece, match, event, x, y)).encode('utf-8')
+
+
+    def server_decoder(self):
+        """Create a decoder for the messages of a player."""
+        return TextServerDecoder()
+
+
+    def client_decoder(self):
+        """Create a decoder for the messages of the board."""
+        return TextClientDecoder()
+
+
+BINARY = BinaryCodec()
+TEXT = TextCodec()
+CODECS = {codec.name: codec for codec in (BINARY, TEXT)}
+
+
+def sniff(first_byte):
+    """
+    Tell the protocol of a player from the first byte it sent. Binary frames
+    start with the high byte of their length, always 0, while text players
+    start with a piece symbol.
+
+    Args:
+        first_byte (int): First byte received from the player.
+
+    Returns:
+        BinaryCodec | TextCodec: Codec to talk to the player.
+    """
+    return BINARY if first_byte == 0 else TEXT
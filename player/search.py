@@ -0,0 +1,498 @@
+import time
+import random
+from collections import OrderedDict
+from tablebase import symmetries
+
+# Row, column, main diagonal and anti diagonal steps
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+WIN = 1 << 30           # Value of a won position, less the plies to reach it
+MATE_BOUND = WIN - 10000
+INFINITY = WIN + 1
+
+EXACT, LOWER, UPPER = 0, 1, 2   # Kinds of values kept in the table
+
+FULL_WIDTH = 25         # Boards up to this many boxes try every empty box
+NEIGHBOURHOOD = 2       # Larger boards only try boxes this close to a piece
+CLOCK_EVERY = 1023      # Nodes between two looks at the clock, minus one
+
+
+class Timeout(Exception):
+    """
+    Raised inside the search when the time budget of a move runs out.
+    """
+    pass
+
+
+class SearchStats:
+    """
+    Counters of a search, to follow its performance across releases.
+
+    Attributes:
+        nodes (int): Positions visited.
+        probes (int): Lookups in the transposition table.
+        hits (int): Lookups that found the position.
+        depth (int): Deepest iteration completed.
+        seconds (float): Time spent searching.
+    """
+
+    __slots__ = ("nodes", "probes", "hits", "depth", "seconds")
+
+    def __init__(self):
+        """
+        Initialize the counters to zero.
+        """
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+        self.depth = 0
+        self.seconds = 0.0
+
+
+    @property
+    def nodes_per_second(self):
+        """
+        Search speed.
+
+        Returns:
+            float: Nodes visited per second.
+        """
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+
+    @property
+    def hit_rate(self):
+        """
+        Share of the table lookups that found the position.
+
+        Returns:
+            float: Hits divided by probes, 0 if there was none.
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+
+    def __str__(self):
+        return (f"depth {self.depth}, {self.nodes} nodes in {self.seconds:.3f} s "
+                f"({self.nodes_per_second:.0f} nodes/s), table hit rate {self.hit_rate:.1%}")
+
+
+class TranspositionTable:
+    """
+    Values of the positions already searched, by Zobrist hash, bounded in
+    size: when full, the least recently used position is evicted.
+
+    Parameters:
+        size (int): Positions kept at most.
+
+    Attributes:
+        entries (OrderedDict {int: tuple}): Depth searched, value, kind of
+                                            value and best move of every
+                                            position, least recently used
+                                            first.
+    """
+
+    def __init__(self, size):
+        """
+        Initialize an empty table.
+
+        Args:
+            size (int): Positions kept at most.
+        """
+        self.__size = size
+        self.__entries = OrderedDict()
+
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+    def get(self, key):
+        """
+        Look a position up, marking it as the most recently used.
+
+        Args:
+            key (int): Hash of the position.
+
+        Returns:
+            tuple(int, int, int, int): Entry of the position, None if absent.
+        """
+        entry = self.__entries.get(key)
+        if entry is not None:
+            self.__entries.move_to_end(key)
+        return entry
+
+
+    def put(self, key, entry):
+        """
+        Store the entry of a position, evicting the least recently used one
+        if the table is full.
+
+        Args:
+            key (int): Hash of the position.
+            entry (tuple(int, int, int, int)): Depth, value, kind and move.
+        """
+        entries = self.__entries
+        entries[key] = entry
+        entries.move_to_end(key)
+        if len(entries) > self.__size:
+            entries.popitem(last=False)
+
+
+    def clear(self):
+        """
+        Forget every position.
+        """
+        self.__entries.clear()
+
+
+class AlphaBeta:
+    """
+    Negamax search with alpha-beta pruning for k in a row on a rows x cols
+    board, as the board enforces it. Positions are hashed with Zobrist keys
+    under every symmetry of the board, and the smallest of them identifies
+    the position in the transposition table, so positions that are
+    rotations or reflections of each other are searched once. Each move is
+    searched by iterative deepening until its time budget runs out, and the
+    best move of the last complete iteration is played.
+
+    Every window of k boxes keeps how many pieces of each side it holds, so
+    placing a piece updates the evaluation and detects a win by touching
+    only the windows through its box.
+
+    Parameters:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        k (int): Pieces in a row needed to win.
+        table_size (int): Positions kept in the transposition table.
+        symmetry (bool): Whether to merge symmetric positions.
+        seed (int): Seed of the Zobrist keys.
+
+    Attributes:
+        cells (int): Number of boxes.
+        windows (list of int lists): For every box, the windows through
+                                     it.
+        counts (list of 2 int lists): Pieces of each side in every window.
+        score (int): Evaluation for side 0, the sum over the windows.
+        board (bytearray): Side of the piece in every box plus one, 0 if
+                           empty.
+        filled (int): Number of occupied boxes.
+        keys (list of 2 lists of tuple): Zobrist key of a piece of each
+                                         side in every box, under each
+                                         symmetry.
+        hashes (list of int): Hash of the position under each symmetry.
+        perms (list of list of int): Symmetries of the board.
+        inverse (list of list of int): Inverse of every symmetry.
+        table (TranspositionTable): Positions already searched.
+        history (list of int): Cutoffs caused by every box, to try the
+                               best boxes first.
+        order (list of int): Boxes from the center outwards.
+        stats (SearchStats): Counters of the last search.
+    """
+
+    def __init__(self, rows, cols, k, table_size=1 << 18, symmetry=True, seed=0):
+        """
+        Initialize the search on an empty board.
+
+        Args:
+            rows (int): Number of rows.
+            cols (int): Number of columns.
+            k (int): Pieces in a row needed to win.
+            table_size (int): Positions kept in the transposition table.
+            symmetry (bool): Whether to merge symmetric positions.
+            seed (int): Seed of the Zobrist keys.
+        """
+        self.__rows = rows
+        self.__cols = cols
+        self.__k = k
+        self.__cells = rows * cols
+
+        # Windows of k boxes along every direction
+        windows = [[] for i in range(self.__cells)]
+        count = 0
+        for x in range(rows):
+            for y in range(cols):
+                for dx, dy in DIRECTIONS:
+                    ex, ey = x + (k - 1) * dx, y + (k - 1) * dy
+                    if not (0 <= ex < rows and 0 <= ey < cols):
+                        continue
+                    for i in range(k):
+                        windows[(x + i * dx) * cols + y + i * dy].append(count)
+                    count += 1
+        self.__windows = windows
+        self.__counts = [[0] * count, [0] * count]
+        self.__weights = [10 ** min(n, 8) if n else 0 for n in range(k + 1)]
+        self.__score = 0
+        self.__board = bytearray(self.__cells)
+        self.__filled = 0
+
+        self.__perms = symmetries(rows, cols) if symmetry else [list(range(self.__cells))]
+        generator = random.Random(seed)
+        zobrist = [[generator.getrandbits(64) for c in range(self.__cells)] for side in range(2)]
+        self.__keys = [[tuple(zobrist[side][perm[c]] for perm in self.__perms)
+                        for c in range(self.__cells)] for side in range(2)]
+        self.__hashes = [0] * len(self.__perms)
+        self.__inverse = [[0] * self.__cells for perm in self.__perms]
+        for perm, inverse in zip(self.__perms, self.__inverse):
+            for c, image in enumerate(perm):
+                inverse[image] = c
+
+        self.__table = TranspositionTable(table_size)
+        self.__history = [0] * self.__cells
+        center_x, center_y = (rows - 1) / 2, (cols - 1) / 2
+        self.__order = sorted(range(self.__cells),
+                              key=lambda c: abs(c // cols - center_x) + abs(c % cols - center_y))
+        self.__near = [[nx * cols + ny
+                        for nx in range(max(0, c // cols - NEIGHBOURHOOD), min(rows, c // cols + NEIGHBOURHOOD + 1))
+                        for ny in range(max(0, c % cols - NEIGHBOURHOOD), min(cols, c % cols + NEIGHBOURHOOD + 1))]
+                       for c in range(self.__cells)]
+        self.__stats = SearchStats()
+        self.__deadline = None
+
+
+    @property
+    def stats(self):
+        """
+        Getter for stats attribute.
+
+        Returns:
+            SearchStats: Counters of the last search.
+        """
+        return self.__stats
+
+
+    @property
+    def table(self):
+        """
+        Getter for table attribute.
+
+        Returns:
+            TranspositionTable: Positions already searched.
+        """
+        return self.__table
+
+
+    def place(self, x, y, side):
+        """
+        Place a piece of a side on the board.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+            side (int): 0 or 1.
+
+        Returns:
+            bool: True if the piece completes k in a row; False otherwise.
+        """
+        return self.__place(x * self.__cols + y, side)
+
+
+    def __place(self, cell, side):
+        """
+        Place a piece, updating the window counts, the evaluation and the
+        hashes.
+
+        Args:
+            cell (int): Box, numbered x * cols + y.
+            side (int): 0 or 1.
+
+        Returns:
+            bool: True if the piece completes k in a row; False otherwise.
+        """
+        mine = self.__counts[side]
+        theirs = self.__counts[1 - side]
+        weights = self.__weights
+        gain = 0
+        won = False
+        for w in self.__windows[cell]:
+            m = mine[w]
+            t = theirs[w]
+            if t == 0:
+                gain += weights[m + 1] - weights[m]
+                if m + 1 == self.__k:
+                    won = True
+            elif m == 0:
+                gain += weights[t]
+            mine[w] = m + 1
+        self.__score += gain if side == 0 else -gain
+        self.__board[cell] = side + 1
+        self.__filled += 1
+        hashes = self.__hashes
+        for s, key in enumerate(self.__keys[side][cell]):
+            hashes[s] ^= key
+        return won
+
+
+    def __remove(self, cell, side):
+        """
+        Take back the piece of a side from a box.
+
+        Args:
+            cell (int): Box, numbered x * cols + y.
+            side (int): 0 or 1.
+        """
+        mine = self.__counts[side]
+        theirs = self.__counts[1 - side]
+        weights = self.__weights
+        gain = 0
+        for w in self.__windows[cell]:
+            m = mine[w] - 1
+            t = theirs[w]
+            if t == 0:
+                gain += weights[m + 1] - weights[m]
+            elif m == 0:
+                gain += weights[t]
+            mine[w] = m
+        self.__score -= gain if side == 0 else -gain
+        self.__board[cell] = 0
+        self.__filled -= 1
+        hashes = self.__hashes
+        for s, key in enumerate(self.__keys[side][cell]):
+            hashes[s] ^= key
+
+
+    def __candidates(self):
+        """
+        Boxes worth trying: every empty box on small boards, only those near
+        a piece on large ones.
+
+        Returns:
+            list of int: Empty boxes, from the center outwards.
+        """
+        board = self.__board
+        if self.__cells <= FULL_WIDTH or self.__filled == 0:
+            return [c for c in self.__order if not board[c]]
+        near = set()
+        for c in range(self.__cells):
+            if board[c]:
+                near.update(n for n in self.__near[c] if not board[n])
+        return [c for c in self.__order if c in near]
+
+
+    def __canonical(self):
+        """
+        Identify the position among its symmetric images.
+
+        Returns:
+            tuple(int, int): Smallest hash of the position and the symmetry
+                             giving it.
+        """
+        hashes = self.__hashes
+        key = min(hashes)
+        return key, hashes.index(key)
+
+
+    def __negamax(self, depth, alpha, beta, ply, side):
+        """
+        Value of the position for the side to move.
+
+        Args:
+            depth (int): Plies left to search.
+            alpha (int): Value the side to move is already assured of.
+            beta (int): Value beyond which the adversary avoids this line.
+            ply (int): Plies from the root.
+            side (int): Side to move.
+
+        Raises:
+            Timeout: If the time budget runs out.
+
+        Returns:
+            tuple(int, int): Value and best box, None if not searched.
+        """
+        stats = self.__stats
+        stats.nodes += 1
+        if stats.nodes & CLOCK_EVERY == 0 and time.perf_counter() > self.__deadline:
+            raise Timeout()
+        if depth == 0:
+            return (self.__score if side == 0 else -self.__score), None
+
+        # Mate values are stored relative to the position, not to the root
+        key, sym = self.__canonical()
+        stats.probes += 1
+        entry = self.__table.get(key)
+        first = None
+        if entry is not None:
+            stats.hits += 1
+            stored_depth, value, kind, move = entry
+            first = self.__inverse[sym][move] if move is not None else None
+            if value > MATE_BOUND:
+                value -= ply
+            elif value < -MATE_BOUND:
+                value += ply
+            if stored_depth >= depth and (kind == EXACT or (kind == LOWER and value >= beta)
+                                          or (kind == UPPER and value <= alpha)):
+                return value, first
+
+        moves = self.__candidates()
+        history = self.__history
+        moves.sort(key=lambda c: -history[c])
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        start_alpha = alpha
+        best_value = -INFINITY
+        best = None
+        for cell in moves:
+            if self.__place(cell, side):
+                value = WIN - ply - 1
+            elif self.__filled == self.__cells:
+                value = 0
+            else:
+                try:
+                    value = -self.__negamax(depth - 1, -beta, -alpha, ply + 1, 1 - side)[0]
+                except Timeout:
+                    self.__remove(cell, side)
+                    raise
+            self.__remove(cell, side)
+            if value > best_value:
+                best_value = value
+                best = cell
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                history[cell] += depth * depth
+                break
+
+        kind = UPPER if best_value <= start_alpha else LOWER if best_value >= beta else EXACT
+        stored = best_value
+        if stored > MATE_BOUND:
+            stored += ply
+        elif stored < -MATE_BOUND:
+            stored -= ply
+        self.__table.put(key, (depth, stored, kind, self.__perms[sym][best] if best is not None else None))
+        return best_value, best
+
+
+    def search(self, side, budget):
+        """
+        Choose the move of a side by iterative deepening: searches one ply
+        deeper each time, until the time budget runs out or the game is
+        solved, and keeps the best move of the last complete iteration.
+
+        Args:
+            side (int): Side to move.
+            budget (float): Seconds the search may take.
+
+        Returns:
+            tuple(int, int): Coordinates of the box chosen, None if the
+                             board is full.
+        """
+        self.__stats = stats = SearchStats()
+        start = time.perf_counter()
+        self.__deadline = start + budget
+        candidates = self.__candidates()
+        if not candidates:
+            return None
+
+        best = candidates[0]
+        for depth in range(1, self.__cells - self.__filled + 1):
+            try:
+                value, move = self.__negamax(depth, -INFINITY, INFINITY, 0, side)
+            except Timeout:
+                break
+            best = move
+            stats.depth = depth
+            if abs(value) > MATE_BOUND:
+                break
+        stats.seconds = time.perf_counter() - start
+        return divmod(best, self.__cols)
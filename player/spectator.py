@@ -0,0 +1,125 @@
+import os
+import argparse
+import protocol
+from collections import deque
+from player import RECV_SIZE, clog, flog
+from transport import default_transport
+
+# Events after which a match is over
+ENDINGS = {protocol.WON, protocol.DRAWN, protocol.LEFT, protocol.FORFEITED}
+
+
+class Spectator:
+    """
+    Read-only client of the broker that follows the events of some matches
+    without taking part in them.
+
+    Parameters:
+        protocol_name (str): Wire protocol, 'binary' or 'text'. Defaults to
+                             the PLAYER_PROTOCOL environment variable, or
+                             'binary' if it is not set.
+        transport (Transport): Way to reach the broker; the one of the
+                               environment by default.
+
+    Attributes:
+        socket (socket.socket): Socket for communication with the broker,
+                                None until connected.
+        codec (BinaryCodec | TextCodec): Encoder of the wire protocol.
+        decoder (BinaryDecoder | TextClientDecoder): Incremental decoder of
+                                                     the broker's messages.
+        inbox (deque): Decoded messages not handled yet.
+    """
+
+    def __init__(self, protocol_name=None, transport=None):
+        """
+        Initialize the spectator.
+
+        Args:
+            protocol_name (str): Wire protocol, 'binary' or 'text'.
+            transport (Transport): Way to reach the broker.
+        """
+        self.__transport = transport if transport is not None else default_transport()
+        self.__socket = None
+        self.__codec = protocol.CODECS[protocol_name or os.getenv("PLAYER_PROTOCOL", "binary")]
+        self.__decoder = self.__codec.client_decoder()
+        self.__inbox = deque()
+
+
+    def connect(self):
+        """
+        Connect to the broker.
+        """
+        self.__socket = self.__transport.connect()
+
+
+    def spectate(self, topic):
+        """
+        Follow the events of a topic and wait for the broker to confirm it.
+
+        Args:
+            topic (str): Topic name: '3/O', '3/*', '*/X' or '*'.
+
+        Raises:
+            ProtocolError: If the topic name is malformed.
+        """
+        match, piece = protocol.parse_topic(topic)
+        self.__socket.sendall(self.__codec.spectate(match, piece))
+        self.receive()
+        flog.info("Spectating topic %s", topic)
+
+
+    def receive(self):
+        """
+        Wait for the next message of the broker.
+
+        Raises:
+            ConnectionError: If the broker closes the connection.
+
+        Returns:
+            tuple: Decoded message, opcode first.
+        """
+        while not self.__inbox:
+            data = self.__socket.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("[SPECTATOR]: Connection closed by the board")
+            self.__inbox.extend(self.__decoder.feed(data))
+        return self.__inbox.popleft()
+
+
+    def close(self):
+        """
+        Close the connection with the broker.
+        """
+        if self.__socket is not None:
+            self.__socket.close()
+
+
+def main():
+    """
+    Main program. Print the events of the topics given until the number of
+    matches requested are over, or forever.
+    """
+    parser = argparse.ArgumentParser(description="Read-only spectator of the board broker")
+    parser.add_argument("topics", nargs="*", default=[protocol.ANY_PIECE],
+                        help="topics to follow, such as 3/O, 3/* or * (the default)")
+    parser.add_argument("--matches", type=int, help="leave after this many matches are over")
+    args = parser.parse_args()
+
+    spectator = Spectator()
+    spectator.connect()
+    for topic in args.topics:
+        spectator.spectate(topic)
+
+    over = 0
+    try:
+        while args.matches is None or over < args.matches:
+            update = spectator.receive()
+            clog.info("%s", protocol.Description(update))
+            if update[0] == protocol.OP_UPDATE and update[3] in ENDINGS:
+                over += 1
+    finally:
+        spectator.close()
+
+
+if __name__ == "__main__":
+    main()
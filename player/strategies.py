@@ -0,0 +1,392 @@
+import random
+from search import AlphaBeta
+from protocol import UNBOUNDED
+
+LISTED = 1 << 16        # Boxes of the largest board whose free boxes are listed
+NEAR = 2                # Rows and columns a move of an unbounded board is from a piece
+
+
+class RandomStrategy:
+    """
+    Move strategy that places the piece on a random box among those not
+    known to be taken. The boxes taken are learnt from the moves of both
+    players, so every choice is legal unless the board dimension is wrong.
+    Boards with more than LISTED boxes are sampled instead of listed, and
+    on unbounded boards the piece goes next to a piece already placed.
+
+    Parameters:
+        rows (int): Number of rows, used when the board does not tell it.
+        cols (int): Number of columns, used when the board does not tell it.
+        seed (int): Seed of the random generator, for reproducible games.
+
+    Attributes:
+        size (tuple(int, int)): Rows and columns of the current game.
+        free (list of tuple(int, int)): Boxes that may still be chosen, None
+                                        if the board is sampled.
+        index (dict {tuple(int, int): int}): Position of each box in free,
+                                             to remove it in constant time.
+        taken (set of tuple(int, int)): Boxes taken on a sampled board.
+        placed (list of tuple(int, int)): Boxes taken on a sampled board, to
+                                          draw one of them.
+    """
+
+    def __init__(self, rows=3, cols=3, seed=None):
+        """
+        Initialize the strategy.
+
+        Args:
+            rows (int): Default number of rows.
+            cols (int): Default number of columns.
+            seed (int): Seed of the random generator.
+        """
+        self.__rows = rows
+        self.__cols = cols
+        self.__random = random.Random(seed)
+        self.__size = (rows, cols)
+        self.__free = []
+        self.__index = {}
+        self.__taken = set()
+        self.__placed = []
+
+
+    def start(self, rows, cols, k, piece):
+        """
+        Prepare a new game on an empty board.
+
+        Args:
+            rows (int): Number of rows, 0 if unknown.
+            cols (int): Number of columns, 0 if unknown.
+            k (int): Pieces in a row needed to win, 0 if unknown.
+            piece (char): Piece of the player.
+        """
+        rows = rows or self.__rows
+        cols = cols or self.__cols
+        self.__size = (rows, cols)
+        self.__taken = set()
+        self.__placed = []
+        if UNBOUNDED in (rows, cols) or rows * cols > LISTED:
+            self.__free = None
+            self.__index = {}
+            return
+        self.__free = [(x, y) for x in range(rows) for y in range(cols)]
+        self.__index = {box: i for i, box in enumerate(self.__free)}
+
+
+    def observe(self, x, y):
+        """
+        Take note of a box that is no longer free.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        if self.__free is None:
+            if (x, y) not in self.__taken:
+                self.__taken.add((x, y))
+                self.__placed.append((x, y))
+            return
+
+        i = self.__index.pop((x, y), None)
+        if i is None:
+            return
+
+        # Move the last box into the hole
+        last = self.__free.pop()
+        if i < len(self.__free):
+            self.__free[i] = last
+            self.__index[last] = i
+
+
+    def choose(self):
+        """
+        Choose the box for the next move. It is not offered again, whether
+        the board accepts it or not.
+
+        Returns:
+            tuple(int, int): Coordinates of the box.
+        """
+        if self.__free is None:
+            box = self.__sample()
+        else:
+            box = self.__free[self.__random.randrange(len(self.__free))]
+        self.observe(*box)
+        return box
+
+
+    def placed(self, x, y):
+        """
+        Take note of the board placing the piece of the player. The box
+        left the free ones when it was chosen, so there is nothing to do.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        pass
+
+
+    def __near(self, c, size):
+        """
+        Random coordinate at most NEAR boxes from another one, kept on the
+        board along a dimension with edges.
+
+        Args:
+            c (int): Coordinate to move from.
+            size (int): Boxes along the dimension, UNBOUNDED if it has no
+                        edge.
+
+        Returns:
+            int: New coordinate.
+        """
+        c += self.__random.randint(-NEAR, NEAR)
+        return c if size == UNBOUNDED else min(max(0, c), size - 1)
+
+
+    def __sample(self):
+        """
+        Draw boxes until one is not known to be taken: anywhere on a large
+        board, and around a piece already placed on an unbounded one, where
+        the game is played. The first piece goes to the origin.
+
+        Returns:
+            tuple(int, int): Coordinates of the box.
+        """
+        rows, cols = self.__size
+        while True:
+            if UNBOUNDED in (rows, cols):
+                x, y = self.__random.choice(self.__placed) if self.__placed else (0, 0)
+                box = (self.__near(x, rows), self.__near(y, cols))
+            else:
+                box = (self.__random.randrange(rows), self.__random.randrange(cols))
+            if box not in self.__taken:
+                return box
+
+
+class ScriptStrategy:
+    """
+    Move strategy that replays a fixed list of boxes, in order, whatever the
+    adversary does. Rejected boxes are skipped like any other.
+
+    Parameters:
+        moves (list of tuple(int, int)): Boxes to play.
+    """
+
+    def __init__(self, moves):
+        """
+        Initialize the strategy.
+
+        Args:
+            moves (list of tuple(int, int)): Boxes to play.
+        """
+        self.__moves = list(moves)
+        self.__next = 0
+
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load a script with one X,Y box per line.
+
+        Args:
+            path (str): Path to the script.
+
+        Returns:
+            ScriptStrategy: Strategy replaying the script.
+        """
+        with open(path) as f:
+            return cls(tuple(int(c) for c in line.split(',')) for line in f if line.strip())
+
+
+    def start(self, rows, cols, k, piece):
+        """
+        Prepare a new game, replaying the script from the beginning.
+
+        Args:
+            rows (int): Number of rows, 0 if unknown.
+            cols (int): Number of columns, 0 if unknown.
+            k (int): Pieces in a row needed to win, 0 if unknown.
+            piece (char): Piece of the player.
+        """
+        self.__next = 0
+
+
+    def observe(self, x, y):
+        """
+        Ignore the moves of the game.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        pass
+
+
+    def choose(self):
+        """
+        Choose the box for the next move.
+
+        Raises:
+            IndexError: If the script is over and the game is not.
+
+        Returns:
+            tuple(int, int): Coordinates of the box.
+        """
+        if self.__next >= len(self.__moves):
+            raise IndexError("[PLAYER]: The script has no moves left")
+        self.__next += 1
+        return self.__moves[self.__next - 1]
+
+
+    def placed(self, x, y):
+        """
+        Ignore the confirmation of a move of the script.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        pass
+
+
+class AlphaBetaStrategy:
+    """
+    Move strategy that searches the game tree with alpha-beta pruning,
+    within a time budget per move. The search keeps its transposition table
+    for the whole game, so the positions studied for a move speed up the
+    next ones. Boards solved by a tablebase are not searched: the perfect
+    move is looked up.
+
+    Parameters:
+        budget (float): Seconds of search per move.
+        table_size (int): Positions kept in the transposition table.
+        symmetry (bool): Whether to merge symmetric positions.
+        rows (int): Number of rows, used when the board does not tell it.
+        cols (int): Number of columns, used when the board does not tell it.
+        tablebase (Tablebase): Perfect moves of a board, None to search
+                               them all.
+
+    Attributes:
+        search (AlphaBeta): Search of the current game.
+        stats (SearchStats): Counters of the last move searched, None if it
+                             was looked up.
+        width (int): Number of columns of the current game.
+        solved (bool): Whether the tablebase covers the current game.
+        first (bool): Whether the player moved first, None before any move.
+        boxes (list of int): Bit masks of the boxes of the player and of its
+                             adversary.
+    """
+
+    def __init__(self, budget=1.0, table_size=1 << 18, symmetry=True, rows=3, cols=3,
+                 tablebase=None):
+        """
+        Initialize the strategy.
+
+        Args:
+            budget (float): Seconds of search per move.
+            table_size (int): Positions kept in the transposition table.
+            symmetry (bool): Whether to merge symmetric positions.
+            rows (int): Default number of rows.
+            cols (int): Default number of columns.
+            tablebase (Tablebase): Perfect moves of a board.
+        """
+        self.__budget = budget
+        self.__table_size = table_size
+        self.__symmetry = symmetry
+        self.__rows = rows
+        self.__cols = cols
+        self.__tablebase = tablebase
+        self.__search = None
+        self.__stats = None
+        self.__width = cols
+        self.__solved = False
+        self.__first = None
+        self.__boxes = [0, 0]
+
+
+    @property
+    def stats(self):
+        """
+        Getter for stats attribute.
+
+        Returns:
+            SearchStats: Counters of the last move searched, None if it was
+                         looked up or before it.
+        """
+        return self.__stats
+
+
+    def start(self, rows, cols, k, piece):
+        """
+        Prepare a new game on an empty board.
+
+        Args:
+            rows (int): Number of rows, 0 if unknown.
+            cols (int): Number of columns, 0 if unknown.
+            k (int): Pieces in a row needed to win, 0 if unknown.
+            piece (char): Piece of the player.
+
+        Raises:
+            ValueError: If the board is unbounded, which has no game tree
+                        to search.
+        """
+        rows = rows or self.__rows
+        cols = cols or self.__cols
+        if UNBOUNDED in (rows, cols):
+            raise ValueError("[PLAYER]: Alpha-beta search needs a bounded board")
+        k = k or min(rows, cols)
+        self.__search = AlphaBeta(rows, cols, k, self.__table_size, self.__symmetry)
+        self.__stats = None
+        self.__width = cols
+        self.__solved = self.__tablebase is not None and self.__tablebase.covers(rows, cols, k)
+        self.__first = None
+        self.__boxes = [0, 0]
+
+
+    def observe(self, x, y):
+        """
+        Take note of a piece placed by the adversary.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        self.__search.place(x, y, 1)
+        if self.__first is None:
+            self.__first = False
+        self.__boxes[1] |= 1 << (x * self.__width + y)
+
+
+    def choose(self):
+        """
+        Look up or search the box for the next move. The piece is only
+        placed once the board confirms it, as the board may reject the move
+        or skip the turn it was meant for.
+
+        Returns:
+            tuple(int, int): Coordinates of the box.
+        """
+        mine, theirs = self.__boxes
+        found = None
+        if self.__solved:
+            found = self.__tablebase.probe(*((mine, theirs) if self.__first else (theirs, mine)))
+        if found is not None:
+            x, y = found[1]
+            self.__stats = None
+        else:
+            x, y = self.__search.search(0, self.__budget)
+            self.__stats = self.__search.stats
+        return x, y
+
+
+    def placed(self, x, y):
+        """
+        Take note of the board placing the piece of the player.
+
+        Args:
+            x (int): Horizontal coordinate.
+            y (int): Vertical coordinate.
+        """
+        self.__search.place(x, y, 0)
+        if self.__first is None:
+            self.__first = True
+        self.__boxes[0] |= 1 << (x * self.__width + y)
@@ -0,0 +1,536 @@
+import os
+import json
+import math
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+from tablebase import Tablebase
+from strategies import RandomStrategy, ScriptStrategy, AlphaBetaStrategy
+from rules import Game, PLAYING, WON, STALEMATE
+from player import clog, flog
+
+FORMATS = ("round-robin", "swiss")
+PIECES = ('O', 'X')
+CHECKPOINT_EVERY = 5.0  # Seconds between two checkpoints at most
+CHUNKS_PER_WORKER = 8   # Tasks of a round handed to every worker, in chunks
+Z95 = 1.96              # Standard errors either side of a mean, for a 95% interval
+
+# Settings of the games, inherited by the forked workers
+_setup = None
+
+
+def make_strategy(spec, seed, tablebase=None):
+    """
+    Build the strategy of an entrant from its specification: 'random',
+    'alphabeta:BUDGET' or 'script:PATH'.
+
+    Args:
+        spec (str): Specification of the entrant.
+        seed (int): Seed of the random generator.
+        tablebase (Tablebase): Perfect moves for the alpha-beta entrants.
+
+    Raises:
+        ValueError: If the specification names no strategy.
+
+    Returns:
+        RandomStrategy | AlphaBetaStrategy | ScriptStrategy: New strategy.
+    """
+    kind, _, param = spec.partition(':')
+    if kind == "random":
+        return RandomStrategy(seed=seed)
+    if kind == "alphabeta":
+        return AlphaBetaStrategy(budget=float(param or 0.1), tablebase=tablebase)
+    if kind == "script":
+        return ScriptStrategy.from_file(param)
+    raise ValueError(f"[TOURNAMENT]: Unknown strategy {spec!r}")
+
+
+def play(task):
+    """
+    Play a game between two entrants on a board of this process. The
+    first entrant has the piece O, the second one X, and they take turns
+    at moving first from game to game. An illegal move loses the game.
+
+    Args:
+        task (tuple): Round, pairing and game numbers, and positions of
+                      both entrants.
+
+    Returns:
+        tuple: Round, pairing and game numbers, score of the first entrant
+               (1, 0.5 or 0), pieces placed, process id and nanoseconds
+               taken.
+    """
+    start = time.perf_counter_ns()
+    round_, pair, game, first, second = task
+    rows, cols, k, engine, specs, seed, tablebase = _setup
+    board = Game(rows, cols, k, engine)
+    players = []
+    for side, entrant in enumerate((first, second)):
+        strategy = make_strategy(specs[entrant], hash((seed, round_, pair, game, side)), tablebase)
+        strategy.start(rows, cols, k, PIECES[side])
+        players.append(strategy)
+
+    turn = game % 2
+    moves = 0
+    while True:
+        x, y = players[turn].choose()
+        outcome = board.play(x, y, PIECES[turn])
+        if outcome not in (PLAYING, WON, STALEMATE):
+            score = float(turn)
+            break
+        moves += 1
+        if outcome == STALEMATE:
+            score = 0.5
+            break
+        if outcome == WON:
+            score = float(turn == 0)
+            break
+        players[turn].placed(x, y)
+        turn = 1 - turn
+        players[turn].observe(x, y)
+    return round_, pair, game, score, moves, os.getpid(), time.perf_counter_ns() - start
+
+
+class RunningStats:
+    """
+    Mean and variance of a stream of values, updated in constant time and
+    space after Welford, so that no value is kept.
+
+    Parameters:
+        count (int): Values seen so far.
+        mean (float): Their mean.
+        m2 (float): Sum of their squared distances to the mean.
+
+    Attributes:
+        count (int): Values seen so far.
+        mean (float): Their mean, 0 if there is none.
+        variance (float): Their sample variance, 0 below two values.
+        stderr (float): Standard error of the mean.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        """
+        Initialize the stats, empty by default.
+
+        Args:
+            count (int): Values seen so far.
+            mean (float): Their mean.
+            m2 (float): Sum of their squared distances to the mean.
+        """
+        self.__count = count
+        self.__mean = mean
+        self.__m2 = m2
+
+
+    @property
+    def count(self):
+        """
+        Getter for count attribute.
+
+        Returns:
+            int: Values seen so far.
+        """
+        return self.__count
+
+
+    @property
+    def mean(self):
+        """
+        Getter for mean attribute.
+
+        Returns:
+            float: Mean of the values, 0 if there is none.
+        """
+        return self.__mean
+
+
+    @property
+    def variance(self):
+        """
+        Getter for variance attribute.
+
+        Returns:
+            float: Sample variance of the values, 0 below two values.
+        """
+        return self.__m2 / (self.__count - 1) if self.__count > 1 else 0.0
+
+
+    @property
+    def stderr(self):
+        """
+        Getter for stderr attribute.
+
+        Returns:
+            float: Standard error of the mean, 0 below two values.
+        """
+        return math.sqrt(self.variance / self.__count) if self.__count > 1 else 0.0
+
+
+    def add(self, value):
+        """
+        Take a value into account.
+
+        Args:
+            value (float): New value.
+        """
+        self.__count += 1
+        delta = value - self.__mean
+        self.__mean += delta / self.__count
+        self.__m2 += delta * (value - self.__mean)
+
+
+    def state(self):
+        """
+        State of the stats, to save in a checkpoint.
+
+        Returns:
+            list: Count, mean and sum of squared distances.
+        """
+        return [self.__count, self.__mean, self.__m2]
+
+
+class Tournament:
+    """
+    Tournament between move strategies, played round by round. A round
+    robin is a single round where every entrant meets every other one; a
+    Swiss tournament pairs entrants of close scores that have not met yet,
+    round after round, the odd one out getting a bye worth a win. Every
+    pairing plays a number of games, the entrants taking turns at moving
+    first. Only aggregates of the games are kept, with the games done of
+    the current round, so a checkpoint stays small however long the
+    tournament.
+
+    Parameters:
+        config (dict): Entrants, format, rounds, games per pairing, board
+                       and seed of the tournament.
+
+    Attributes:
+        config (dict): Settings, which a checkpoint must match to resume.
+        rounds (list of list): Pairings of every round begun, as positions
+                               of the entrants, the second one None for a
+                               bye.
+        done (set of tuple(int, int)): Pairing and game numbers of the
+                                       games of the last round played.
+        scores (list of RunningStats): Score of every entrant per game.
+        moves (list of RunningStats): Pieces placed in the games of every
+                                      entrant.
+        results (list of list of int): Wins, draws, losses and byes of
+                                       every entrant.
+        workers (dict {int: list}): Games played and nanoseconds spent by
+                                    every worker process in this run.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize a tournament that has not begun.
+
+        Args:
+            config (dict): Settings of the tournament.
+        """
+        self.__config = config
+        entrants = len(config["entrants"])
+        self.__rounds = []
+        self.__done = set()
+        self.__scores = [RunningStats() for i in range(entrants)]
+        self.__moves = [RunningStats() for i in range(entrants)]
+        self.__results = [[0, 0, 0, 0] for i in range(entrants)]
+        self.__workers = {}
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Resume a tournament from its checkpoint.
+
+        Args:
+            path (str): Path of the checkpoint.
+
+        Returns:
+            Tournament: Tournament as it was last saved.
+        """
+        with open(path) as f:
+            saved = json.load(f)
+        tournament = cls(saved["config"])
+        tournament.__rounds = [[tuple(pairing) for pairing in pairings] for pairings in saved["rounds"]]
+        tournament.__done = {tuple(game) for game in saved["done"]}
+        tournament.__scores = [RunningStats(*state) for state in saved["scores"]]
+        tournament.__moves = [RunningStats(*state) for state in saved["moves"]]
+        tournament.__results = saved["results"]
+        return tournament
+
+
+    @property
+    def config(self):
+        """
+        Getter for config attribute.
+
+        Returns:
+            dict: Settings of the tournament.
+        """
+        return self.__config
+
+
+    @property
+    def workers(self):
+        """
+        Getter for workers attribute.
+
+        Returns:
+            dict {int: list}: Games played and nanoseconds spent by every
+                              worker process in this run.
+        """
+        return self.__workers
+
+
+    @property
+    def finished(self):
+        """
+        Getter for finished attribute.
+
+        Returns:
+            bool: True if every round has been played; False otherwise.
+        """
+        rounds = 1 if self.__config["format"] == "round-robin" else self.__config["rounds"]
+        return len(self.__rounds) == rounds and not self.__pending()
+
+
+    def save(self, path):
+        """
+        Write a checkpoint, to a temporary file renamed over the last one
+        so that a crash leaves either of them whole.
+
+        Args:
+            path (str): Path of the checkpoint.
+        """
+        saved = {
+            "config": self.__config,
+            "rounds": self.__rounds,
+            "done": sorted(self.__done),
+            "scores": [stats.state() for stats in self.__scores],
+            "moves": [stats.state() for stats in self.__moves],
+            "results": self.__results,
+        }
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(saved, f)
+        os.replace(temporary, path)
+
+
+    def __pair(self):
+        """
+        Pairings of the next round. Swiss pairings go down the standings,
+        each entrant meeting the best placed one it has not met yet, or the
+        best placed one left if it has met them all.
+
+        Returns:
+            list of tuple(int, int): Positions of the entrants of every
+                                     pairing, the second one None for a bye.
+        """
+        entrants = range(len(self.__config["entrants"]))
+        if self.__config["format"] == "round-robin":
+            return [(a, b) for a in entrants for b in entrants if a < b]
+
+        met = {frozenset(pairing) for pairings in self.__rounds for pairing in pairings}
+        standing = sorted(entrants, key=lambda e: -self.__points(e))
+        pairings = []
+        if len(standing) % 2:
+            # The bye goes to the lowest placed entrant that had the fewest
+            bye = min(reversed(standing), key=lambda e: self.__results[e][3])
+            standing.remove(bye)
+            pairings.append((bye, None))
+        while standing:
+            a = standing.pop(0)
+            b = next((e for e in standing if frozenset((a, e)) not in met), standing[0])
+            standing.remove(b)
+            pairings.append((a, b))
+        return pairings
+
+
+    def __points(self, entrant):
+        """
+        Points of an entrant: the sum of its scores, byes included.
+
+        Args:
+            entrant (int): Position of the entrant.
+
+        Returns:
+            float: Points of the entrant.
+        """
+        stats = self.__scores[entrant]
+        return stats.mean * stats.count + self.__results[entrant][3] * self.__config["games"]
+
+
+    def __pending(self):
+        """
+        Games of the last round begun that are still to be played.
+
+        Returns:
+            list of tuple: Tasks of the games, for play().
+        """
+        if not self.__rounds:
+            return []
+        round_ = len(self.__rounds) - 1
+        return [(round_, pair, game, a, b)
+                for pair, (a, b) in enumerate(self.__rounds[-1]) if b is not None
+                for game in range(self.__config["games"]) if (pair, game) not in self.__done]
+
+
+    def run(self, pool, workers, checkpoint=None, every=CHECKPOINT_EVERY):
+        """
+        Play the rounds left, the games of a round spread over a pool of
+        processes, and record the results as they come in any order.
+
+        Args:
+            pool (multiprocessing.pool.Pool): Pool of worker processes.
+            workers (int): Processes of the pool.
+            checkpoint (str): Path of the checkpoint, None not to save any.
+            every (float): Seconds between two checkpoints at most.
+        """
+        saved = time.monotonic()
+        while not self.finished:
+            tasks = self.__pending()
+            if not tasks:
+                pairings = self.__pair()
+                self.__rounds.append(pairings)
+                self.__done = set()
+                for a, b in pairings:
+                    if b is None:
+                        self.__results[a][3] += 1
+                flog.info("Round %s: %s pairings", len(self.__rounds), len(pairings))
+                continue
+
+            chunk = max(1, len(tasks) // (workers * CHUNKS_PER_WORKER))
+            for result in pool.imap_unordered(play, tasks, chunk):
+                self.__record(*result)
+                if checkpoint is not None and time.monotonic() - saved >= every:
+                    self.save(checkpoint)
+                    saved = time.monotonic()
+            if checkpoint is not None:
+                self.save(checkpoint)
+                saved = time.monotonic()
+
+
+    def __record(self, round_, pair, game, score, moves, pid, ns):
+        """
+        Take a game into account.
+
+        Args:
+            round_ (int): Round of the game.
+            pair (int): Pairing of the game in its round.
+            game (int): Game number in its pairing.
+            score (float): Score of the first entrant.
+            moves (int): Pieces placed.
+            pid (int): Process that played the game.
+            ns (int): Nanoseconds it took.
+        """
+        self.__done.add((pair, game))
+        for entrant, points in zip(self.__rounds[round_][pair], (score, 1.0 - score)):
+            self.__scores[entrant].add(points)
+            self.__moves[entrant].add(moves)
+            self.__results[entrant][0 if points == 1.0 else 1 if points == 0.5 else 2] += 1
+        worker = self.__workers.setdefault(pid, [0, 0])
+        worker[0] += 1
+        worker[1] += ns
+
+
+    def standings(self):
+        """
+        Entrants from the most to the fewest points.
+
+        Returns:
+            list of tuple: Name, points, mean score per game, half width of
+                           its 95% interval, wins, draws, losses, byes and
+                           mean pieces per game of every entrant.
+        """
+        rows = []
+        for entrant, name in enumerate(self.__config["entrants"]):
+            scores = self.__scores[entrant]
+            wins, draws, losses, byes = self.__results[entrant]
+            rows.append((name, self.__points(entrant), scores.mean, Z95 * scores.stderr,
+                         wins, draws, losses, byes, self.__moves[entrant].mean))
+        return sorted(rows, key=lambda row: -row[1])
+
+
+def main():
+    """
+    Main program. Play a tournament between move strategies on a pool of
+    processes, resuming it from its checkpoint if there is one, and report
+    the standings and the games per second of every worker.
+    """
+    parser = argparse.ArgumentParser(description="Tournament between move strategies")
+    parser.add_argument("entrants", nargs="+",
+                        help="strategies: random, alphabeta:BUDGET or script:PATH")
+    parser.add_argument("--format", choices=FORMATS, default="round-robin",
+                        help="every entrant meets every other one, or Swiss rounds")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds of a Swiss tournament")
+    parser.add_argument("--games", type=int, default=100, help="games of every pairing")
+    parser.add_argument("--rows", type=int, default=3, help="rows of the board")
+    parser.add_argument("--cols", type=int, default=3, help="columns of the board")
+    parser.add_argument("--k", type=int, default=None, help="pieces in a row needed to win")
+    parser.add_argument("--engine", default="bitboard", help="state engine of the board")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random strategies")
+    parser.add_argument("--tablebase", help="tablebase of perfect moves, for the alpha-beta entrants")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes of the pool")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="save the progress in FILE, and resume from it if it exists")
+    parser.add_argument("--checkpoint-every", type=float, default=CHECKPOINT_EVERY,
+                        help="seconds between two checkpoints at most")
+    args = parser.parse_args()
+
+    clog.setLevel(logging.WARNING)
+    flog.setLevel(logging.WARNING)
+
+    # Entrants of the same strategy are told apart by their position
+    names = [spec if args.entrants.count(spec) == 1 else f"{spec}#{i}"
+             for i, spec in enumerate(args.entrants)]
+    config = {"entrants": names, "specs": args.entrants, "format": args.format,
+              "rounds": args.rounds, "games": args.games, "rows": args.rows, "cols": args.cols,
+              "k": args.k, "engine": args.engine, "seed": args.seed}
+    for spec in args.entrants:
+        try:
+            make_strategy(spec, 0)
+        except (ValueError, OSError) as e:
+            parser.error(str(e))
+
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        tournament = Tournament.load(args.checkpoint)
+        if tournament.config != config:
+            parser.error(f"{args.checkpoint} is the checkpoint of another tournament")
+        clog.warning("Resuming from %s", args.checkpoint)
+    else:
+        tournament = Tournament(config)
+
+    # The workers are forked with the settings and share the tablebase pages;
+    # an interrupt is left to the main process, which saves the progress
+    global _setup
+    tablebase = Tablebase(args.tablebase) if args.tablebase is not None else None
+    _setup = (args.rows, args.cols, args.k, args.engine, args.entrants, args.seed, tablebase)
+    context = multiprocessing.get_context("fork")
+    start = time.perf_counter()
+    with context.Pool(args.workers, signal.signal, (signal.SIGINT, signal.SIG_IGN)) as pool:
+        try:
+            tournament.run(pool, args.workers, args.checkpoint, args.checkpoint_every)
+        except KeyboardInterrupt:
+            if args.checkpoint is not None:
+                tournament.save(args.checkpoint)
+                print(f"Interrupted, progress saved in {args.checkpoint}")
+            return
+    elapsed = time.perf_counter() - start
+
+    print(f"{'entrant':<20} {'points':>8} {'score':>14} {'won':>6} {'drawn':>6} {'lost':>6} "
+          f"{'byes':>4} {'moves':>6}")
+    for name, points, mean, half, wins, draws, losses, byes, moves in tournament.standings():
+        print(f"{name:<20} {points:>8.1f} {mean:>7.3f} ±{half:<5.3f} {wins:>6} {draws:>6} "
+              f"{losses:>6} {byes:>4} {moves:>6.1f}")
+
+    games = sum(played for played, ns in tournament.workers.values())
+    print(f"games: {games} in {elapsed:.2f} s in this run, {games / elapsed:.0f} games/s")
+    for pid, (played, ns) in sorted(tournament.workers.items()):
+        print(f"worker {pid}: {played} games, {played / (ns / 1e9):.0f} games/s, "
+              f"{ns / 1e9 / elapsed:.0%} busy")
+
+
+if __name__ == "__main__":
+    main()